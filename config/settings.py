@@ -2,7 +2,9 @@ import os
 
 import environ
 
-env = environ.Env(DEBUG=(bool, False), PRODUCTION=(bool, True))
+env = environ.Env(
+    DEBUG=(bool, False), PRODUCTION=(bool, True), GAMES_REQUEST_TIMING=(bool, False)
+)
 environ.Env.read_env()
 
 
@@ -35,12 +37,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "games.middleware.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # serves the static files with whitenoise, also in async requests
+    "games.middleware.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "games.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -96,6 +101,15 @@ DATABASES = {
     }
 }
 
+# Cache
+# the default cache is local to the process, set CACHE_URL to a cache shared
+# between processes (e.g. memcached) when running several workers
+
+CACHES = {"default": env.cache_url("CACHE_URL", default="locmemcache://")}
+
+# sessions are read from the cache, so a request doesn't need to query the session
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -156,19 +170,63 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Local settings
+# the board of a new game, with the number of coins in a line to win
 CONNECT_FOUR_ROWS = 6
 CONNECT_FOUR_COLUMNS = 7
+CONNECT_FOUR_CONNECT = 4
+# the results of solved positions, written by the solve_book command
+CONNECT_FOUR_BOOK_PATH = os.path.join(BASE_DIR, "book.bin")
+# hints are searched in a pool of processes, with at most one search per process
+CONNECT_FOUR_HINT_WORKERS = 2
+CONNECT_FOUR_HINT_TIME_LIMIT = 1.0  # seconds
+# a computer's move is searched for in the request, so its search is capped
+CONNECT_FOUR_COMPUTER_TIME_LIMIT = 0.5  # seconds
+# publishes moves to the open game pages. The in-process broker only notifies the
+# pages waiting in the same process, so with several workers a move made in another
+# process is only seen when the page's request times out and it asks again.
+# Replace it with a broker shared between processes to notify every page at once
+GAMES_BROKER = "games.broker.InProcessBroker"
+# pairs the users waiting in the lobby from a queue in the database, shared by every
+# process. games.matchmaking.InProcessMatchmaker only pairs users in the same process
+GAMES_MATCHMAKER = "games.matchmaking.DatabaseMatchmaker"
+# the most the ratings of two paired users differ by
+GAMES_MATCHMAKING_BAND = 200
+# seconds a user waits after their lobby page last asked for a pair
+GAMES_MATCHMAKING_TIMEOUT = 60
+# time each request, sent in the Server-Timing header and logged
+GAMES_REQUEST_TIMING = env("GAMES_REQUEST_TIMING")
+# the most queries each view should make, more are logged as a warning
+GAMES_QUERY_BUDGETS = {
+    "game_list": 5,
+    "game_detail": 5,
+    "game_coin": 10,
+    "game_check_turn": 3,
+    "opponent_search": 5,
+}
+# staff can profile a request with ?profile when set, the profiles are written here
+GAMES_PROFILE_DIR = env("GAMES_PROFILE_DIR", default=None)
+# the number of most recent profiles kept
+GAMES_PROFILE_KEEP = 20
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"games": {"handlers": ["console"], "level": "INFO"}},
+}
 
 PRODUCTION = env("PRODUCTION")
 
 if not PRODUCTION:
     # remove whitenoise from middleware for local development
     MIDDLEWARE = [
+        "games.middleware.RequestTimingMiddleware",
         "django.middleware.security.SecurityMiddleware",
         "django.contrib.sessions.middleware.SessionMiddleware",
         "django.middleware.common.CommonMiddleware",
         "django.middleware.csrf.CsrfViewMiddleware",
         "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "games.middleware.ProfilingMiddleware",
         "django.contrib.messages.middleware.MessageMiddleware",
         "django.middleware.clickjacking.XFrameOptionsMiddleware",
     ]
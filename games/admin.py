@@ -15,5 +15,29 @@ class CoinAdmin(admin.ModelAdmin):
     search_fields = ["game", "player"]
 
 
+class ComputerAdmin(admin.ModelAdmin):
+    list_display = ("user", "difficulty")
+
+
+class PlayerStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "rating",
+        "played",
+        "wins",
+        "losses",
+        "draws",
+        "best_streak",
+    )
+    search_fields = ["user__username"]
+
+
+class WaitingPlayerAdmin(admin.ModelAdmin):
+    list_display = ("user", "rating", "joined_date")
+
+
 admin.site.register(models.Game, GameAdmin)
 admin.site.register(models.Coin, CoinAdmin)
+admin.site.register(models.Computer, ComputerAdmin)
+admin.site.register(models.PlayerStats, PlayerStatsAdmin)
+admin.site.register(models.WaitingPlayer, WaitingPlayerAdmin)
@@ -0,0 +1,191 @@
+"""Benchmarks of the game hot paths, which are run by the benchmark command.
+
+Each benchmark is registered with a setup function, which creates what it needs
+and returns the function that is timed. The win checks compare the Direction check
+calculate_status used before the bitboard with the Bitboard check, and have no baseline.
+"""
+import os
+from functools import partial
+
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.cache import SessionStore
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from .models import Game
+from .utils import Bitboard, decode_moves
+from .views import GameCheckRedirectView, GameListView
+
+# the timings depend on the database, so there is a baseline per database vendor
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmarks.{vendor}.json")
+
+# a full board without a connect four, and its first half
+DRAW_MOVES = "330254564223355224331121550404466660106011"
+BOARDS = {"empty": "", "mid-game": DRAW_MOVES[:21], "full": DRAW_MOVES}
+# 201 moves on a 15x15 board without a line of 5
+LARGE_BOARD = {"rows": 15, "columns": 15, "connect": 5}
+LARGE_BOARD_MOVES = (
+    "c47e7e487a7c3e8d0c644713db41773cad38827ab0612390a125e6e22d45d96604a1ddd0a2b26"
+    "aeb688d5bdb97cd4a742da0702daa07c2204bc212e78e0108080c3de9271eea84ced8712ae630"
+    "c96e488c19a3e308a393c696144c16866116c13c3334999"
+)
+
+BENCHMARKS = {}
+WIN_CHECKS = {}
+
+
+def register(name, setup):
+    BENCHMARKS[name] = setup
+
+
+def make_players():
+    return [
+        User.objects.get_or_create(username=f"benchmark-player-{number}")[0]
+        for number in (1, 2)
+    ]
+
+
+def play_game(players, moves):
+    game = Game.objects.create(player_1=players[0], player_2=players[1])
+    for move, column in enumerate(decode_moves(moves)):
+        game.create_coin(players[move % 2], column)
+    return game
+
+
+def calculate_status(moves, **board):
+    game = Game(
+        player_1_id=1, player_2_id=2, moves=moves, move_count=len(moves), **board
+    )
+
+    def run():
+        game.__dict__.pop("bitboard", None)
+        game.calculate_status()
+
+    return run
+
+
+def create_coin():
+    players = make_players()
+    return partial(play_game, players, "0101010")
+
+
+def coin_dict():
+    game = play_game(make_players(), BOARDS["mid-game"])
+
+    def run():
+        game.__dict__.pop("coin_dict", None)
+        return game.coin_dict
+
+    return run
+
+
+def board_dict():
+    game = Game(player_1_id=1, player_2_id=2, moves=BOARDS["mid-game"])
+
+    def run():
+        game.__dict__.pop("bitboard", None)
+        game.__dict__.pop("board_dict", None)
+        return game.board_dict
+
+    return run
+
+
+def game_list(number):
+    players = make_players()
+    for opponent in range(number):
+        Game.objects.create(
+            player_1=players[0],
+            player_2=User.objects.create(username=f"benchmark-{number}-{opponent}"),
+            moves="3",
+            move_count=1,
+            status=Game.Status.PLAYER_2,
+        )
+    request = RequestFactory().get("/")
+    request.user = players[0]
+    view = GameListView(page_size=number)
+    view.setup(request)
+
+    def run():
+        # the games are read as the view reads a page, then rendered
+        return render_to_string(
+            "games/_game_list.html", {"game_list": view.get_queryset()}, request
+        )
+
+    return run
+
+
+def check_turn(not_modified):
+    players = make_players()
+    game = Game.objects.create(player_1=players[0], player_2=players[1])
+    game.cache_version()
+    headers = {}
+    if not_modified:
+        headers["HTTP_IF_NONE_MATCH"] = GameCheckRedirectView.get_etag(
+            game.pk, players[0].pk, 0, game.status
+        )
+    request = RequestFactory().get(f"/{game.pk}/check_turn/", **headers)
+    request.user = players[0]
+    request.session = SessionStore()
+    request.session[SESSION_KEY] = str(players[0].pk)
+    view = GameCheckRedirectView.as_view()
+    return partial(view, request, pk=game.pk)
+
+
+for board_name, board_moves in BOARDS.items():
+    register(f"calculate_status[{board_name}]", partial(calculate_status, board_moves))
+register(
+    "calculate_status[15x15 connect 5]",
+    partial(calculate_status, LARGE_BOARD_MOVES, **LARGE_BOARD),
+)
+register("create_coin[7 moves]", create_coin)
+register("coin_dict", coin_dict)
+register("board_dict", board_dict)
+for list_size in (10, 100, 1000):
+    register(f"game_list_render[{list_size}]", partial(game_list, list_size))
+register("check_turn[changed]", partial(check_turn, False))
+register("check_turn[not modified]", partial(check_turn, True))
+
+
+def board_coins(moves):
+    """Return the board's coins by location, with the ids 1 and 2 of the players"""
+    board = Bitboard.from_moves(moves)
+    coins = {}
+    for row in range(board.rows):
+        for col in range(board.columns):
+            player = board.get(row, col)
+            if player is not None:
+                coins[(row, col)] = player + 1
+    return coins
+
+
+def direction_winner(coins):
+    for coordinate, player_id in coins.items():
+        for direction in Game.DIRECTIONS:
+            if direction.connect_four(coordinate, coins):
+                return player_id
+    return None
+
+
+def bitboard_winner(coins):
+    return Bitboard.from_coins(coins, 1).winner()
+
+
+def direction_check(moves):
+    return partial(direction_winner, board_coins(moves))
+
+
+def bitboard_check(moves):
+    return partial(bitboard_winner, board_coins(moves))
+
+
+def prebuilt_bitboard_check(moves):
+    return Bitboard.from_moves(moves).winner
+
+
+for board_name, board_moves in BOARDS.items():
+    WIN_CHECKS[f"direction[{board_name}]"] = partial(direction_check, board_moves)
+    WIN_CHECKS[f"bitboard[{board_name}]"] = partial(bitboard_check, board_moves)
+    WIN_CHECKS[f"bitboard_prebuilt[{board_name}]"] = partial(
+        prebuilt_bitboard_check, board_moves
+    )
@@ -0,0 +1,92 @@
+import mmap
+import os
+import struct
+from functools import lru_cache
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .utils import Bitboard
+
+# each position is stored as its key and the result for the player to move,
+# 1 is a win, -1 is a loss and 0 is a draw
+RECORD = struct.Struct("<Qb")
+# the rows, columns and line length of the boards in the book
+BOOK_BOARD = (6, 7, 4)
+
+
+def mirror(board: Bitboard, bits: int):
+    """Return the bits with the columns in reverse order"""
+    column_bits = (1 << board.height) - 1
+    mirrored = 0
+    for col in range(board.columns):
+        column = (bits >> (col * board.height)) & column_bits
+        mirrored |= column << ((board.columns - 1 - col) * board.height)
+    return mirrored
+
+
+def position_key(board: Bitboard):
+    """Return the key of the board for the player to move, a position and its
+    mirror image have the same key as they have the same result.
+    The coins of the player to move plus every coin gives a unique key, as adding
+    the mask carries a bit to the top of each column's coins"""
+    position = board.players[board.move_count % 2]
+    mask = board.mask
+    return min(position + mask, mirror(board, position) + mirror(board, mask))
+
+
+def write_book(path, results: Dict[int, int]):
+    """Write the results sorted by key, so a position can be found by binary search"""
+    with open(path, "wb") as book_file:
+        for key in sorted(results):
+            book_file.write(RECORD.pack(key, results[key]))
+
+
+class Book:
+    """The results of solved positions, read from a memory mapped file.
+    The pages of the file are shared by every process that opens it"""
+
+    def __init__(self, path):
+        self.count = os.path.getsize(path) // RECORD.size
+        self.data = b""
+        if self.count:
+            with open(path, "rb") as book_file:
+                self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.count
+
+    def get(self, key: int) -> Optional[int]:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key, result = RECORD.unpack_from(self.data, middle * RECORD.size)
+            if middle_key == key:
+                return result
+            if middle_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def result(self, board: Bitboard) -> Optional[int]:
+        """Return the result for the player to move, or None if it isn't in the book"""
+        if (board.rows, board.columns, board.connect) != BOOK_BOARD:
+            return None
+        return self.get(position_key(board))
+
+
+@lru_cache(maxsize=None)
+def get_book() -> Optional[Book]:
+    """Return the book, or None if it hasn't been written with the solve_book command"""
+    if not os.path.exists(settings.CONNECT_FOUR_BOOK_PATH):
+        return None
+    return Book(settings.CONNECT_FOUR_BOOK_PATH)
+
+
+@receiver(setting_changed)
+def reset_book(*, setting, **kwargs):
+    if setting == "CONNECT_FOUR_BOOK_PATH":
+        get_book.cache_clear()
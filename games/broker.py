@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Receives the messages published to a channel, for use in an async view"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.broker.unsubscribe(self)
+
+    def put(self, message):
+        """Add a message to the queue, this may be called from any thread"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    async def get(self, timeout):
+        """Wait for the next message, returns None if there isn't one before the timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BaseBroker:
+    """Publishes game updates to the requests waiting for them.
+    The broker is set by the GAMES_BROKER setting, so a broker shared between
+    processes can replace the in-process broker when there are several workers"""
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """Delivers messages to the subscriptions in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel_subscriptions = self.subscriptions.get(subscription.channel, set())
+            channel_subscriptions.discard(subscription)
+            if not channel_subscriptions:
+                self.subscriptions.pop(subscription.channel, None)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.GAMES_BROKER)()
+
+
+@receiver(setting_changed)
+def reset_broker(*, setting, **kwargs):
+    if setting == "GAMES_BROKER":
+        get_broker.cache_clear()
+
+
+def game_channel(game_id):
+    return f"game-{game_id}"
+
+
+def lobby_channel(user_id):
+    return f"lobby-{user_id}"
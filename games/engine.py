@@ -0,0 +1,311 @@
+import math
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from .utils import Bitboard
+
+# a win scores above any evaluation of the board, and more the sooner it is
+WIN_SCORE = 1000
+INFINITY = 10 * WIN_SCORE
+
+# transposition table flags, whether the value is exact or a bound
+EXACT, LOWER, UPPER = range(3)
+
+
+@dataclass(frozen=True)
+class Difficulty:
+    depth: int
+    time_limit: float  # seconds
+
+
+DIFFICULTIES = {
+    "easy": Difficulty(depth=2, time_limit=0.05),
+    "medium": Difficulty(depth=8, time_limit=0.1),
+    "hard": Difficulty(depth=20, time_limit=1.0),
+}
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time limit has run out"""
+
+
+def popcount(bits: int):
+    return bin(bits).count("1")
+
+
+class Engine:
+    """Chooses a column with a negamax search with alpha-beta pruning.
+
+    The search uses the bitboard layout of Bitboard, with the board stored as the
+    coins of the player to move and a mask of all the coins. Searched positions are
+    kept in a transposition table keyed by their Zobrist hash, which is shared by
+    every search so later moves of a game reuse the earlier searches.
+    """
+
+    def __init__(self, rows: int, columns: int, table_size: int = 1 << 20):
+        self.rows = rows
+        self.columns = columns
+        self.height = rows + 1
+        self.cells = rows * columns
+        self.table_size = table_size
+        self.table = {}
+
+        column_bits = (1 << rows) - 1
+        self.bottom_masks = [1 << (col * self.height) for col in range(columns)]
+        self.column_masks = [
+            column_bits << (col * self.height) for col in range(columns)
+        ]
+        self.top_masks = [1 << (rows - 1 + col * self.height) for col in range(columns)]
+        self.bottom = sum(self.bottom_masks)
+        self.board_mask = self.bottom * column_bits
+        # the center columns are part of the most lines, so are searched first
+        self.order = sorted(range(columns), key=lambda col: abs(2 * col - columns + 1))
+        self.center_mask = sum(
+            self.column_masks[col] for col in self.order[: 2 - columns % 2]
+        )
+
+        # a fixed seed so a position has the same hash in every process
+        generator = random.Random(0)
+        self.zobrist = [
+            [generator.getrandbits(64) for _ in range(columns * self.height)]
+            for _ in range(2)
+        ]
+
+    def hash(self, board: Bitboard):
+        key = 0
+        for player, coins in enumerate(board.players):
+            while coins:
+                bit = coins & -coins
+                key ^= self.zobrist[player][bit.bit_length() - 1]
+                coins ^= bit
+        return key
+
+    def winning_cells(self, position: int, mask: int):
+        """Return the empty cells that would complete a line of four for the position"""
+        # vertical
+        cells = (position << 1) & (position << 2) & (position << 3)
+        for shift in (self.height, self.height + 1, self.height - 1):
+            pair = (position << shift) & (position << 2 * shift)
+            cells |= pair & (position << 3 * shift)
+            cells |= pair & (position >> shift)
+            pair = (position >> shift) & (position >> 2 * shift)
+            cells |= pair & (position << shift)
+            cells |= pair & (position >> 3 * shift)
+        return cells & (self.board_mask ^ mask)
+
+    def evaluate(self, position: int, mask: int):
+        """Score the board for the player to move, by the cells where each player
+        could complete a line and their coins in the center"""
+        opponent = position ^ mask
+        threats = popcount(self.winning_cells(position, mask)) - popcount(
+            self.winning_cells(opponent, mask)
+        )
+        center = popcount(position & self.center_mask) - popcount(
+            opponent & self.center_mask
+        )
+        return 4 * threats + center
+
+    def win_score(self, move_count: int):
+        """The score of winning with the next move, higher the fewer moves played"""
+        return WIN_SCORE + self.cells - move_count
+
+    def best_move(
+        self, board: Bitboard, player: int, depth: int, time_limit: float
+    ) -> Optional[int]:
+        """Return the best column for the player, searching a move deeper each time
+        until the depth or the time limit is reached"""
+        search = Search(self, time.perf_counter() + time_limit)
+        return search.best_move(board, player, depth)
+
+    def solve(self, board: Bitboard, player: int, depth: int) -> Optional[int]:
+        """Return 1 if the player to move can force a win within the depth,
+        -1 if the opponent can, 0 if the board is full within the depth and
+        it is a draw, otherwise None as the result isn't known"""
+        score = Search(self, math.inf).score(board, player, depth)
+        if score >= WIN_SCORE:
+            return 1
+        if score <= -WIN_SCORE:
+            return -1
+        if board.move_count + depth >= self.cells:
+            return 0
+        return None
+
+
+class Search:
+    """A search for the best move, which is stopped at the deadline"""
+
+    def __init__(self, engine: Engine, deadline: float):
+        self.engine = engine
+        self.deadline = deadline
+        self.nodes = 0
+
+    def best_move(self, board: Bitboard, player: int, depth: int):
+        engine = self.engine
+        position = board.players[player]
+        mask = board.mask
+        moves = board.move_count
+        columns = [col for col in engine.order if not mask & engine.top_masks[col]]
+        if not columns:
+            return None
+
+        possible = (mask + engine.bottom) & engine.board_mask
+        wins = engine.winning_cells(position, mask) & possible
+        for col in columns:
+            if wins & engine.column_masks[col]:
+                return col
+
+        key = engine.hash(board)
+        best_col = columns[0]
+        try:
+            for search_depth in range(1, depth + 1):
+                best_col, score = self.search_root(
+                    position, mask, player, key, moves, search_depth, best_col
+                )
+                # stop once the result is known, or the board would be full
+                if abs(score) >= WIN_SCORE or moves + search_depth >= engine.cells:
+                    break
+        except SearchTimeout:
+            # use the best column from the last search that was completed
+            pass
+        return best_col
+
+    def score(self, board: Bitboard, player: int, depth: int):
+        position = board.players[player]
+        key = self.engine.hash(board)
+        return self.negamax(
+            position,
+            board.mask,
+            player,
+            key,
+            board.move_count,
+            depth,
+            -INFINITY,
+            INFINITY,
+        )
+
+    def search_root(self, position, mask, player, key, moves, depth, first_col):
+        engine = self.engine
+        opponent = position ^ mask
+        columns = [first_col] + [col for col in engine.order if col != first_col]
+        alpha, beta = -INFINITY, INFINITY
+        best_col = first_col
+        for col in columns:
+            move = (mask + engine.bottom_masks[col]) & engine.column_masks[col]
+            if not move:
+                continue
+            score = -self.negamax(
+                opponent,
+                mask | move,
+                1 - player,
+                key ^ engine.zobrist[player][move.bit_length() - 1],
+                moves + 1,
+                depth - 1,
+                -beta,
+                -alpha,
+            )
+            if score > alpha:
+                alpha = score
+                best_col = col
+        return best_col, alpha
+
+    def negamax(self, position, mask, player, key, moves, depth, alpha, beta):
+        """Return the score of the board for the player to move, position is their
+        coins and mask is every coin. The score is exact when it is between alpha and
+        beta, otherwise it is a bound beyond them"""
+        engine = self.engine
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+        if moves == engine.cells:
+            return 0
+
+        opponent = position ^ mask
+        possible = (mask + engine.bottom) & engine.board_mask
+        if engine.winning_cells(position, mask) & possible:
+            return engine.win_score(moves)
+
+        # a move the opponent would win with must be blocked,
+        # and if there are two they can't both be blocked
+        threats = engine.winning_cells(opponent, mask) & possible
+        if threats:
+            if threats & (threats - 1):
+                return -engine.win_score(moves + 1)
+            possible = threats
+
+        if depth == 0:
+            return engine.evaluate(position, mask)
+
+        table = engine.table
+        entry = table.get(key)
+        table_col = None
+        if entry is not None:
+            entry_depth, flag, value, table_col = entry
+            # a bound from the table is only used when it is outside the window
+            if entry_depth >= depth and (
+                flag == EXACT
+                or (flag == LOWER and value >= beta)
+                or (flag == UPPER and value <= alpha)
+            ):
+                return value
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_col = None
+        columns = engine.order
+        if table_col is not None:
+            columns = [table_col] + [col for col in columns if col != table_col]
+        for col in columns:
+            move = possible & engine.column_masks[col]
+            if not move:
+                continue
+            score = -self.negamax(
+                opponent,
+                mask | move,
+                1 - player,
+                key ^ engine.zobrist[player][move.bit_length() - 1],
+                moves + 1,
+                depth - 1,
+                -beta,
+                -alpha,
+            )
+            if score > best:
+                best = score
+                best_col = col
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if len(table) >= engine.table_size:
+            table.clear()
+        table[key] = (depth, flag, best, best_col)
+        return best
+
+
+@lru_cache(maxsize=None)
+def get_engine(rows: int, columns: int):
+    """Return the engine for the board size, one per process to share its table"""
+    return Engine(rows, columns)
+
+
+def computer_move(
+    board: Bitboard, player: int, difficulty: str, time_limit: Optional[float] = None
+):
+    """Return the column the computer plays at the difficulty,
+    searching for at most time_limit seconds when it is given"""
+    settings = DIFFICULTIES[difficulty]
+    if time_limit is None or time_limit > settings.time_limit:
+        time_limit = settings.time_limit
+    return get_engine(board.rows, board.columns).best_move(
+        board, player, settings.depth, time_limit
+    )
@@ -1,20 +1,56 @@
 from django.forms import ModelForm
-from django_select2.forms import Select2Widget
+from django.utils.translation import gettext_lazy as _
+from django_select2.forms import ModelSelect2Widget
 
-from games.models import Game
+from games.models import Computer, Game, PlayerStats
+
+
+def opponent_label(user):
+    return f"{user} ({PlayerStats.rating_of(user)})"
+
+
+class OpponentWidget(ModelSelect2Widget):
+    """Searches for the opponent with the opponent_search view as the user types,
+    so only the chosen opponent is rendered rather than every user"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("data_view", "opponent_search")
+        # open with the user's recent opponents, before anything is typed
+        kwargs.setdefault("attrs", {"data-minimum-input-length": 0})
+        super().__init__(*args, **kwargs)
+
+    def set_to_cache(self):
+        # the search view doesn't read the widget back from the cache
+        pass
+
+    def label_from_instance(self, obj):
+        return opponent_label(obj)
 
 
 class GameForm(ModelForm):
     class Meta:
         model = Game
-        fields = ("player_2",)
+        fields = ("player_2", "rows", "columns", "connect")
         widgets = {
-            "player_2": Select2Widget,
+            "player_2": OpponentWidget,
         }
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop("user")
         super().__init__(*args, **kwargs)
         self.instance.player_1 = user
-        player_2_qs = self.fields["player_2"].queryset.exclude(id=user.id)
-        self.fields["player_2"].queryset = player_2_qs
+        player_2 = self.fields["player_2"]
+        player_2.queryset = player_2.queryset.exclude(id=user.id).select_related(
+            "stats"
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        player_2, connect = cleaned_data.get("player_2"), cleaned_data.get("connect")
+        if (
+            player_2
+            and connect not in (None, 4)
+            and Computer.objects.filter(user=player_2).exists()
+        ):
+            self.add_error("connect", _("Computer opponents only play connect four."))
+        return cleaned_data
@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .engine import get_engine
+from .utils import Bitboard
+
+# the search is stopped by the time limit rather than the depth
+HINT_DEPTH = 42
+# seconds a hint is cached for, it is only used until the next move
+HINT_CACHE_TIMEOUT = 60 * 10
+
+
+def search_hint(moves: str, rows: int, columns: int, time_limit: float):
+    """Return the best column for the player to move, this runs in a pool process"""
+    board = Bitboard.from_moves(moves, rows=rows, columns=columns)
+    return get_engine(rows, columns).best_move(
+        board, board.move_count % 2, HINT_DEPTH, time_limit
+    )
+
+
+def hint_cache_key(game_id, move_count):
+    return f"game-hint-{game_id}-{move_count}"
+
+
+class HintsBusy(Exception):
+    """Raised when the pool is already searching as many hints as it can"""
+
+
+class HintPool:
+    """Searches for hints in a pool of processes, so a search never runs in the
+    process answering requests. Each process answering requests has its own pool,
+    which searches at most one hint per worker at a time, and each search is stopped
+    at the time limit. The hints are cached so they can be read by any process"""
+
+    def __init__(self, workers: int, time_limit: float):
+        self.workers = workers
+        self.time_limit = time_limit
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers)
+        # reentrant as cancelling a search calls search_done in the same thread
+        self.lock = threading.RLock()
+        # the (move_count, future) of the search for each game
+        self.searches = {}
+
+    def get_hint(self, game) -> Optional[int]:
+        """Return the hint for the game's board, or None while it is searched for.
+        The search is started by the first request for the hint"""
+        column = cache.get(hint_cache_key(game.pk, game.move_count))
+        if column is not None:
+            return column
+
+        with self.lock:
+            move_count, future = self.searches.get(game.pk, (None, None))
+            if move_count == game.move_count:
+                return None
+            if future is not None:
+                # the board has changed, so the hint isn't needed if not started
+                future.cancel()
+            if not self.slots.acquire(blocking=False):
+                raise HintsBusy
+            try:
+                future = self.submit(game)
+            except Exception:
+                self.slots.release()
+                raise
+            self.searches[game.pk] = (game.move_count, future)
+        future.add_done_callback(partial(self.search_done, game.pk, game.move_count))
+        return None
+
+    def submit(self, game):
+        board = game.bitboard
+        args = (search_hint, game.moves, board.rows, board.columns, self.time_limit)
+        try:
+            return self.executor.submit(*args)
+        except BrokenProcessPool:
+            # a pool process was killed, e.g. out of memory, so start a new pool
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.executor.submit(*args)
+
+    def search_done(self, game_id, move_count, future):
+        self.slots.release()
+        with self.lock:
+            if self.searches.get(game_id, (None, None))[1] is future:
+                del self.searches[game_id]
+        if not future.cancelled() and future.exception() is None:
+            cache.set(
+                hint_cache_key(game_id, move_count), future.result(), HINT_CACHE_TIMEOUT
+            )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def get_hint_pool():
+    """Return the process's hint pool, which is started by the first hint"""
+    return HintPool(
+        settings.CONNECT_FOUR_HINT_WORKERS, settings.CONNECT_FOUR_HINT_TIME_LIMIT
+    )
+
+
+@receiver(setting_changed)
+def reset_hint_pool(*, setting, **kwargs):
+    if setting in {"CONNECT_FOUR_HINT_WORKERS", "CONNECT_FOUR_HINT_TIME_LIMIT"}:
+        get_hint_pool.cache_clear()
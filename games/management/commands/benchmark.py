@@ -0,0 +1,113 @@
+import json
+import os
+import timeit
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from games.benchmarks import BASELINE_PATH, BENCHMARKS, WIN_CHECKS
+
+# the benchmarks use a cache of their own, so clearing it before each benchmark
+# doesn't clear the site's cache
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmarks",
+    }
+}
+
+
+def time_call(function, repeat):
+    """Return the fastest seconds per call of the repeats"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    return f"{seconds * 1e3:.1f} ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the game hot paths in a test database and compare them with the "
+        "baseline, failing if any is slower than the threshold"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names", nargs="*", help="Only run the benchmarks starting with the names"
+        )
+        parser.add_argument(
+            "--save", action="store_true", help="Save the timings as the baseline"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            help="Fraction slower than the baseline that is a regression, "
+            "above the noise between runs",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Number of times to time each"
+        )
+        parser.add_argument(
+            "--win-checks",
+            action="store_true",
+            help="Compare the Direction and Bitboard win checks instead",
+        )
+
+    def handle(self, *args, **options):
+        benchmarks = WIN_CHECKS if options["win_checks"] else BENCHMARKS
+        if options["win_checks"] and options["save"]:
+            raise CommandError("The win checks don't have a baseline")
+        names = [
+            name
+            for name in benchmarks
+            if not options["names"] or name.startswith(tuple(options["names"]))
+        ]
+        baseline_path = BASELINE_PATH.format(vendor=connection.vendor)
+        baseline = {}
+        if os.path.exists(baseline_path) and not options["win_checks"]:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        timings = {}
+        # the benchmarks create their games in a test database
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default"}
+        )
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                for name in names:
+                    cache.clear()
+                    seconds = time_call(benchmarks[name](), options["repeat"])
+                    timings[name] = float(f"{seconds:.3g}")
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        regressions = []
+        for name, seconds in timings.items():
+            line = f"{name}: {format_seconds(seconds)}"
+            if name in baseline:
+                change = seconds / baseline[name] - 1
+                line += f" ({change:+.0%} vs {format_seconds(baseline[name])})"
+                if change > options["threshold"]:
+                    regressions.append(name)
+                    line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        if options["save"]:
+            with open(baseline_path, "w") as baseline_file:
+                json.dump({**baseline, **timings}, baseline_file, indent=2)
+                baseline_file.write("\n")
+            self.stdout.write(f"Saved the baseline to {baseline_path}")
+        elif regressions:
+            raise CommandError(
+                f"{len(regressions)} slower than the baseline: {', '.join(regressions)}"
+            )
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from games.models import Game
+
+# the fields of each exported game, the players are exported by username
+EXPORT_FIELDS = {
+    "player_1": "player_1__username",
+    "player_2": "player_2__username",
+    "status": "status",
+    "winner": "winner__username",
+    "created_date": "created_date",
+    "rows": "rows",
+    "columns": "columns",
+    "connect": "connect",
+    "moves": "moves",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the games as JSON lines, one game per line with its players, "
+        "result and moves, to be loaded with import_games"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="-", help="Path of the file to write, or - for stdout"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of games read from the database at a time",
+        )
+
+    def handle(self, *args, **options):
+        to_stdout = options["output"] == "-"
+        output = (
+            self.stdout if to_stdout else open(options["output"], "w", encoding="utf-8")
+        )
+        games = (
+            Game.objects.order_by("pk")
+            .values_list(*EXPORT_FIELDS.values())
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        count = 0
+        try:
+            for values in games:
+                game = dict(zip(EXPORT_FIELDS, values))
+                game["created_date"] = game["created_date"].isoformat()
+                output.write(json.dumps(game) + "\n")
+                count += 1
+        finally:
+            if not to_stdout:
+                output.close()
+        self.stderr.write(f"Exported {count} games")
@@ -0,0 +1,172 @@
+import json
+import sys
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from games.models import Coin, Game
+from games.utils import Bitboard, decode_moves
+
+
+class Command(BaseCommand):
+    help = (
+        "Import games written by export_games, creating the players that don't "
+        "exist. The games and their coins are created in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the file to read, or - for stdin")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of games created at a time",
+        )
+
+    def handle(self, *args, **options):
+        # the ids of the players seen so far, by username
+        self.user_ids = {}
+        count = 0
+        lines = (
+            sys.stdin
+            if options["path"] == "-"
+            else open(options["path"], encoding="utf-8")
+        )
+        try:
+            numbered_lines = enumerate(lines, start=1)
+            while True:
+                batch = list(islice(numbered_lines, options["batch_size"]))
+                if not batch:
+                    break
+                games = [self.parse_game(number, line) for number, line in batch]
+                self.create_games(games)
+                count += len(games)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+        self.stdout.write(f"Imported {count} games")
+
+    def parse_game(self, number, line):
+        """Return the game of the line and the (player_number, row, column) of its
+        coins, replaying its moves to check they fit on the board and give its status"""
+        try:
+            data = json.loads(line)
+            if not (data["player_1"] and data["player_2"]):
+                raise ValueError("The game needs both players")
+            created_date = parse_datetime(data["created_date"])
+            if created_date is None:
+                raise ValueError("The created date isn't a date and time")
+            board = Bitboard(
+                rows=data["rows"], columns=data["columns"], connect=data["connect"]
+            )
+            columns = decode_moves(data["moves"])
+            if any(not 0 <= column < board.columns for column in columns):
+                raise ValueError("A move isn't a column of the board")
+            coins = [
+                (move % 2, board.play(column, move % 2), column)
+                for move, column in enumerate(columns)
+            ]
+            game = Game(
+                # the ids 1 and 2 stand for the players until their ids are known
+                player_1_id=1,
+                player_2_id=2,
+                status=data["status"],
+                created_date=created_date,
+                rows=board.rows,
+                columns=board.columns,
+                connect=board.connect,
+                moves=data["moves"],
+                heights=board.heights(),
+                move_count=board.move_count,
+            )
+            game.clean_fields(exclude=["player_1", "player_2", "winner"])
+            game.clean()
+            # the status and winner must be those of the replayed board
+            game.bitboard = board
+            status = game.calculate_status()
+            winner = {1: data["player_1"], 2: data["player_2"]}.get(
+                status.get("winner_id")
+            )
+            if status["status"] != game.status or winner != data["winner"]:
+                raise ValueError("The status and winner don't match the moves")
+        except (KeyError, TypeError, ValueError, ValidationError) as error:
+            raise CommandError(f"Line {number} isn't a valid game: {error!r}")
+        return game, data, coins
+
+    def get_user_ids(self, usernames):
+        """Add the ids of the usernames, creating the users that don't exist
+        with an unusable password"""
+        usernames = set(usernames) - set(self.user_ids) - {None}
+        if not usernames:
+            return
+        self.user_ids.update(
+            User.objects.filter(username__in=usernames).values_list("username", "pk")
+        )
+        missing = usernames - set(self.user_ids)
+        if missing:
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in missing
+            )
+            self.user_ids.update(
+                User.objects.filter(username__in=missing).values_list("username", "pk")
+            )
+
+    @transaction.atomic
+    def create_games(self, games):
+        self.get_user_ids(
+            username
+            for _, data, _ in games
+            for username in (data["player_1"], data["player_2"], data["winner"])
+        )
+        for game, data, _ in games:
+            game.player_1_id = self.user_ids[data["player_1"]]
+            game.player_2_id = self.user_ids[data["player_2"]]
+            game.winner_id = self.user_ids.get(data["winner"])
+
+        # the created date is set to now when the game is created, so is updated
+        created_dates = [game.created_date for game, _, _ in games]
+        created = self.bulk_create(Game, [game for game, _, _ in games])
+        for game, created_date in zip(created, created_dates):
+            game.created_date = created_date
+        Game.objects.bulk_update(created, ["created_date"])
+
+        # the coins are dated a second apart after their game in the order of the
+        # moves, as the last move is the newest coin
+        coins = [
+            Coin(
+                game=game,
+                player_id=(game.player_1_id, game.player_2_id)[player],
+                row=row,
+                column=column,
+            )
+            for game, _, coins in games
+            for player, row, column in coins
+        ]
+        created_dates = [
+            game.created_date + timedelta(seconds=move)
+            for game, _, coins in games
+            for move in range(len(coins))
+        ]
+        created = self.bulk_create(Coin, coins)
+        for coin, created_date in zip(created, created_dates):
+            coin.created_date = created_date
+        Coin.objects.bulk_update(created, ["created_date"])
+
+    @staticmethod
+    def bulk_create(model, objs):
+        """Create the objects and set their pks"""
+        created = model.objects.bulk_create(objs)
+        if created and created[0].pk is None:
+            # the database doesn't return the pks of a bulk insert (e.g. SQLite),
+            # as its writes are serialized the batch has the latest pks
+            pks = model.objects.order_by("-pk").values_list("pk", flat=True)
+            for obj, pk in zip(created, reversed(list(pks[: len(created)]))):
+                obj.pk = pk
+        return created
@@ -0,0 +1,48 @@
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the most recent request profiles in GAMES_PROFILE_DIR, "
+        "with the functions that took the most time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--last", type=int, default=5, help="Number of recent profiles to summarize"
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["cumulative", "tottime", "calls"],
+            default="cumulative",
+            help="Order of the functions",
+        )
+        parser.add_argument(
+            "--lines", type=int, default=15, help="Number of functions in each summary"
+        )
+        parser.add_argument(
+            "--callers",
+            action="store_true",
+            help="Also show the functions calling the listed functions",
+        )
+
+    def handle(self, *args, **options):
+        directory = settings.GAMES_PROFILE_DIR
+        if not directory or not os.path.isdir(directory):
+            raise CommandError("There are no profiles, set GAMES_PROFILE_DIR")
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".prof"))
+        if not names:
+            self.stdout.write(f"There are no profiles in {directory}")
+            return
+
+        for name in list(reversed(names))[: options["last"]]:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            stats = pstats.Stats(os.path.join(directory, name), stream=self.stdout)
+            stats.strip_dirs().sort_stats(options["sort"])
+            stats.print_stats(options["lines"])
+            if options["callers"]:
+                stats.print_callers(options["lines"])
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from games.models import Game, PlayerStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every player's stats and rating from the games that have ended, "
+        "which are replayed in the order they were created"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of games read and stats created at a time",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        # streamed in order from the index on the created date
+        games = (
+            Game.objects.filter(status__in=[Game.Status.COMPLETE, Game.Status.DRAW])
+            .order_by("created_date", "pk")
+            .values_list("player_1_id", "player_2_id", "winner_id")
+            .iterator(chunk_size=batch_size)
+        )
+        stats = {}
+        count = 0
+        for player_1_id, player_2_id, winner_id in games:
+            if player_1_id not in stats:
+                stats[player_1_id] = PlayerStats(user_id=player_1_id)
+            if player_2_id not in stats:
+                stats[player_2_id] = PlayerStats(user_id=player_2_id)
+            PlayerStats.add_game(stats[player_1_id], stats[player_2_id], winner_id)
+            count += 1
+
+        # a game ending while the games are read isn't counted,
+        # so rebuild when few games are being played
+        with transaction.atomic():
+            PlayerStats.objects.all().delete()
+            PlayerStats.objects.bulk_create(stats.values(), batch_size=batch_size)
+        self.stdout.write(
+            f"Rebuilt the stats of {len(stats)} players from {count} games"
+        )
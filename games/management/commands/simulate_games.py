@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from games.engine import DIFFICULTIES, computer_move
+from games.models import Game, PlayerStats
+
+SIMULATION_USERNAMES = ("simulation-player-1", "simulation-player-2")
+
+
+def choose_column(board, player, strategy, generator):
+    if strategy == "random":
+        return generator.choice(board.available_columns())
+    return computer_move(board, player, strategy)
+
+
+def play_memory_game(strategy, generator):
+    """Play a game with the game logic in memory, without saving it.
+    Returns the seconds each move took to play and calculate the status"""
+    game = Game(player_1_id=1, player_2_id=2)
+    latencies = []
+    while game.is_pending:
+        player = game.move_count % 2
+        column = choose_column(game.bitboard, player, strategy, generator)
+        start = time.perf_counter()
+        row = game.bitboard.play(column, player)
+        game.move_count += 1
+        game.__dict__.update(game.calculate_move_status(row, column))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def play_database_game(strategy, generator, users):
+    """Play a game with Game.create_coin, the path of a user's move.
+    Returns the seconds each move took"""
+    game = Game.objects.create(player_1=users[0], player_2=users[1])
+    latencies = []
+    while game.is_pending:
+        player = game.move_count % 2
+        column = choose_column(game.bitboard, player, strategy, generator)
+        start = time.perf_counter()
+        game.create_coin(users[player], column)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def play_games(mode, strategy, number, seed):
+    """Play the games and return the latencies of their moves,
+    this is run in each process of the pool"""
+    generator = random.Random(seed)
+    if mode == "memory":
+        return [play_memory_game(strategy, generator) for _ in range(number)]
+    users = list(User.objects.filter(username__in=SIMULATION_USERNAMES))
+    users.sort(key=lambda user: SIMULATION_USERNAMES.index(user.username))
+    return [play_database_game(strategy, generator, users) for _ in range(number)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Play games between random or computer players to measure the speed of "
+        "the game logic and of making a move"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("games", type=int, help="Number of games to play")
+        parser.add_argument(
+            "--mode",
+            choices=["memory", "database"],
+            default="memory",
+            help="Play the moves in memory or with Game.create_coin",
+        )
+        parser.add_argument(
+            "--players",
+            choices=["random", *DIFFICULTIES],
+            default="random",
+            help="Choose the moves randomly or with the engine at a difficulty",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1, help="Number of processes to play in"
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the random players"
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the games played in the database",
+        )
+
+    def handle(self, *args, **options):
+        mode, workers = options["mode"], options["workers"]
+        if mode == "database":
+            for username in SIMULATION_USERNAMES:
+                User.objects.get_or_create(username=username)
+
+        # split the games between the workers, each with its own seed
+        batches = []
+        for worker in range(workers):
+            number = options["games"] // workers + (worker < options["games"] % workers)
+            if number:
+                seed = options["seed"] + worker
+                batches.append((mode, options["players"], number, seed))
+
+        start = time.perf_counter()
+        if workers == 1:
+            results = [play_games(*batch) for batch in batches]
+        else:
+            # the pool processes can't share the database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(play_games, *zip(*batches)))
+        seconds = time.perf_counter() - start
+
+        latencies = [latency for games in results for game in games for latency in game]
+        games = sum(len(games) for games in results)
+        self.stdout.write(
+            f"Played {games} games ({len(latencies)} moves) in {seconds:.2f}s "
+            f"with {workers} worker{'s' if workers > 1 else ''}"
+        )
+        self.stdout.write(f"  games/sec: {games / seconds:.1f}")
+        self.stdout.write(f"  moves/sec: {len(latencies) / seconds:.1f}")
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"  move latency p50: {percentiles[49] * 1e6:.1f} µs, "
+                f"p99: {percentiles[98] * 1e6:.1f} µs"
+            )
+
+        if mode == "database" and not options["keep"]:
+            # the simulation players only play each other, so their stats are
+            # only the simulated games' results
+            Game.objects.filter(player_1__username__in=SIMULATION_USERNAMES).delete()
+            PlayerStats.objects.filter(user__username__in=SIMULATION_USERNAMES).delete()
@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from games.book import BOOK_BOARD, get_book, position_key, write_book
+from games.engine import Engine
+from games.utils import Bitboard
+
+
+def positions(moves):
+    """Yield the boards reached in up to the number of moves, without the games
+    that are already won, with a board and its mirror image only yielded once"""
+    boards = [Bitboard()]
+    keys = {position_key(boards[0])}
+    yield boards[0]
+    for _ in range(moves):
+        next_boards = []
+        for board in boards:
+            player = board.move_count % 2
+            for col in board.available_columns():
+                next_board = Bitboard(
+                    players=list(board.players), move_count=board.move_count
+                )
+                next_board.play(col, player)
+                key = position_key(next_board)
+                if key in keys or next_board.connect_four(player):
+                    continue
+                keys.add(key)
+                next_boards.append(next_board)
+                yield next_board
+        boards = next_boards
+
+
+class Command(BaseCommand):
+    help = (
+        "Solve the positions in the first moves of the game and write their results "
+        "to the book used to evaluate a game"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--moves", type=int, default=4, help="Number of moves from the start"
+        )
+        parser.add_argument(
+            "--depth", type=int, default=12, help="Number of moves searched to solve"
+        )
+        parser.add_argument(
+            "--output",
+            default=settings.CONNECT_FOUR_BOOK_PATH,
+            help="Path of the book file",
+        )
+
+    def handle(self, *args, **options):
+        board = Bitboard()
+        if (board.rows, board.columns, board.connect) != BOOK_BOARD:
+            raise CommandError("The book is only for the standard 6x7 connect four")
+
+        engine = Engine(board.rows, board.columns)
+        start = time.perf_counter()
+        results = {}
+        searched = 0
+        for board in positions(options["moves"]):
+            searched += 1
+            result = engine.solve(board, board.move_count % 2, options["depth"])
+            # positions that couldn't be solved within the depth are left out
+            if result is not None:
+                results[position_key(board)] = result
+
+        write_book(options["output"], results)
+        get_book.cache_clear()
+        self.stdout.write(
+            f"Solved {len(results)} of {searched} positions "
+            f"in {time.perf_counter() - start:.1f}s, written to {options['output']}"
+        )
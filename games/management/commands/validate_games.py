@@ -0,0 +1,154 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from games.models import Coin, Game
+from games.utils import winning_players
+
+GAME_FIELDS = (
+    "pk",
+    "rows",
+    "columns",
+    "connect",
+    "player_1_id",
+    "player_2_id",
+    "status",
+    "winner_id",
+)
+
+
+def load_boards(games, coins):
+    """Return the boards of games with the same size as a stack of arrays in the
+    Bitboard.to_array format, and the number of coins in each board.
+    The games are sorted by pk and coins is an array of (game_id, row, column,
+    player_id), which can include the coins of other games"""
+    _, rows, columns, *_ = games[0]
+    game_ids = np.array([game[0] for game in games])
+    player_1_ids = np.array([game[4] for game in games])
+    coins = coins[np.isin(coins[:, 0], game_ids)]
+    indexes = np.searchsorted(game_ids, coins[:, 0])
+    boards = np.zeros((len(games), rows, columns), dtype=np.int8)
+    boards[indexes, coins[:, 1], coins[:, 2]] = np.where(
+        coins[:, 3] == player_1_ids[indexes], 1, 2
+    )
+    return boards, np.count_nonzero(boards, axis=(1, 2))
+
+
+def check_outcomes(games, coins):
+    """Return the (game, status, winner_id) of the games whose stored outcome
+    doesn't match their coins. The outcome of a board where both players have a
+    line can't be known, so its status and winner are None"""
+    boards, counts = load_boards(games, coins)
+    wins = winning_players(boards, games[0][3])
+    mismatches = []
+    for game, (player_1_won, player_2_won), count in zip(games, wins, counts):
+        _, rows, columns, _, player_1_id, player_2_id, status, winner_id = game
+        if player_1_won and player_2_won:
+            outcome = (None, None)
+        elif player_1_won or player_2_won:
+            outcome = (
+                Game.Status.COMPLETE,
+                player_1_id if player_1_won else player_2_id,
+            )
+        elif count == rows * columns:
+            outcome = (Game.Status.DRAW, None)
+        else:
+            outcome = (
+                Game.Status.PLAYER_2 if count % 2 else Game.Status.PLAYER_1,
+                None,
+            )
+        if outcome != (status, winner_id):
+            mismatches.append((game, *outcome))
+    return mismatches
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the stored status and winner of every game match its coins, "
+        "checking the wins of a chunk of games at once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000, help="Number of games in a chunk"
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Update the games whose outcome doesn't match their coins, "
+            "then rebuild the players' stats",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        chunk_size = options["chunk_size"]
+        checked, mismatched, fixed, last_pk = 0, 0, 0, 0
+        while True:
+            # the games are read in chunks by primary key, so the query is indexed
+            games = list(
+                Game.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list(*GAME_FIELDS)[:chunk_size]
+            )
+            if not games:
+                break
+            last_pk = games[-1][0]
+
+            coins = Coin.objects.filter(
+                game_id__gte=games[0][0], game_id__lte=last_pk
+            ).values_list("game_id", "row", "column", "player_id")
+            coins = np.array(list(coins), dtype=np.int64).reshape(-1, 4)
+
+            # the boards of a size are checked together
+            sizes = defaultdict(list)
+            for game in games:
+                sizes[game[1:4]].append(game)
+            mismatches = []
+            for size_games in sizes.values():
+                mismatches += check_outcomes(size_games, coins)
+
+            checked += len(games)
+            mismatched += len(mismatches)
+            for game, status, winner_id in mismatches:
+                outcome = (
+                    f"its coins give {status} with winner {winner_id}"
+                    if status is not None
+                    else "both players have a line"
+                )
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Game {game[0]} is {game[6]} with winner {game[7]}, "
+                        f"but {outcome}"
+                    )
+                )
+            if options["fix"]:
+                fixed += self.fix(mismatches)
+
+        seconds = time.perf_counter() - start
+        self.stdout.write(
+            f"Checked {checked} games in {seconds:.2f}s, {mismatched} mismatched"
+            + (f", {fixed} fixed" if options["fix"] else "")
+        )
+        if fixed:
+            # a rating depends on the ratings of every earlier opponent, so the
+            # stats of every player are rebuilt rather than those of the fixed games
+            call_command("rebuild_stats", stdout=self.stdout)
+
+    def fix(self, mismatches):
+        """Update the outcome of the games, apart from those with a line for both
+        players as their outcome isn't known"""
+        updates = [
+            Game(pk=game[0], status=status, winner_id=winner_id)
+            for game, status, winner_id in mismatches
+            if status is not None
+        ]
+        with transaction.atomic():
+            Game.objects.bulk_update(updates, ["status", "winner"])
+        # bulk_update doesn't call save, which forgets the cached versions
+        cache.delete_many([Game.version_cache_key(game.pk) for game in updates])
+        return len(updates)
@@ -0,0 +1,226 @@
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .broker import get_broker, lobby_channel
+from .models import Game, PlayerStats, WaitingPlayer
+from .ratings import INITIAL_RATING
+
+
+class BaseMatchmaker:
+    """Pairs the users waiting for a game with an opponent of a similar rating.
+    The matchmaker is set by the GAMES_MATCHMAKER setting, so a queue shared
+    between processes can replace the in-process queue when there are several workers.
+    A user stops waiting when their lobby page hasn't asked for a pair for
+    GAMES_MATCHMAKING_TIMEOUT seconds, e.g. after closing the page"""
+
+    def __init__(self):
+        self.band = settings.GAMES_MATCHMAKING_BAND
+        self.timeout = settings.GAMES_MATCHMAKING_TIMEOUT
+
+    def join(self, user_id, rating):
+        """Pair the user with the waiting user whose rating is nearest theirs, within
+        the band, and return the opponent's id. Otherwise the user waits for an
+        opponent and None is returned. A user is only ever paired once"""
+        raise NotImplementedError
+
+    def leave(self, user_id):
+        raise NotImplementedError
+
+    def is_waiting(self, user_id):
+        raise NotImplementedError
+
+    def keep_waiting(self, user_id):
+        """Keep the user waiting as their lobby page asks for a pair,
+        and return whether they are still waiting"""
+        raise NotImplementedError
+
+
+class InProcessMatchmaker(BaseMatchmaker):
+    """Pairs the users waiting in this process. The waiting users are kept by
+    rating band, and as users within the band of each other are paired when
+    they join, there is at most one user in each band"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        # the (user_id, rating) waiting in each band, and the band of each user
+        self.bands = {}
+        self.waiting = {}
+        # the time each user's lobby page last asked for a pair
+        self.polled = {}
+
+    def join(self, user_id, rating):
+        band = int(rating // self.band)
+        with self.lock:
+            self.expire()
+            if user_id in self.waiting:
+                return None
+            # a user within the band is in the same band or one next to it
+            candidates = [
+                (abs(waiting_rating - rating), waiting_id)
+                for waiting_id, waiting_rating in (
+                    self.bands[nearby]
+                    for nearby in (band - 1, band, band + 1)
+                    if nearby in self.bands
+                )
+                if abs(waiting_rating - rating) <= self.band
+            ]
+            if not candidates:
+                self.bands[band] = (user_id, rating)
+                self.waiting[user_id] = band
+                self.polled[user_id] = time.monotonic()
+                return None
+            _, opponent_id = min(candidates)
+            self.remove(opponent_id)
+            return opponent_id
+
+    def expire(self):
+        """Remove the users whose page has stopped asking for a pair,
+        the lock must be held"""
+        cutoff = time.monotonic() - self.timeout
+        for user_id, polled in list(self.polled.items()):
+            if polled < cutoff:
+                self.remove(user_id)
+
+    def remove(self, user_id):
+        del self.bands[self.waiting.pop(user_id)]
+        del self.polled[user_id]
+
+    def leave(self, user_id):
+        with self.lock:
+            if user_id in self.waiting:
+                self.remove(user_id)
+
+    def is_waiting(self, user_id):
+        return (
+            self.polled.get(user_id, -self.timeout) >= time.monotonic() - self.timeout
+        )
+
+    def keep_waiting(self, user_id):
+        with self.lock:
+            if not self.is_waiting(user_id):
+                return False
+            self.polled[user_id] = time.monotonic()
+            return True
+
+
+class DatabaseMatchmaker(BaseMatchmaker):
+    """Pairs the users waiting in the WaitingPlayer table, which is shared by every
+    process. The nearest ratings above and below a user's are each read with
+    an index seek, and a pair is only made by the join that deletes both rows"""
+
+    PAIR_ATTEMPTS = 3
+
+    def cutoff(self):
+        """Return the time before which a user's page has stopped asking for a pair"""
+        return timezone.now() - timedelta(seconds=self.timeout)
+
+    def join(self, user_id, rating):
+        # the users who have stopped waiting are deleted, so the queue stays short
+        WaitingPlayer.objects.filter(joined_date__lt=self.cutoff()).delete()
+        # the user's row is saved before looking for an opponent, so of two users
+        # joining at the same time at least one finds the other
+        _, created = WaitingPlayer.objects.get_or_create(
+            user_id=user_id, defaults={"rating": rating}
+        )
+        if not created:
+            return None
+        skipped = set()
+        for _ in range(self.PAIR_ATTEMPTS):
+            opponent_id = self.nearest(user_id, rating, skipped)
+            if opponent_id is None:
+                return None
+            with transaction.atomic():
+                # rows locked by a pairing in another process are skipped
+                locked = set(
+                    WaitingPlayer.objects.select_for_update(skip_locked=True)
+                    .filter(pk__in=[user_id, opponent_id])
+                    .values_list("pk", flat=True)
+                )
+                if user_id not in locked:
+                    # the user has been paired by someone else
+                    return None
+                if opponent_id in locked:
+                    deleted, _ = WaitingPlayer.objects.filter(
+                        pk__in=[user_id, opponent_id]
+                    ).delete()
+                    if deleted == 2:
+                        return opponent_id
+                    # a row was deleted after it was read, so neither user is paired
+                    transaction.set_rollback(True)
+                    return None
+            skipped.add(opponent_id)
+        return None
+
+    def nearest(self, user_id, rating, skipped):
+        """Return the id of the waiting user with the rating nearest the user's"""
+        waiting = WaitingPlayer.objects.filter(joined_date__gte=self.cutoff()).exclude(
+            pk__in=[user_id, *skipped]
+        )
+        above = waiting.filter(
+            rating__gte=rating, rating__lte=rating + self.band
+        ).order_by("rating")
+        below = waiting.filter(
+            rating__lt=rating, rating__gte=rating - self.band
+        ).order_by("-rating")
+        candidates = [
+            (abs(waiting_rating - rating), waiting_id)
+            for nearby in (above, below)
+            for waiting_id, waiting_rating in nearby.values_list("pk", "rating")[:1]
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def leave(self, user_id):
+        WaitingPlayer.objects.filter(pk=user_id).delete()
+
+    def is_waiting(self, user_id):
+        return WaitingPlayer.objects.filter(
+            pk=user_id, joined_date__gte=self.cutoff()
+        ).exists()
+
+    def keep_waiting(self, user_id):
+        updated = WaitingPlayer.objects.filter(
+            pk=user_id, joined_date__gte=self.cutoff()
+        ).update(joined_date=timezone.now())
+        return updated == 1
+
+
+@lru_cache(maxsize=None)
+def get_matchmaker():
+    return import_string(settings.GAMES_MATCHMAKER)()
+
+
+@receiver(setting_changed)
+def reset_matchmaker(*, setting, **kwargs):
+    if setting in {
+        "GAMES_MATCHMAKER",
+        "GAMES_MATCHMAKING_BAND",
+        "GAMES_MATCHMAKING_TIMEOUT",
+    }:
+        get_matchmaker.cache_clear()
+
+
+def find_game(user):
+    """Add the user to the lobby, and return the game created for them
+    if they are paired with a waiting opponent"""
+    rating = (
+        PlayerStats.objects.filter(user=user).values_list("rating", flat=True).first()
+    )
+    opponent_id = get_matchmaker().join(
+        user.id, INITIAL_RATING if rating is None else rating
+    )
+    if opponent_id is None:
+        return None
+    # the opponent has waited longer, so they move first
+    game = Game.objects.create(player_1_id=opponent_id, player_2=user)
+    get_broker().publish(lobby_channel(opponent_id), {"url": game.get_absolute_url()})
+    return game
@@ -0,0 +1,197 @@
+import asyncio
+import contextvars
+import cProfile
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger("games.requests")
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """Serves the static files with WhiteNoise, which only handles sync requests.
+    Under ASGI a sync only middleware makes Django run the whole middleware chain and
+    the async views in its one thread for sync code, so a long poll would block every
+    other request of the worker. The files are found by a lookup in memory,
+    so they are served the same way in an async request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if asyncio.iscoroutinefunction(get_response):
+            # Django checks whether the middleware is async the same way as for
+            # MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+
+# the timing of the request being handled, as the requests handled concurrently by an
+# async worker share the database connection of its thread for sync code
+current_timing = contextvars.ContextVar("current_timing", default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    """The execute wrapper added to the database connections, which times the query
+    for the request it is made by"""
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+class RequestTiming:
+    """Records the queries made and the time spent on a request,
+    each query made while it is the current timing is timed by it"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.render_start = None
+        self.render_time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_start
+
+    def server_timing(self, total_time):
+        return ", ".join(
+            [
+                f'db;desc="{self.queries} queries";dur={self.db_time * 1e3:.1f}',
+                f"template;dur={self.render_time * 1e3:.1f}",
+                f"total;dur={total_time * 1e3:.1f}",
+            ]
+        )
+
+
+class RequestTimingMiddleware(MiddlewareMixin):
+    """Records the number of queries, the database time, the template render time
+    and the total time of each request. These are sent in the Server-Timing header
+    and logged with the URL name, with a warning when a view makes more queries than
+    its budget in the GAMES_QUERY_BUDGETS setting.
+    It is only used when the GAMES_REQUEST_TIMING setting is on"""
+
+    def __init__(self, get_response):
+        if not settings.GAMES_REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        request.timing = RequestTiming()
+        current_timing.set(request.timing)
+        for connection in connections.all():
+            if time_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(time_query)
+
+    def process_template_response(self, request, response):
+        request.timing.render_start = time.perf_counter()
+        response.add_post_render_callback(request.timing.rendered)
+        return response
+
+    def process_response(self, request, response):
+        timing = getattr(request, "timing", None)
+        if timing is None:
+            return response
+        current_timing.set(None)
+
+        total_time = time.perf_counter() - timing.start
+        response["Server-Timing"] = timing.server_timing(total_time)
+
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        logger.info(
+            "url_name=%s method=%s status=%s queries=%d db_ms=%.1f template_ms=%.1f "
+            "total_ms=%.1f",
+            url_name,
+            request.method,
+            response.status_code,
+            timing.queries,
+            timing.db_time * 1e3,
+            timing.render_time * 1e3,
+            total_time * 1e3,
+            extra={
+                "url_name": url_name,
+                "queries": timing.queries,
+                "db_ms": timing.db_time * 1e3,
+                "template_ms": timing.render_time * 1e3,
+                "total_ms": total_time * 1e3,
+            },
+        )
+        budget = settings.GAMES_QUERY_BUDGETS.get(url_name)
+        if budget is not None and timing.queries > budget:
+            logger.warning(
+                "%s made %d queries, over its budget of %d",
+                url_name,
+                timing.queries,
+                budget,
+            )
+        return response
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """Runs a request under cProfile when a staff user asks for it with the profile
+    query parameter or the X-Profile header, for finding out why a page is slow.
+    The profile is written to the GAMES_PROFILE_DIR directory, which keeps the most
+    recent GAMES_PROFILE_KEEP profiles, and is named in the X-Profile response header.
+    It is only used when GAMES_PROFILE_DIR is set"""
+
+    def __init__(self, get_response):
+        if not settings.GAMES_PROFILE_DIR:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # the user is only read from the session for the requests asking for a profile
+        if "profile" not in request.GET and "HTTP_X_PROFILE" not in request.META:
+            return None
+        if request.user.is_staff:
+            request.profile = cProfile.Profile()
+            request.profile.enable()
+        return None
+
+    def process_response(self, request, response):
+        profile = getattr(request, "profile", None)
+        if profile is None:
+            return response
+        profile.disable()
+        response["X-Profile"] = self.save_profile(profile, request)
+        return response
+
+    def save_profile(self, profile, request):
+        directory = settings.GAMES_PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        # named by time so the oldest sort first
+        filename = f"{time.time_ns()}-{url_name}.prof"
+        profile.dump_stats(os.path.join(directory, filename))
+
+        profiles = sorted(
+            name for name in os.listdir(directory) if name.endswith(".prof")
+        )
+        for name in profiles[: -settings.GAMES_PROFILE_KEEP]:
+            os.remove(os.path.join(directory, name))
+        return filename
@@ -0,0 +1,69 @@
+# Generated by Django 3.2 on 2026-10-17 15:53
+
+import string
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import migrations, models
+
+import games.models
+
+MOVE_CHARACTERS = string.digits + string.ascii_lowercase
+
+
+def backfill_board_state(apps, schema_editor):
+    """Store each game's coins, in the order they were played, on the game"""
+    Game = apps.get_model("games", "Game")
+    Coin = apps.get_model("games", "Coin")
+    coins = (
+        Coin.objects.order_by("game_id", "created_date", "id")
+        .values_list("game_id", "column")
+        .iterator()
+    )
+    updated = []
+    for game_id, game_coins in groupby(coins, key=itemgetter(0)):
+        columns = [column for _, column in game_coins]
+        heights = [0] * settings.CONNECT_FOUR_COLUMNS
+        for column in columns:
+            heights[column] += 1
+        updated.append(
+            Game(
+                id=game_id,
+                moves="".join(MOVE_CHARACTERS[column] for column in columns),
+                heights=heights,
+                move_count=len(columns),
+            )
+        )
+        if len(updated) == 1000:
+            Game.objects.bulk_update(updated, ["moves", "heights", "move_count"])
+            updated = []
+    Game.objects.bulk_update(updated, ["moves", "heights", "move_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0002_update_game_verbose_name_and_auto_add_now"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="heights",
+            field=models.JSONField(default=games.models.empty_heights, editable=False),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="move_count",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="moves",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(backfill_board_state, migrations.RunPython.noop),
+    ]
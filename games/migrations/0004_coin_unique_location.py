@@ -0,0 +1,59 @@
+# Generated by Django 3.2 on 2026-10-17 15:58
+
+import string
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+MOVE_CHARACTERS = string.digits + string.ascii_lowercase
+
+
+def delete_duplicate_coins(apps, schema_editor):
+    """The unique location wasn't enforced, so keep the first coin in each location
+    and store the board of the games that had duplicates again"""
+    Game = apps.get_model("games", "Game")
+    Coin = apps.get_model("games", "Coin")
+    duplicates = (
+        Coin.objects.values("game_id", "column", "row")
+        .annotate(first_id=Min("id"), coin_count=Count("id"))
+        .filter(coin_count__gt=1)
+    )
+    game_ids = set()
+    for duplicate in duplicates.iterator():
+        Coin.objects.filter(
+            game_id=duplicate["game_id"],
+            column=duplicate["column"],
+            row=duplicate["row"],
+        ).exclude(id=duplicate["first_id"]).delete()
+        game_ids.add(duplicate["game_id"])
+
+    for game in Game.objects.filter(id__in=game_ids):
+        columns = list(
+            Coin.objects.filter(game_id=game.id)
+            .order_by("created_date", "id")
+            .values_list("column", flat=True)
+        )
+        game.moves = "".join(MOVE_CHARACTERS[column] for column in columns)
+        game.heights = [
+            columns.count(column) for column in range(settings.CONNECT_FOUR_COLUMNS)
+        ]
+        game.move_count = len(columns)
+        game.save(update_fields=["moves", "heights", "move_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0003_game_board_state"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_coins, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="coin",
+            constraint=models.UniqueConstraint(
+                fields=("game", "column", "row"), name="unique_coin_location"
+            ),
+        ),
+    ]
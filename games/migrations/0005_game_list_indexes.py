@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0004_coin_unique_location"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["player_1", "status", "created_date"],
+                name="game_player_1_list_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["player_2", "status", "created_date"],
+                name="game_player_2_list_idx",
+            ),
+        ),
+    ]
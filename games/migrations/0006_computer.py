@@ -0,0 +1,72 @@
+# Generated by Django 3.2 on 2026-10-17 17:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def create_computers(apps, schema_editor):
+    """Create a computer user to play against at each difficulty"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Computer = apps.get_model("games", "Computer")
+    for difficulty in DIFFICULTIES:
+        user, _ = User.objects.get_or_create(
+            username=f"Computer-{difficulty.title()}",
+            defaults={"first_name": "Computer", "password": "!"},
+        )
+        Computer.objects.get_or_create(user=user, defaults={"difficulty": difficulty})
+
+
+def delete_computers(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    User.objects.filter(
+        username__in=[f"Computer-{difficulty.title()}" for difficulty in DIFFICULTIES]
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("games", "0005_game_list_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Computer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "difficulty",
+                    models.CharField(
+                        choices=[
+                            ("easy", "Easy"),
+                            ("medium", "Medium"),
+                            ("hard", "Hard"),
+                        ],
+                        default="medium",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="computer",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_computers, delete_computers),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2 on 2026-10-17 17:43
+
+import django.core.validators
+from django.db import migrations, models
+
+import games.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0006_computer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="columns",
+            field=models.PositiveSmallIntegerField(
+                default=games.models.default_columns,
+                validators=[
+                    django.core.validators.MinValueValidator(3),
+                    django.core.validators.MaxValueValidator(15),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="connect",
+            field=models.PositiveSmallIntegerField(
+                default=games.models.default_connect,
+                help_text="The number of coins in a line to win",
+                validators=[
+                    django.core.validators.MinValueValidator(3),
+                    django.core.validators.MaxValueValidator(15),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="rows",
+            field=models.PositiveSmallIntegerField(
+                default=games.models.default_rows,
+                validators=[
+                    django.core.validators.MinValueValidator(3),
+                    django.core.validators.MaxValueValidator(15),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="coin",
+            name="column",
+            field=models.IntegerField(
+                validators=[django.core.validators.MinValueValidator(0)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="coin",
+            name="row",
+            field=models.IntegerField(
+                validators=[django.core.validators.MinValueValidator(0)]
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-17 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("games", "0007_game_board_size"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlayerStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="auth.user",
+                    ),
+                ),
+                ("played", models.PositiveIntegerField(default=0)),
+                ("wins", models.PositiveIntegerField(default=0)),
+                ("losses", models.PositiveIntegerField(default=0)),
+                ("draws", models.PositiveIntegerField(default=0)),
+                (
+                    "streak",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The number of wins in a row up to the last game",
+                    ),
+                ),
+                ("best_streak", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "player stats",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="playerstats",
+            index=models.Index(
+                fields=["-wins", "losses", "user"], name="stats_leaderboard_idx"
+            ),
+        ),
+    ]
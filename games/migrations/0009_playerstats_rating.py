@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-17 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0008_playerstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playerstats",
+            name="rating",
+            field=models.FloatField(default=1200.0),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(fields=["created_date", "id"], name="game_created_idx"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-17 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("games", "0009_playerstats_rating"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WaitingPlayer",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="auth.user",
+                    ),
+                ),
+                ("rating", models.FloatField(db_index=True)),
+                ("joined_date", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
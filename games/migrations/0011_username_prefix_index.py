@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations
+
+INDEX_NAME = "games_username_prefix_idx"
+
+
+def create_index(apps, schema_editor):
+    """Index the usernames for the opponent search's case insensitive prefix
+    lookup, which postgres only reads from an index with the pattern operators"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    table = schema_editor.quote_name(User._meta.db_table)
+    schema_editor.execute(
+        f"CREATE INDEX {INDEX_NAME} ON {table} "
+        '(UPPER("username"::text) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("games", "0010_waitingplayer"),
+    ]
+
+    operations = [migrations.RunPython(create_index, drop_index)]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2 on 2026-10-17 19:05
+
+from django.db import migrations
+
+from games.ratings import INITIAL_RATING, new_rating
+
+BATCH_SIZE = 5000
+
+
+def add_result(stats, score, opponent_rating):
+    """PlayerStats.add_result, as the migration's models don't have its methods"""
+    stats.played += 1
+    if score == 1:
+        stats.wins += 1
+        stats.streak += 1
+        stats.best_streak = max(stats.best_streak, stats.streak)
+    else:
+        stats.streak = 0
+        if score == 0:
+            stats.losses += 1
+        else:
+            stats.draws += 1
+    stats.rating = new_rating(stats.rating, opponent_rating, score)
+
+
+def backfill_stats(apps, schema_editor):
+    """Replay the games that ended before the stats were kept, in the order they
+    were created, as the rebuild_stats command does"""
+    Game = apps.get_model("games", "Game")
+    PlayerStats = apps.get_model("games", "PlayerStats")
+    games = (
+        Game.objects.filter(status__in=["C", "D"])
+        .order_by("created_date", "pk")
+        .values_list("player_1_id", "player_2_id", "winner_id")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    stats = {}
+    for player_1_id, player_2_id, winner_id in games:
+        for player_id in (player_1_id, player_2_id):
+            if player_id not in stats:
+                stats[player_id] = PlayerStats(user_id=player_id, rating=INITIAL_RATING)
+        stats_1, stats_2 = stats[player_1_id], stats[player_2_id]
+        score = 0.5 if winner_id is None else float(winner_id == player_1_id)
+        rating_1 = stats_1.rating
+        add_result(stats_1, score, stats_2.rating)
+        add_result(stats_2, 1 - score, rating_1)
+    PlayerStats.objects.all().delete()
+    PlayerStats.objects.bulk_create(stats.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0011_username_prefix_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,40 @@
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import F, IntegerField, Max, Value
-from django.db.models.functions import Cast, Coalesce
+from django.db import IntegrityError, models, transaction
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
-from .utils import Direction
+from .broker import game_channel, get_broker
+from .engine import computer_move
+from .ratings import INITIAL_RATING, new_rating
+from .utils import Bitboard, Direction, encode_moves
+
+
+def empty_heights():
+    return [0] * settings.CONNECT_FOUR_COLUMNS
+
+
+def default_rows():
+    return settings.CONNECT_FOUR_ROWS
+
+
+def default_columns():
+    return settings.CONNECT_FOUR_COLUMNS
+
+
+def default_connect():
+    return settings.CONNECT_FOUR_CONNECT
+
+
+# the moves of a board this size fit in the 255 characters of Game.moves
+MAX_BOARD_SIZE = 15
+BOARD_SIZE_VALIDATORS = [MinValueValidator(3), MaxValueValidator(MAX_BOARD_SIZE)]
 
 
 class Game(models.Model):
@@ -32,14 +57,50 @@ class Game(models.Model):
         User, on_delete=models.CASCADE, related_name="winner", blank=True, null=True
     )
     created_date = models.DateTimeField(auto_now_add=True)
+    # the board is stored on the game so it can be shown without querying the coins
+    moves = models.CharField(max_length=255, blank=True, default="", editable=False)
+    heights = models.JSONField(default=empty_heights, editable=False)
+    move_count = models.PositiveSmallIntegerField(default=0, editable=False)
+    rows = models.PositiveSmallIntegerField(
+        default=default_rows, validators=BOARD_SIZE_VALIDATORS
+    )
+    columns = models.PositiveSmallIntegerField(
+        default=default_columns, validators=BOARD_SIZE_VALIDATORS
+    )
+    connect = models.PositiveSmallIntegerField(
+        default=default_connect,
+        validators=BOARD_SIZE_VALIDATORS,
+        help_text=_("The number of coins in a line to win"),
+    )
+
+    class Meta:
+        # each player's games are listed by status and then newest first
+        indexes = [
+            models.Index(
+                fields=["player_1", "status", "created_date"],
+                name="game_player_1_list_idx",
+            ),
+            models.Index(
+                fields=["player_2", "status", "created_date"],
+                name="game_player_2_list_idx",
+            ),
+            # finished games are replayed in order to rebuild the stats
+            models.Index(fields=["created_date", "id"], name="game_created_idx"),
+        ]
 
-    COLUMNS = [i for i in range(settings.CONNECT_FOUR_COLUMNS)]
     DIRECTIONS = [
         Direction(col="+"),
         Direction(row="+"),
         Direction(row="+", col="+"),
         Direction(row="+", col="-"),
     ]
+    BOARD_FIELDS = ["status", "winner", "moves", "heights", "move_count"]
+    MOVE_ATTEMPTS = 3
+    # seconds the game version is cached for, so a cache that isn't shared
+    # between processes is only out of date for a short time
+    VERSION_CACHE_TIMEOUT = 60
+    # seconds the rendered board and header of a move are cached for
+    FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
 
     def __str__(self):
         return f"{self.created_date.strftime('%d/%m/%Y')} {self.player_1} vs {self.player_2}: {self.status}"
@@ -47,6 +108,32 @@ class Game(models.Model):
     def get_absolute_url(self):
         return reverse("game_detail", kwargs={"pk": self.pk})
 
+    def clean(self):
+        super().clean()
+        if self.connect > max(self.rows, self.columns):
+            raise ValidationError(
+                {"connect": _("A line this long doesn't fit on the board.")}
+            )
+
+    def save(self, *args, **kwargs):
+        if not self.moves and len(self.heights) != self.columns:
+            # the default heights are for the default number of columns
+            self.heights = [0] * self.columns
+        super().save(*args, **kwargs)
+        # a game changed outside of a move, e.g. in the admin, is cached again when read
+        version_key = self.version_cache_key(self.pk)
+        transaction.on_commit(lambda: cache.delete(version_key))
+
+    @property
+    def is_connect_four(self):
+        """Check whether the game is played with the rules of the engine and book,
+        a line of 4 wins on any size of board"""
+        return self.connect == 4
+
+    @property
+    def column_numbers(self):
+        return range(self.columns)
+
     def opponent(self, user_id):
         return f"{self.player_2 if user_id == self.player_1_id else self.player_1}"
 
@@ -100,12 +187,7 @@ class Game(models.Model):
         """Return the list of columns where a coin can enter,
         this is the columns where there isn't a coin in the last row"""
         return [
-            column
-            for column in self.COLUMNS
-            if column
-            not in self.coins.filter(row=settings.CONNECT_FOUR_ROWS - 1).values_list(
-                "column", flat=True
-            )
+            column for column, height in enumerate(self.heights) if height < self.rows
         ]
 
     @cached_property
@@ -128,6 +210,54 @@ class Game(models.Model):
             )
         }
 
+    @cached_property
+    def bitboard(self):
+        """Return the moves as a bitboard, used to check for a connect four"""
+        return Bitboard.from_moves(
+            self.moves, rows=self.rows, columns=self.columns, connect=self.connect
+        )
+
+    def board_at(self, ply):
+        """Return the board after the first ply moves, which is rebuilt from the
+        moves rather than by reading the coins"""
+        return Bitboard.from_moves(
+            self.moves[:ply], rows=self.rows, columns=self.columns, connect=self.connect
+        )
+
+    @staticmethod
+    def version_cache_key(game_id):
+        return f"game-version-{game_id}"
+
+    @classmethod
+    def get_cached_version(cls, game_id):
+        """Return the cached (player_1_id, player_2_id, move_count, status) of the game,
+        or None if it isn't cached"""
+        return cache.get(cls.version_cache_key(game_id))
+
+    def cache_version(self, replace=True):
+        """Cache the players, the move count and the status, which are the version of
+        the game as the move count goes up with every move, so a poll can be answered
+        without a query. A game read before a move was made shouldn't replace the
+        version of the move"""
+        (cache.set if replace else cache.add)(
+            self.version_cache_key(self.pk),
+            (self.player_1_id, self.player_2_id, self.move_count, self.status),
+            self.VERSION_CACHE_TIMEOUT,
+        )
+
+    def fragment_cache_keys(self, move_count, status, winner_id=None):
+        """Return the cache keys of the board and the players' headers rendered
+        by game_detail.html for the move count and the outcome"""
+        return [
+            make_template_fragment_key("game_board", [self.pk, move_count]),
+            *(
+                make_template_fragment_key(
+                    "game_header", [self.pk, move_count, status, winner_id, player_id]
+                )
+                for player_id in (self.player_1_id, self.player_2_id)
+            ),
+        ]
+
     def get_player_colour(self, user_id):
         if user_id == self.player_1_id:
             return "red"
@@ -155,99 +285,311 @@ class Game(models.Model):
 
     @cached_property
     def board_dict(self):
+        colours = {
+            None: self.get_player_colour(None),
+            0: self.get_player_colour(self.player_1_id),
+            1: self.get_player_colour(self.player_2_id),
+        }
         return {
             row: {
-                col: self.get_player_colour(self.coin_dict.get((row, col), None))
-                for col in range(settings.CONNECT_FOUR_COLUMNS)
+                col: colours[self.bitboard.get(row, col)]
+                for col in range(self.bitboard.columns)
             }
-            for row in reversed(range(settings.CONNECT_FOUR_ROWS))
+            for row in reversed(range(self.bitboard.rows))
         }
 
     def calculate_status(self):
-        """Checks the games coins to calculate the status.
+        """Checks the games moves to calculate the status.
         If the board is full, the game is a draw without a winner.
-        If there are 4 coins in a line, then the game is complete with a winner.
+        If there are connect coins in a line, then the game is complete with a winner.
         Otherwise, the game is in progress:
-            the player who didn't play the last coin is next determines the status
-            when no coins have been played, player_1 is next and determines the status
+            player_1 plays first, so is next when an even number of moves have been played
         """
 
-        # check whether the board is empty
-        if len(self.coin_dict) == 0:
-            return {"status": Game.Status.PLAYER_1}
-
-        # loop through the game's coins and check whether the coin is the first in a connect 4 sequence
-        for coordinate, player_id in self.coin_dict.items():
-            for direction in Game.DIRECTIONS:
-                if direction.connect_four(coordinate, self.coin_dict):
-                    return {"status": Game.Status.COMPLETE, "winner_id": player_id}
+        # check whether either player's coins have a line of connect coins
+        winner = self.bitboard.winner()
+        if winner is not None:
+            return {
+                "status": Game.Status.COMPLETE,
+                "winner_id": (self.player_1_id, self.player_2_id)[winner],
+            }
 
         # as no winner, check whether the board is full
-        if (
-            len(self.coin_dict)
-            == settings.CONNECT_FOUR_ROWS * settings.CONNECT_FOUR_COLUMNS
-        ):
+        if self.bitboard.is_full():
             return {"status": Game.Status.DRAW}
 
-        # the player who didn't play the last coin is next determines the status
+        # player_1 is next after an even number of moves, otherwise player_2
         return {
             "status": Game.Status.PLAYER_2
-            if self.last_move.player == self.player_1
+            if self.move_count % 2
             else Game.Status.PLAYER_1
         }
 
-    def create_coin(self, user, column):
-        """Providing the column and user are valid, a coin is created in the 'dropped' coin location.
-        Then the game is updated with the new status and returns whether the game is complete"""
+    def calculate_move_status(self, row, column):
+        """Calculates the status after the coin at (row, column) was played.
+        Only the lines through this coin are checked for connect coins in a line,
+        so the rest of the board must not already contain a winner.
+        The board is full when every move has been played.
+        """
+        player = self.bitboard.get(row, column)
+        if self.bitboard.connect_four_at(row, column, player):
+            return {
+                "status": Game.Status.COMPLETE,
+                "winner_id": (self.player_1_id, self.player_2_id)[player],
+            }
 
-        if user not in {self.player_1, self.player_2}:
-            raise ValueError("User is not part of the game")
+        if self.bitboard.is_full():
+            return {"status": Game.Status.DRAW}
 
-        valid_status = {
-            self.player_1: Game.Status.PLAYER_1,
-            self.player_2: Game.Status.PLAYER_2,
-        }
-        if valid_status[user] != self.status:
+        return {"status": Game.Status.PLAYER_2 if player == 0 else Game.Status.PLAYER_1}
+
+    def lock_board(self):
+        """Lock the game until the end of the transaction and reload the board,
+        as another move may have been made since the game was loaded"""
+        values = (
+            Game.objects.select_for_update()
+            .values_list(*self.BOARD_FIELDS)
+            .get(pk=self.pk)
+        )
+        for field, value in zip(self.BOARD_FIELDS, values):
+            setattr(self, self._meta.get_field(field).attname, value)
+        for board_property in ("bitboard", "available_columns", "board_dict"):
+            self.__dict__.pop(board_property, None)
+
+    def play_coin(self, user, player, column):
+        """Create the coin and update the board, the board must be locked"""
+        if (Game.Status.PLAYER_1, Game.Status.PLAYER_2)[player] != self.status:
             raise ValueError(f"It is not {user}'s turn!")
 
         if column not in self.available_columns:
             raise ValueError("Column is filled!")
 
-        row = (
-            self.coins.filter(column=column)
-            .annotate(next_row=Cast(F("row") + 1, IntegerField()))
-            .aggregate(col_next_row=Coalesce(Max("next_row"), Value(0)))
-            .get("col_next_row", 0)
+        row = self.bitboard.play(column, player)
+        Coin.objects.create(game=self, player=user, column=column, row=row)
+
+        self.moves += encode_moves([column])
+        self.heights[column] += 1
+        self.move_count += 1
+
+        # calculate the game status from the new coin and save the result
+        self.__dict__.update(self.calculate_move_status(row, column))
+        self.save(update_fields=self.BOARD_FIELDS)
+        if not self.is_pending:
+            PlayerStats.record_game(self)
+
+        # tell the open game pages about the move once it is saved
+        message = {"status": self.status, "move_count": self.move_count}
+        transaction.on_commit(
+            lambda: get_broker().publish(game_channel(self.pk), message)
         )
+        transaction.on_commit(self.cache_version)
+        # the previous move's rendered board is no longer shown
+        previous_status = (Game.Status.PLAYER_1, Game.Status.PLAYER_2)[player]
+        fragment_keys = self.fragment_cache_keys(self.move_count - 1, previous_status)
+        transaction.on_commit(lambda: cache.delete_many(fragment_keys))
 
-        Coin.objects.create(game=self, player=user, column=column, row=row)
+    def create_coin(self, user, column):
+        """Providing the column and user are valid, a coin is created in the 'dropped' coin location.
+        Then the game is updated with the new status and returns whether the game is complete.
+        The game is locked while the move is made, which takes three queries:
+        locking and reading the board, creating the coin and updating the game.
+        A move ending the game also reads and writes its players' stats"""
 
-        # recalculate the game status and save the result
-        self.__dict__.update(self.calculate_status())
-        self.save()
+        player_ids = [self.player_1_id, self.player_2_id]
+        if user.id not in player_ids:
+            raise ValueError("User is not part of the game")
+        player = player_ids.index(user.id)
+
+        for attempt in range(1, self.MOVE_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    self.lock_board()
+                    self.play_coin(user, player, column)
+                break
+            except IntegrityError:
+                # the location was taken by a coin created without the game lock,
+                # so reload the board and check whether the move is still valid
+                if attempt == self.MOVE_ATTEMPTS:
+                    raise
 
         # return whether the game is over
         return self.status in {Game.Status.COMPLETE, Game.Status.DRAW}
 
+    def play_computer_move(self):
+        """If it is a computer's turn, its column is chosen by the engine
+        and played the same way as a user's move. Returns whether a move was played"""
+        if not self.is_pending or not self.is_connect_four:
+            return False
+        player = 0 if self.status == Game.Status.PLAYER_1 else 1
+        player_id = (self.player_1_id, self.player_2_id)[player]
+        computer = (
+            Computer.objects.select_related("user").filter(user_id=player_id).first()
+        )
+        if computer is None:
+            return False
+        column = computer_move(
+            self.bitboard,
+            player,
+            computer.difficulty,
+            settings.CONNECT_FOUR_COMPUTER_TIME_LIMIT,
+        )
+        self.create_coin(computer.user, column)
+        return True
+
+
+class Computer(models.Model):
+    """A user whose moves are chosen by the engine"""
+
+    class Difficulty(models.TextChoices):
+        EASY = "easy", _("Easy")
+        MEDIUM = "medium", _("Medium")
+        HARD = "hard", _("Hard")
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="computer")
+    difficulty = models.CharField(
+        max_length=10, choices=Difficulty.choices, default=Difficulty.MEDIUM
+    )
+
+    def __str__(self):
+        return f"{self.user} ({self.get_difficulty_display()})"
+
+
+class PlayerStats(models.Model):
+    """A user's results, which are updated as each of their games ends
+    so the leaderboard is read without counting their games"""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    streak = models.PositiveIntegerField(
+        default=0, help_text=_("The number of wins in a row up to the last game")
+    )
+    best_streak = models.PositiveIntegerField(default=0)
+    rating = models.FloatField(default=INITIAL_RATING)
+
+    class Meta:
+        verbose_name_plural = "player stats"
+        # the leaderboard is read in this order from the index
+        indexes = [
+            models.Index(
+                fields=["-wins", "losses", "user"], name="stats_leaderboard_idx"
+            )
+        ]
+
+    LEADERBOARD_ORDERING = ("-wins", "losses", "user")
+    RESULT_FIELDS = [
+        "played",
+        "wins",
+        "losses",
+        "draws",
+        "streak",
+        "best_streak",
+        "rating",
+    ]
+
+    def __str__(self):
+        return f"{self.user}: {self.wins} won, {self.losses} lost, {self.draws} drawn"
+
+    def add_result(self, score, opponent_rating):
+        """Add a game with the score 1 for a win, 0.5 for a draw or 0 for a loss
+        against an opponent with the rating"""
+        self.played += 1
+        if score == 1:
+            self.wins += 1
+            self.streak += 1
+            self.best_streak = max(self.best_streak, self.streak)
+        else:
+            self.streak = 0
+            if score == 0:
+                self.losses += 1
+            else:
+                self.draws += 1
+        self.rating = new_rating(self.rating, opponent_rating, score)
+
+    @staticmethod
+    def add_game(stats_1, stats_2, winner_id):
+        """Add a game between the players to both of their stats"""
+        score = 0.5 if winner_id is None else float(winner_id == stats_1.user_id)
+        rating_1 = stats_1.rating
+        stats_1.add_result(score, stats_2.rating)
+        stats_2.add_result(1 - score, rating_1)
+
+    @classmethod
+    def record_game(cls, game):
+        """Add the result of the game, which has just ended, to its players' stats.
+        The stats are locked while they are updated, so games ending at the same time
+        don't overwrite each other's results. They are read in one query and written
+        in one more, as well as being created on a player's first game"""
+        player_ids = [game.player_1_id, game.player_2_id]
+        # lock the rows in the same order in every game, so games don't deadlock
+        locked = {
+            stats.user_id: stats
+            for stats in cls.objects.select_for_update()
+            .filter(user_id__in=player_ids)
+            .order_by("user")
+        }
+        players = [
+            locked.get(player_id) or cls(user_id=player_id) for player_id in player_ids
+        ]
+        cls.add_game(*players, game.winner_id)
+        # two first games of a player ending at the same time raise an IntegrityError,
+        # so the move is made again and updates the stats created by the other game
+        cls.objects.bulk_create(stats for stats in players if stats._state.adding)
+        cls.objects.bulk_update(
+            [stats for stats in players if not stats._state.adding], cls.RESULT_FIELDS
+        )
+
+    @staticmethod
+    def rating_of(user):
+        """Return the user's rating, from the stats selected with the user"""
+        stats = getattr(user, "stats", None)
+        return round(stats.rating if stats else INITIAL_RATING)
+
+
+class WaitingPlayer(models.Model):
+    """A user waiting in the lobby to be paired with an opponent,
+    used by the DatabaseMatchmaker so every process pairs from one queue"""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    # the nearest ratings above and below a user's are read from the index
+    rating = models.FloatField(db_index=True)
+    # refreshed each time the user's lobby page asks for a pair
+    joined_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} ({round(self.rating)})"
+
 
 class Coin(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="coins")
     player = models.ForeignKey(User, on_delete=models.CASCADE)
-    column = models.IntegerField(
-        validators=[
-            MinValueValidator(0),
-            MaxValueValidator(settings.CONNECT_FOUR_COLUMNS - 1),
-        ]
-    )
-    row = models.IntegerField(
-        validators=[
-            MinValueValidator(0),
-            MaxValueValidator(settings.CONNECT_FOUR_ROWS - 1),
-        ]
-    )
+    # the maximum column and row depend on the game's board, so are checked in clean
+    column = models.IntegerField(validators=[MinValueValidator(0)])
+    row = models.IntegerField(validators=[MinValueValidator(0)])
     created_date = models.DateTimeField(auto_now_add=True)
 
-    unique_together = ["game", "column", "row"]
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["game", "column", "row"], name="unique_coin_location"
+            )
+        ]
 
     def __str__(self):
         return f"{self.player} to ({self.row}, {self.column})"
+
+    def clean(self):
+        super().clean()
+        errors = {}
+        if self.column is not None and self.column >= self.game.columns:
+            errors["column"] = _("The board has %(columns)d columns.") % {
+                "columns": self.game.columns
+            }
+        if self.row is not None and self.row >= self.game.rows:
+            errors["row"] = _("The board has %(rows)d rows.") % {"rows": self.game.rows}
+        if errors:
+            raise ValidationError(errors)
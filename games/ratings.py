@@ -0,0 +1,15 @@
+# Elo ratings, where a player's rating moves by how much their score in a game
+# beats the score expected from their rating and their opponent's
+INITIAL_RATING = 1200.0
+# the most a rating changes by in one game
+K_FACTOR = 32
+
+
+def expected_score(rating, opponent_rating):
+    """Return the expected score of the player, from 0 for a loss to 1 for a win"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def new_rating(rating, opponent_rating, score):
+    """Return the player's rating after a game with the score 1, 0.5 or 0"""
+    return rating + K_FACTOR * (score - expected_score(rating, opponent_rating))
@@ -1,9 +1,11 @@
 let $script = $('#gameDetailScript');
 let checkTurn = $script.data("check-turn");
-let checkTurnURL = $script.data("check-turn-url");
+let turnEventsURL = $script.data("turn-events-url");
+let moveCount = $script.data("move-count");
+let hintURL = $script.data("hint-url");
 
 if (checkTurn) {
-    checkUsersTurn();
+    waitForTurn();
 }
 
 $('th.play-row').on('click', function(){
@@ -11,17 +13,51 @@ $('th.play-row').on('click', function(){
     window.location.href = url;
 })
 
-function checkUsersTurn() {
+$('#hintButton').on('click', function(){
+    $(this).prop('disabled', true);
+    getHint();
+})
+
+function getHint() {
+    // the hint is searched for on the server, so ask until it has been found
+    $.ajax({
+        url: hintURL,
+        type: 'GET',
+        dataType: 'json',
+        success: function(response, status, xhr) {
+            if (xhr.status === 202) {
+                setTimeout(getHint, 500);
+            } else {
+                $('thead th').eq(response.column).addClass('hint');
+            }
+        },
+        error: function(xhr) {
+            if (xhr.status === 503) {
+                setTimeout(getHint, 1000);
+            } else {
+                $('#hintButton').prop('disabled', false);
+            }
+        }
+    });
+}
+
+function waitForTurn() {
+    // the server replies when the opponent moves, or after a timeout to ask again
     $.ajax({
-        url: checkTurnURL,
+        url: turnEventsURL,
         type: 'GET',
+        data: {move_count: moveCount},
         dataType: 'json',
         success: function(response) {
             if (response.is_users_turn || response.is_game_over) {
                 window.location.reload();
             } else {
-                setTimeout(checkUsersTurn, 5000);
+                moveCount = response.move_count;
+                waitForTurn();
             }
+        },
+        error: function() {
+            setTimeout(waitForTurn, 5000);
         }
     });
 }
@@ -0,0 +1,28 @@
+let nextPageObserver = new IntersectionObserver(function(entries) {
+    entries.forEach(function(entry) {
+        if (entry.isIntersecting) {
+            nextPageObserver.unobserve(entry.target);
+            loadNextPage($(entry.target));
+        }
+    });
+});
+
+observeNextPage();
+
+function observeNextPage() {
+    $('#gameList .game-list-next').each(function() {
+        nextPageObserver.observe(this);
+    });
+}
+
+function loadNextPage($nextPage) {
+    $.ajax({
+        url: $nextPage.data("next-url"),
+        type: 'GET',
+        dataType: 'html',
+        success: function(response) {
+            $nextPage.replaceWith(response);
+            observeNextPage();
+        }
+    });
+}
@@ -0,0 +1,42 @@
+let replay = JSON.parse(document.getElementById('replayData').textContent);
+let colours = ['red', 'yellow'];
+
+// the row each move lands on, found by dropping the moves into the columns
+let heights = new Array(replay.columns).fill(0);
+let coins = replay.moves.map(function(column) {
+    return [heights[column]++, column];
+});
+let ply = coins.length;
+
+let $tbody = $('#replayBoard tbody');
+for (let row = replay.rows - 1; row >= 0; row--) {
+    let $row = $('<tr>').attr('data-row', row);
+    for (let col = 0; col < replay.columns; col++) {
+        $row.append($('<td>').attr('data-col', col).addClass('circle white'));
+    }
+    $tbody.append($row);
+}
+
+function showPly(newPly) {
+    ply = Math.max(0, Math.min(coins.length, newPly));
+    $tbody.find('td').removeClass('red yellow').addClass('white');
+    coins.slice(0, ply).forEach(function([row, col], move) {
+        $tbody.find(`tr[data-row=${row}] td[data-col=${col}]`)
+            .removeClass('white').addClass(colours[move % 2]);
+    });
+    $('#replayPly').text(`move ${ply} of ${coins.length}`);
+}
+
+$('#replayFirst').on('click', function() { showPly(0); });
+$('#replayPrevious').on('click', function() { showPly(ply - 1); });
+$('#replayNext').on('click', function() { showPly(ply + 1); });
+$('#replayLast').on('click', function() { showPly(coins.length); });
+$(document).on('keydown', function(event) {
+    if (event.key === 'ArrowLeft') {
+        showPly(ply - 1);
+    } else if (event.key === 'ArrowRight') {
+        showPly(ply + 1);
+    }
+});
+
+showPly(ply);
@@ -0,0 +1,26 @@
+let $script = $('#lobbyScript');
+let lobbyEventsURL = $script.data("lobby-events-url");
+let gameListURL = $script.data("game-list-url");
+
+waitForOpponent();
+
+function waitForOpponent() {
+    // the server replies when the user is paired, or after a timeout to ask again
+    $.ajax({
+        url: lobbyEventsURL,
+        type: 'GET',
+        dataType: 'json',
+        success: function(response) {
+            if (response.url) {
+                window.location.href = response.url;
+            } else if (!response.is_waiting) {
+                window.location.href = gameListURL;
+            } else {
+                waitForOpponent();
+            }
+        },
+        error: function() {
+            setTimeout(waitForOpponent, 5000);
+        }
+    });
+}
@@ -1,6 +1,8 @@
 from django import template
 from django.utils.safestring import mark_safe
 
+from games.models import PlayerStats
+
 register = template.Library()
 
 
@@ -9,6 +11,14 @@ def game_opponent(context, game):
     return game.opponent(user_id=context["request"].user.id)
 
 
+@register.simple_tag(takes_context=True)
+def game_opponent_rating(context, game):
+    user_id = context["request"].user.id
+    return PlayerStats.rating_of(
+        game.player_2 if user_id == game.player_1_id else game.player_1
+    )
+
+
 @register.simple_tag(takes_context=True)
 def game_coin(context, game):
     return game.get_player_coin_class(user_id=context["request"].user.id)
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from games.benchmarks import BENCHMARKS, WIN_CHECKS
+
+
+class BenchmarksTest(TestCase):
+    def test_benchmarks_run(self):
+        for name, setup in BENCHMARKS.items():
+            if name == "game_list_render[1000]":
+                continue
+            with self.subTest(name=name):
+                setup()()
+
+    def test_win_checks(self):
+        for name, setup in WIN_CHECKS.items():
+            with self.subTest(name=name):
+                self.assertIsNone(setup()(), msg="the boards don't have a winner")
+
+
+@mock.patch("games.management.commands.benchmark.teardown_databases")
+@mock.patch("games.management.commands.benchmark.setup_databases")
+class BenchmarkCommandTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline_path = os.path.join(directory.name, "benchmarks.json")
+        with open(self.baseline_path, "w") as baseline_file:
+            json.dump({"board_dict": 1e-5}, baseline_file)
+        for target, value in (
+            ("BASELINE_PATH", self.baseline_path),
+            ("BENCHMARKS", {"board_dict": mock.Mock()}),
+            ("WIN_CHECKS", {"direction[empty]": mock.Mock()}),
+        ):
+            patcher = mock.patch(f"games.management.commands.benchmark.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def call_command(self, seconds, *args):
+        out = StringIO()
+        with mock.patch(
+            "games.management.commands.benchmark.time_call", return_value=seconds
+        ):
+            call_command("benchmark", *args, stdout=out)
+        return out.getvalue()
+
+    def test_compare(self, *mocks):
+        output = self.call_command(1.2e-5)
+        self.assertEqual(output, "board_dict: 12.0 µs (+20% vs 10.0 µs)\n")
+
+    def test_regression(self, *mocks):
+        with self.assertRaisesMessage(
+            CommandError, "1 slower than the baseline: board_dict"
+        ):
+            self.call_command(2e-5)
+        self.call_command(2e-5, "--threshold", "1.5")
+
+    def test_save(self, *mocks):
+        self.call_command(2e-5, "--save")
+        with open(self.baseline_path) as baseline_file:
+            self.assertEqual(json.load(baseline_file), {"board_dict": 2e-5})
+
+    def test_own_cache(self, *mocks):
+        cache.set("site", 1)
+        with mock.patch.dict(
+            "games.management.commands.benchmark.BENCHMARKS",
+            {"board_dict": lambda: self.assertIsNone(cache.get("site"))},
+        ):
+            self.call_command(1e-5)
+        self.assertEqual(cache.get("site"), 1, msg="the site's cache isn't cleared")
+
+    def test_win_checks(self, *mocks):
+        output = self.call_command(2e-5, "--win-checks")
+        self.assertEqual(output, "direction[empty]: 20.0 µs\n", msg="no baseline")
+        with self.assertRaisesMessage(
+            CommandError, "The win checks don't have a baseline"
+        ):
+            self.call_command(2e-5, "--win-checks", "--save")
@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from games.book import Book, get_book, mirror, position_key, write_book
+from games.management.commands.solve_book import positions
+from games.utils import Bitboard
+
+
+class BookTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "book.bin")
+
+    def test_mirror(self):
+        board = Bitboard.from_moves("01")
+        self.assertEqual(mirror(board, board.players[0]), board.bit(0, 6))
+        self.assertEqual(mirror(board, board.mask), board.bit(0, 6) | board.bit(0, 5))
+
+    def test_position_key(self):
+        self.assertEqual(
+            position_key(Bitboard.from_moves("01")),
+            position_key(Bitboard.from_moves("65")),
+            msg="a position and its mirror image have the same key",
+        )
+        self.assertNotEqual(
+            position_key(Bitboard.from_moves("01")),
+            position_key(Bitboard.from_moves("10")),
+        )
+        self.assertNotEqual(
+            position_key(Bitboard.from_moves("0")),
+            position_key(Bitboard.from_moves("00")),
+            msg="the key includes the empty cells above the coins",
+        )
+
+    def test_lookup(self):
+        results = {position_key(Bitboard.from_moves(moves)): 1 for moves in "0123"}
+        results[position_key(Bitboard.from_moves("33"))] = -1
+        write_book(self.path, results)
+        book = Book(self.path)
+        self.assertEqual(len(book), 5)
+        self.assertEqual(book.result(Bitboard.from_moves("5")), 1, msg="mirror of 1")
+        self.assertEqual(book.result(Bitboard.from_moves("33")), -1)
+        self.assertIsNone(book.result(Bitboard.from_moves("34")))
+        self.assertIsNone(
+            book.result(Bitboard.from_moves("33", connect=5)),
+            msg="the book is only for connect four",
+        )
+
+    def test_empty_book(self):
+        write_book(self.path, {})
+        self.assertIsNone(Book(self.path).result(Bitboard()))
+
+    def test_get_book(self):
+        with override_settings(CONNECT_FOUR_BOOK_PATH=self.path):
+            self.assertIsNone(get_book(), msg="the book hasn't been written")
+            write_book(self.path, {})
+            get_book.cache_clear()
+            self.assertIsInstance(get_book(), Book)
+
+    def test_positions(self):
+        counts = [0, 0, 0]
+        for board in positions(2):
+            counts[board.move_count] += 1
+        # mirror images are only counted once, so 4 of the 7 first moves
+        self.assertListEqual(counts, [1, 4, 25])
@@ -0,0 +1,50 @@
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from games.broker import InProcessBroker, get_broker
+
+
+class InProcessBrokerTest(SimpleTestCase):
+    def setUp(self):
+        self.broker = InProcessBroker()
+
+    async def test_publish(self):
+        with self.broker.subscribe("game-1") as subscription:
+            self.broker.publish("game-1", {"move_count": 1})
+            self.broker.publish("game-2", {"move_count": 2})
+            self.assertEqual(await subscription.get(timeout=1), {"move_count": 1})
+            self.assertIsNone(
+                await subscription.get(timeout=0.01),
+                msg="messages on other channels are not received",
+            )
+
+    async def test_publish_from_thread(self):
+        with self.broker.subscribe("game-1") as subscription:
+            thread = threading.Thread(
+                target=self.broker.publish, args=("game-1", {"move_count": 1})
+            )
+            thread.start()
+            self.assertEqual(await subscription.get(timeout=1), {"move_count": 1})
+            thread.join()
+
+    async def test_unsubscribe(self):
+        with self.broker.subscribe("game-1"):
+            self.assertIn("game-1", self.broker.subscriptions)
+        self.assertNotIn("game-1", self.broker.subscriptions)
+        self.broker.publish("game-1", {"move_count": 1})
+
+    def test_subscribe_outside_event_loop(self):
+        with self.assertRaises(RuntimeError):
+            self.broker.subscribe("game-1")
+
+    def test_get_broker(self):
+        self.assertIsInstance(get_broker(), InProcessBroker)
+        self.assertIs(get_broker(), get_broker(), msg="one broker per process")
+        with override_settings(GAMES_BROKER="games.tests.test_broker.TestBroker"):
+            self.assertIsInstance(get_broker(), TestBroker)
+        self.assertIsInstance(get_broker(), InProcessBroker)
+
+
+class TestBroker(InProcessBroker):
+    pass
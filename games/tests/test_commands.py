@@ -0,0 +1,328 @@
+import cProfile
+import json
+import os
+import random
+import tempfile
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from freezegun import freeze_time
+from model_bakery import baker
+
+from games.management.commands.simulate_games import play_memory_game
+from games.models import Coin, Game, PlayerStats
+from games.utils import decode_moves
+
+
+class SimulateGamesTest(TestCase):
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("simulate_games", *args, stdout=out)
+        return out.getvalue()
+
+    def test_memory(self):
+        output = self.call_command("5")
+        self.assertIn("Played 5 games", output)
+        self.assertIn("moves/sec", output)
+        self.assertIn("move latency p50", output)
+        self.assertFalse(Game.objects.exists(), msg="games aren't saved")
+
+    def test_database(self):
+        output = self.call_command("2", "--mode", "database")
+        self.assertIn("Played 2 games", output)
+        self.assertFalse(Game.objects.exists(), msg="games are deleted")
+        self.assertFalse(PlayerStats.objects.exists(), msg="stats are deleted")
+
+    def test_database_keep(self):
+        self.call_command("2", "--mode", "database", "--keep")
+        self.assertEqual(Game.objects.count(), 2)
+        for game in Game.objects.all():
+            self.assertFalse(game.is_pending)
+            self.assertEqual(game.coins.count(), game.move_count)
+        self.assertEqual(
+            Coin.objects.count(), sum(Game.objects.values_list("move_count", flat=True))
+        )
+
+    def test_play_memory_game(self):
+        latencies = play_memory_game("easy", random.Random(0))
+        self.assertGreaterEqual(len(latencies), 7, msg="a win takes at least 7 moves")
+
+
+class ProfileSummaryTest(TestCase):
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("profile_summary", *args, stdout=out)
+        return out.getvalue()
+
+    def test_summary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("1-game_list.prof", "2-game_detail.prof"):
+                profile = cProfile.Profile()
+                profile.runcall(play_memory_game, "random", random.Random(0))
+                profile.dump_stats(os.path.join(directory, name))
+            with override_settings(GAMES_PROFILE_DIR=directory):
+                output = self.call_command("--last", "1", "--callers")
+        self.assertIn("2-game_detail.prof", output)
+        self.assertNotIn("1-game_list.prof", output)
+        self.assertIn("play_memory_game", output)
+        self.assertIn("was called by", output)
+
+    def test_no_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(GAMES_PROFILE_DIR=directory):
+                self.assertIn("There are no profiles", self.call_command())
+        with override_settings(GAMES_PROFILE_DIR=None):
+            with self.assertRaises(CommandError):
+                self.call_command()
+
+
+class ValidateGamesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = baker.make("User", _quantity=2)
+
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("validate_games", *args, stdout=out)
+        return out.getvalue()
+
+    def play_game(self, moves, **board):
+        game = Game.objects.create(
+            player_1=self.players[0], player_2=self.players[1], **board
+        )
+        for move, column in enumerate(decode_moves(moves)):
+            game.create_coin(self.players[move % 2], column)
+        return game
+
+    def test_valid(self):
+        self.play_game("")
+        self.play_game("3344")
+        self.play_game("0101010")
+        self.play_game("06565636")
+        self.play_game("330254564223355224331121550404466660106011")
+        self.play_game("0e1e2e3e4", rows=15, columns=15, connect=5)
+        output = self.call_command("--chunk-size", "4")
+        self.assertIn("Checked 6 games", output)
+        self.assertIn("0 mismatched", output)
+
+    def test_mismatch(self):
+        won = self.play_game("0101010")
+        Game.objects.filter(pk=won.pk).update(status=Game.Status.PLAYER_2, winner=None)
+        turn = self.play_game("0e1e2e3", rows=15, columns=15, connect=5)
+        Game.objects.filter(pk=turn.pk).update(
+            status=Game.Status.COMPLETE, winner=self.players[0]
+        )
+        self.play_game("33")
+
+        output = self.call_command()
+        self.assertIn("2 mismatched", output)
+        self.assertIn(
+            f"Game {won.pk} is P2 with winner None, but its coins give C", output
+        )
+        self.assertIn(f"Game {turn.pk} is C with winner {self.players[0].pk}", output)
+
+        won.cache_version()
+        output = self.call_command("--fix")
+        self.assertIn("2 fixed", output)
+        self.assertIsNone(
+            Game.get_cached_version(won.pk), msg="the fixed game is read again"
+        )
+        won.refresh_from_db()
+        turn.refresh_from_db()
+        self.assertEqual(won.status, Game.Status.COMPLETE)
+        self.assertEqual(won.winner, self.players[0])
+        self.assertEqual(turn.status, Game.Status.PLAYER_2)
+        self.assertIsNone(turn.winner)
+        self.assertIn("Rebuilt the stats of 2 players from 1 games", output)
+        stats = PlayerStats.objects.get(user=self.players[0])
+        self.assertEqual((stats.played, stats.wins), (1, 1))
+        self.assertIn("0 mismatched", self.call_command())
+
+    def test_both_players_won(self):
+        game = self.play_game("010101")
+        for row in range(3, 6):
+            Coin.objects.create(game=game, player=self.players[1], row=row, column=1)
+        Coin.objects.create(game=game, player=self.players[0], row=3, column=0)
+        output = self.call_command("--fix")
+        self.assertIn("but both players have a line", output)
+        self.assertIn("1 mismatched, 0 fixed", output)
+
+
+class ExportImportGamesTest(TestCase):
+    def setUp(self):
+        self.players = [
+            User.objects.create(username=f"export-player-{number}") for number in (1, 2)
+        ]
+        self.games = [
+            self.play_game("3344"),
+            self.play_game("0101010"),
+            self.play_game("0e1e2e3e4", rows=15, columns=15, connect=5),
+        ]
+
+    def play_game(self, moves, **board):
+        game = Game.objects.create(
+            player_1=self.players[0], player_2=self.players[1], **board
+        )
+        for move, column in enumerate(decode_moves(moves)):
+            game.create_coin(self.players[move % 2], column)
+        return game
+
+    def export(self):
+        out = StringIO()
+        call_command("export_games", stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def import_games(self, lines, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as file:
+            file.write(lines)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command("import_games", file.name, *args, stdout=out)
+        return out.getvalue()
+
+    def call_validate(self):
+        out = StringIO()
+        call_command("validate_games", stdout=out)
+        return out.getvalue()
+
+    def test_export(self):
+        lines = self.export().splitlines()
+        self.assertEqual(len(lines), 3)
+        game = json.loads(lines[1])
+        self.assertEqual(
+            game,
+            {
+                "player_1": "export-player-1",
+                "player_2": "export-player-2",
+                "status": "C",
+                "winner": "export-player-1",
+                "created_date": self.games[1].created_date.isoformat(),
+                "rows": 6,
+                "columns": 7,
+                "connect": 4,
+                "moves": "0101010",
+            },
+        )
+        self.assertEqual(json.loads(lines[2])["moves"], "0e1e2e3e4")
+
+    def test_export_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.jsonl")
+            err = StringIO()
+            call_command("export_games", "--output", path, stderr=err)
+            with open(path) as file:
+                self.assertEqual(len(file.readlines()), 3)
+        self.assertIn("Exported 3 games", err.getvalue())
+
+    def test_round_trip(self):
+        lines = self.export()
+        Game.objects.all().delete()
+        User.objects.filter(username="export-player-2").delete()
+
+        self.assertIn("Imported 3 games", self.import_games(lines, "--batch-size", "2"))
+        self.assertEqual(self.export(), lines)
+        self.assertFalse(
+            User.objects.get(username="export-player-2").has_usable_password(),
+            msg="the missing player is created",
+        )
+        for game in Game.objects.all():
+            self.assertEqual(game.coins.count(), game.move_count)
+            self.assertEqual(game.bitboard.heights(), game.heights)
+            self.assertEqual(game.calculate_status()["status"], game.status)
+        self.assertIn("0 mismatched", self.call_validate())
+
+    def test_import_coins(self):
+        lines = self.export()
+        Game.objects.all().delete()
+        self.import_games(lines)
+        game = Game.objects.get(moves="3344")
+        self.assertListEqual(
+            list(
+                game.coins.order_by("pk").values_list(
+                    "player__username", "row", "column"
+                )
+            ),
+            [
+                ("export-player-1", 0, 3),
+                ("export-player-2", 1, 3),
+                ("export-player-1", 0, 4),
+                ("export-player-2", 1, 4),
+            ],
+        )
+
+    def test_import_last_move(self):
+        lines = self.export()
+        Game.objects.all().delete()
+        # the coins created together are given the same time
+        with freeze_time():
+            self.import_games(lines, "--batch-size", "2")
+        for game in Game.objects.all():
+            with self.subTest(moves=game.moves):
+                column = decode_moves(game.moves)[-1]
+                last_move = game.last_move
+                self.assertEqual(
+                    (last_move.row, last_move.column),
+                    (game.heights[column] - 1, column),
+                )
+                self.assertGreater(last_move.created_date, game.created_date)
+
+    def test_import_invalid(self):
+        game = json.loads(self.export().splitlines()[0])
+        invalid = {
+            "not json": "{",
+            "column filled": {**game, "moves": "3333333"},
+            "line too long": {**game, "connect": 8},
+            "board too large": {**game, "rows": 16},
+            "no player": {**game, "player_2": None},
+            "column too large": {**game, "moves": "7"},
+            "column past the moves": {**game, "moves": "z"},
+            "wrong status": {**game, "status": Game.Status.DRAW},
+            "wrong winner": {**game, "winner": game["player_1"]},
+        }
+        for name, line in invalid.items():
+            with self.subTest(name):
+                if not isinstance(line, str):
+                    line = json.dumps(line)
+                with self.assertRaisesMessage(
+                    CommandError, "Line 2 isn't a valid game"
+                ):
+                    self.import_games(json.dumps(game) + "\n" + line + "\n")
+
+
+class RebuildStatsTest(TestCase):
+    def test_rebuild_stats(self):
+        player_1, player_2 = baker.make("User", _quantity=2)
+        for moves in ("0011223", "1100332", "0011223"):
+            game = Game.objects.create(player_1=player_1, player_2=player_2)
+            for move, column in enumerate(decode_moves(moves)):
+                game.create_coin((player_1, player_2)[move % 2], column)
+        recorded = list(PlayerStats.objects.order_by("user").values())
+        PlayerStats.objects.update(wins=0, streak=0, rating=0)
+
+        out = StringIO()
+        call_command("rebuild_stats", stdout=out)
+        self.assertIn("Rebuilt the stats of 2 players from 3 games", out.getvalue())
+        self.assertListEqual(
+            list(PlayerStats.objects.order_by("user").values()), recorded
+        )
+        stats = PlayerStats.objects.get(user=player_1)
+        self.assertEqual((stats.wins, stats.streak, stats.best_streak), (3, 3, 3))
+
+    def test_backfill_migration(self):
+        player_1, player_2 = baker.make("User", _quantity=2)
+        for moves in ("0011223", "1100332", "60011223"):
+            game = Game.objects.create(player_1=player_1, player_2=player_2)
+            for move, column in enumerate(decode_moves(moves)):
+                game.create_coin((player_1, player_2)[move % 2], column)
+        recorded = list(PlayerStats.objects.order_by("user").values())
+        PlayerStats.objects.all().delete()
+
+        migration = import_module("games.migrations.0012_backfill_playerstats")
+        migration.backfill_stats(apps, None)
+        self.assertListEqual(
+            list(PlayerStats.objects.order_by("user").values()), recorded
+        )
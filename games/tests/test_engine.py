@@ -0,0 +1,77 @@
+import time
+
+from django.test import SimpleTestCase
+
+from games.engine import Engine, computer_move
+from games.utils import Bitboard
+
+
+class EngineTest(SimpleTestCase):
+    def setUp(self):
+        self.engine = Engine(rows=6, columns=7)
+
+    def best_move(self, moves, depth=6, time_limit=10):
+        board = Bitboard.from_moves(moves)
+        return self.engine.best_move(board, len(moves) % 2, depth, time_limit)
+
+    def test_center_first(self):
+        self.assertListEqual(self.engine.order, [3, 2, 4, 1, 5, 0, 6])
+        self.assertEqual(self.best_move("", depth=1), 3)
+
+    def test_winning_move(self):
+        self.assertEqual(self.best_move("010101"), 0, msg="player 1 wins in column 0")
+        self.assertEqual(self.best_move("0616563"), 6, msg="player 2 wins in column 6")
+
+    def test_blocks_win(self):
+        self.assertEqual(self.best_move("01010"), 0, msg="player 2 blocks column 0")
+
+    def test_double_threat(self):
+        # player 1 has 3 and 4 on the bottom row, playing 2 or 5 makes a line of
+        # three with both ends open, which player 2 can't block
+        self.assertIn(self.best_move("3646"), [2, 5])
+
+    def test_winning_cells(self):
+        board = Bitboard.from_moves("304050")
+        cells = self.engine.winning_cells(board.players[0], board.mask)
+        self.assertEqual(
+            cells, board.bit(0, 2) | board.bit(0, 6), msg="either end of 3, 4, 5"
+        )
+
+    def test_full_board(self):
+        self.assertIsNone(self.best_move("330254564223355224331121550404466660106011"))
+
+    def test_time_limit(self):
+        start = time.perf_counter()
+        self.assertIn(self.best_move("", depth=42, time_limit=0.05), range(7))
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_transposition_table(self):
+        self.best_move("", depth=4)
+        self.assertTrue(self.engine.table)
+        self.assertEqual(
+            self.engine.hash(Bitboard.from_moves("3425")),
+            self.engine.hash(Bitboard.from_moves("2435")),
+            msg="moves in a different order are the same position",
+        )
+
+    def test_computer_move(self):
+        board = Bitboard.from_moves("010101")
+        self.assertEqual(computer_move(board, 0, "easy"), 0)
+        self.assertEqual(computer_move(board, 0, "medium"), 0)
+        self.assertEqual(
+            computer_move(board, 0, "hard", time_limit=0.01),
+            0,
+            msg="the search is capped at the time limit",
+        )
+
+    def test_solve(self):
+        self.assertEqual(self.engine.solve(Bitboard.from_moves("010101"), 0, 1), 1)
+        self.assertEqual(self.engine.solve(Bitboard.from_moves("3646"), 0, 3), 1)
+        self.assertEqual(
+            self.engine.solve(Bitboard.from_moves("36462"), 1, 2),
+            -1,
+            msg="player 2 can't block both ends of player 1's line",
+        )
+        self.assertIsNone(self.engine.solve(Bitboard(), 0, 4))
+        draw = Bitboard.from_moves("330254564223355224331121550404466660106")
+        self.assertEqual(self.engine.solve(draw, 1, 3), 0)
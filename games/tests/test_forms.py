@@ -2,6 +2,7 @@ from django.test import TestCase
 from model_bakery import baker
 
 from games.forms import GameForm
+from games.models import Computer, PlayerStats
 
 
 class GameFormTest(TestCase):
@@ -20,3 +21,44 @@ class GameFormTest(TestCase):
         with self.subTest(msg="check that cannot assign youself as opponent"):
             form.data["player_2"] = self.player_1.id
             self.assertFalse(form.is_valid())
+
+    def test_opponent_widget(self):
+        PlayerStats.objects.create(user=self.player_2, rating=1321.6)
+        with self.assertNumQueries(0):
+            html = str(GameForm(user=self.player_1)["player_2"])
+        self.assertNotIn("test.player2", html, msg="users are searched for")
+        self.assertIn('data-ajax--url="/opponents/"', html)
+
+        form = GameForm({"player_2": self.player_2.id}, user=self.player_1)
+        html = str(form["player_2"])
+        self.assertIn("test.player2 (1322)", html, msg="the chosen opponent")
+        self.assertNotIn(str(Computer.objects.first().user), html)
+
+    def test_board_size(self):
+        form = GameForm(
+            {"player_2": self.player_2.id, "rows": 15, "columns": 15, "connect": 5},
+            user=self.player_1,
+        )
+        self.assertTrue(form.is_valid())
+        game = form.save()
+        self.assertEqual((game.rows, game.columns, game.connect), (15, 15, 5))
+        self.assertEqual(len(game.heights), 15)
+
+    def test_line_longer_than_board(self):
+        form = GameForm(
+            {"player_2": self.player_2.id, "rows": 6, "columns": 7, "connect": 8},
+            user=self.player_1,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("connect", form.errors)
+
+    def test_computer_plays_connect_four(self):
+        computer = Computer.objects.first().user
+        data = {"player_2": computer.id, "rows": 8, "columns": 9, "connect": 5}
+        form = GameForm(data, user=self.player_1)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors["connect"], ["Computer opponents only play connect four."]
+        )
+        data["connect"] = 4
+        self.assertTrue(GameForm(data, user=self.player_1).is_valid())
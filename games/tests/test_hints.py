@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import Future
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from model_bakery import baker
+
+from games.hints import HintPool, HintsBusy, hint_cache_key, search_hint
+
+
+class SearchHintTest(TestCase):
+    def test_search_hint(self):
+        self.assertEqual(search_hint("010101", 6, 7, 1), 0, msg="winning column")
+
+
+class HintPoolTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pool = HintPool(workers=1, time_limit=0.05)
+        self.addCleanup(self.pool.shutdown)
+        self.game = baker.make("games.Game", moves="010101", move_count=6)
+
+    def test_get_hint(self):
+        future = Future()
+        with mock.patch.object(self.pool.executor, "submit", return_value=future):
+            self.assertIsNone(self.pool.get_hint(self.game), msg="search is started")
+            self.assertIsNone(self.pool.get_hint(self.game), msg="search is running")
+        # the done callbacks run in the thread setting the result
+        future.set_result(0)
+        self.assertEqual(self.pool.get_hint(self.game), 0, msg="hint is cached")
+        self.assertEqual(cache.get(hint_cache_key(self.game.pk, 6)), 0)
+        self.assertNotIn(self.game.pk, self.pool.searches)
+
+    def test_search_process(self):
+        done = threading.Event()
+        search_done = self.pool.search_done
+
+        def wait_search_done(*args):
+            search_done(*args)
+            done.set()
+
+        with mock.patch.object(self.pool, "search_done", wait_search_done):
+            self.assertIsNone(self.pool.get_hint(self.game))
+        self.assertTrue(done.wait(timeout=10), msg="the hint is searched for")
+        self.assertEqual(self.pool.get_hint(self.game), 0, msg="hint is cached")
+
+    def test_busy(self):
+        other_game = baker.make("games.Game")
+        with mock.patch.object(self.pool.executor, "submit", return_value=Future()):
+            self.pool.get_hint(other_game)
+            with self.assertRaises(HintsBusy):
+                self.pool.get_hint(self.game)
+
+    def test_board_changed(self):
+        future = Future()
+        with mock.patch.object(self.pool.executor, "submit", return_value=future):
+            self.pool.get_hint(self.game)
+        self.game.move_count = 7
+        self.game.moves += "2"
+        self.pool.get_hint(self.game)
+        self.assertTrue(future.cancelled(), msg="the previous search isn't needed")
+        self.assertEqual(self.pool.searches[self.game.pk][0], 7)
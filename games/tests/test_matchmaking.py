@@ -0,0 +1,193 @@
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from freezegun import freeze_time
+from model_bakery import baker
+
+from games.broker import get_broker, lobby_channel
+from games.matchmaking import (
+    DatabaseMatchmaker,
+    InProcessMatchmaker,
+    find_game,
+    get_matchmaker,
+)
+from games.models import Game, PlayerStats, WaitingPlayer
+
+
+class MatchmakerTests:
+    """Tests run against each matchmaker"""
+
+    matchmaker_class = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = baker.make("User", _quantity=5)
+
+    def setUp(self):
+        self.matchmaker = self.matchmaker_class()
+        self.user_ids = [user.id for user in self.users]
+
+    def test_wait_for_opponent(self):
+        self.assertIsNone(self.matchmaker.join(self.user_ids[0], 1200))
+        self.assertTrue(self.matchmaker.is_waiting(self.user_ids[0]))
+        self.assertFalse(self.matchmaker.is_waiting(self.user_ids[1]))
+
+    def test_pair(self):
+        self.matchmaker.join(self.user_ids[0], 1200)
+        self.assertEqual(self.matchmaker.join(self.user_ids[1], 1390), self.user_ids[0])
+        self.assertFalse(self.matchmaker.is_waiting(self.user_ids[0]))
+        self.assertFalse(self.matchmaker.is_waiting(self.user_ids[1]))
+
+    def test_outside_band(self):
+        self.matchmaker.join(self.user_ids[0], 1200)
+        self.assertIsNone(self.matchmaker.join(self.user_ids[1], 1401))
+        self.assertIsNone(self.matchmaker.join(self.user_ids[2], 999))
+        self.assertTrue(self.matchmaker.is_waiting(self.user_ids[2]))
+
+    def test_nearest_rating(self):
+        self.matchmaker.join(self.user_ids[0], 1000)
+        self.matchmaker.join(self.user_ids[1], 1300)
+        self.matchmaker.join(self.user_ids[2], 1600)
+        self.assertEqual(self.matchmaker.join(self.user_ids[3], 1420), self.user_ids[1])
+        self.assertEqual(self.matchmaker.join(self.user_ids[4], 1420), self.user_ids[2])
+
+    def test_join_twice(self):
+        self.assertIsNone(self.matchmaker.join(self.user_ids[0], 1200))
+        self.assertIsNone(
+            self.matchmaker.join(self.user_ids[0], 1200), msg="not paired with itself"
+        )
+        self.assertEqual(self.matchmaker.join(self.user_ids[1], 1200), self.user_ids[0])
+        self.assertIsNone(
+            self.matchmaker.join(self.user_ids[2], 1200), msg="only paired once"
+        )
+
+    def test_leave(self):
+        self.matchmaker.join(self.user_ids[0], 1200)
+        self.matchmaker.leave(self.user_ids[0])
+        self.matchmaker.leave(self.user_ids[1])
+        self.assertFalse(self.matchmaker.is_waiting(self.user_ids[0]))
+        self.assertIsNone(self.matchmaker.join(self.user_ids[1], 1200))
+
+    def test_expired(self):
+        with freeze_time() as frozen_time:
+            self.matchmaker.join(self.user_ids[0], 1200)
+            frozen_time.tick(61)
+            self.assertFalse(self.matchmaker.is_waiting(self.user_ids[0]))
+            self.assertFalse(self.matchmaker.keep_waiting(self.user_ids[0]))
+            self.assertIsNone(
+                self.matchmaker.join(self.user_ids[1], 1200),
+                msg="not paired with a user who has stopped waiting",
+            )
+            self.assertEqual(
+                self.matchmaker.join(self.user_ids[0], 1200),
+                self.user_ids[1],
+                msg="the user can join again",
+            )
+
+    def test_keep_waiting(self):
+        with freeze_time() as frozen_time:
+            self.matchmaker.join(self.user_ids[0], 1200)
+            for _ in range(3):
+                frozen_time.tick(40)
+                self.assertTrue(self.matchmaker.keep_waiting(self.user_ids[0]))
+            self.assertFalse(self.matchmaker.keep_waiting(self.user_ids[1]))
+            self.assertEqual(
+                self.matchmaker.join(self.user_ids[1], 1200), self.user_ids[0]
+            )
+
+
+@override_settings(GAMES_MATCHMAKING_BAND=200, GAMES_MATCHMAKING_TIMEOUT=60)
+class InProcessMatchmakerTest(MatchmakerTests, TestCase):
+    matchmaker_class = InProcessMatchmaker
+
+    def test_one_user_per_band(self):
+        for user_id, rating in zip(self.user_ids, (1000, 1150, 1300, 1450, 1600)):
+            self.matchmaker.join(user_id, rating)
+        self.assertEqual(len(self.matchmaker.waiting), 1)
+        self.assertEqual(len(self.matchmaker.bands), 1)
+
+
+@override_settings(GAMES_MATCHMAKING_BAND=200, GAMES_MATCHMAKING_TIMEOUT=60)
+class DatabaseMatchmakerTest(MatchmakerTests, TestCase):
+    matchmaker_class = DatabaseMatchmaker
+
+    def test_join_num_queries(self):
+        for user_id, rating in zip(self.user_ids, (1000, 1300)):
+            self.matchmaker.join(user_id, rating)
+        with CaptureQueriesContext(connection) as context:
+            opponent_id = self.matchmaker.join(self.user_ids[2], 1200)
+        self.assertEqual(opponent_id, self.user_ids[1])
+        # the test case transaction turns the atomic blocks into savepoints
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(
+            len(queries),
+            7,
+            msg="delete the expired users, save the user, "
+            "read the nearest above and below, lock and delete",
+        )
+
+    def test_skips_paired_opponent(self):
+        self.matchmaker.join(self.user_ids[0], 1000)
+        self.matchmaker.join(self.user_ids[1], 1201)
+        nearest = self.matchmaker.nearest
+
+        def pair_in_between(*args):
+            opponent_id = nearest(*args)
+            if opponent_id == self.user_ids[1]:
+                # another process pairs the nearest user before they are locked
+                WaitingPlayer.objects.filter(pk=opponent_id).delete()
+            return opponent_id
+
+        self.matchmaker.nearest = pair_in_between
+        self.assertEqual(self.matchmaker.join(self.user_ids[2], 1150), self.user_ids[0])
+
+
+@override_settings(GAMES_MATCHMAKING_BAND=200)
+class FindGameTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_1, cls.player_2 = baker.make("User", _quantity=2)
+
+    def setUp(self):
+        # each test has its own queue
+        get_matchmaker.cache_clear()
+        self.addCleanup(get_matchmaker.cache_clear)
+
+    def test_find_game(self):
+        PlayerStats.objects.create(user=self.player_1, rating=1500)
+        self.assertIsNone(find_game(self.player_1))
+        self.assertIsNone(find_game(self.player_2), msg="rated too far apart")
+        get_matchmaker().leave(self.player_2.id)
+
+        PlayerStats.objects.create(user=self.player_2, rating=1400)
+        game = find_game(self.player_2)
+        self.assertEqual(
+            game.player_1, self.player_1, msg="the waiting user goes first"
+        )
+        self.assertEqual(game.player_2, self.player_2)
+        self.assertEqual(game.status, Game.Status.PLAYER_1)
+
+    async def test_opponent_told(self):
+        with get_broker().subscribe(lobby_channel(self.player_1.id)) as subscription:
+            game = await self.pair()
+            self.assertEqual(
+                await subscription.get(timeout=1), {"url": game.get_absolute_url()}
+            )
+
+    async def pair(self):
+        await sync_to_async(find_game)(self.player_1)
+        return await sync_to_async(find_game)(self.player_2)
+
+    def test_get_matchmaker(self):
+        self.assertIsInstance(get_matchmaker(), DatabaseMatchmaker)
+        self.assertIs(get_matchmaker(), get_matchmaker(), msg="one per process")
+        with override_settings(
+            GAMES_MATCHMAKER="games.matchmaking.InProcessMatchmaker"
+        ):
+            self.assertIsInstance(get_matchmaker(), InProcessMatchmaker)
+        self.assertIsInstance(get_matchmaker(), DatabaseMatchmaker)
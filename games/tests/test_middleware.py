@@ -0,0 +1,236 @@
+import asyncio
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from model_bakery import baker
+
+from games.matchmaking import get_matchmaker
+from games.middleware import ProfilingMiddleware, RequestTimingMiddleware
+from games.models import Game
+
+# the middleware in production, which serves the static files after the security
+# middleware
+PRODUCTION_MIDDLEWARE = list(settings.MIDDLEWARE)
+PRODUCTION_MIDDLEWARE.insert(2, "games.middleware.StaticFilesMiddleware")
+
+
+@override_settings(GAMES_REQUEST_TIMING=True)
+class RequestTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.player_1 = baker.make("User")
+        self.player_2 = baker.make("User")
+        self.game = baker.make(
+            "games.Game", player_1=self.player_1, player_2=self.player_2
+        )
+        self.client.force_login(self.player_1)
+
+    def server_timing(self, response):
+        return dict(
+            re.match(r"(\w+);(?:.*;)?dur=([\d.]+)", metric).groups()
+            for metric in response["Server-Timing"].split(", ")
+        )
+
+    @override_settings(GAMES_REQUEST_TIMING=False)
+    def test_not_used_when_off(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestTimingMiddleware(lambda request: HttpResponse())
+        response = self.client.get(reverse("game_list"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_server_timing(self):
+        with self.assertLogs("games.requests"):
+            response = self.client.get(reverse("game_detail", args=[self.game.pk]))
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {"db", "template", "total"})
+        self.assertGreater(float(timing["template"]), 0)
+        self.assertGreaterEqual(
+            float(timing["total"]), float(timing["db"]) + float(timing["template"])
+        )
+        self.assertRegex(response["Server-Timing"], r'db;desc="\d+ queries"')
+
+    def test_query_count(self):
+        request = RequestFactory().get("/")
+        middleware = RequestTimingMiddleware(
+            lambda request: HttpResponse(Game.objects.count())
+        )
+        with self.assertLogs("games.requests"):
+            response = middleware(request)
+        self.assertIn('db;desc="1 queries"', response["Server-Timing"])
+        self.assertEqual(request.timing.queries, 1)
+
+    def test_concurrent_requests(self):
+        """Each request counts its own queries while another request is handled"""
+
+        async def view(request):
+            for _ in range(int(request.GET["queries"])):
+                await sync_to_async(Game.objects.count)()
+                await asyncio.sleep(0)
+            return HttpResponse()
+
+        middleware = RequestTimingMiddleware(view)
+        requests = [AsyncRequestFactory().get(f"/?queries={n}") for n in (1, 3)]
+
+        async def serve():
+            return await asyncio.gather(*(middleware(request) for request in requests))
+
+        with self.assertLogs("games.requests"):
+            async_to_sync(serve)()
+        self.assertEqual([request.timing.queries for request in requests], [1, 3])
+
+    def test_logged_with_url_name(self):
+        with self.assertLogs("games.requests", "INFO") as logs:
+            self.client.get(reverse("game_check_turn", args=[self.game.pk]))
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.url_name, "game_check_turn")
+        self.assertGreater(record.queries, 0)
+        self.assertIn("url_name=game_check_turn", record.getMessage())
+
+    def test_views_within_query_budget(self):
+        urls = [
+            reverse("game_list"),
+            reverse("game_detail", args=[self.game.pk]),
+            reverse("game_check_turn", args=[self.game.pk]),
+            reverse("game_coin", args=[self.game.pk, 3]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertLogs("games.requests") as logs:
+                self.client.get(url)
+            self.assertNotIn("WARNING", [record.levelname for record in logs.records])
+
+    @override_settings(GAMES_QUERY_BUDGETS={"game_list": 0})
+    def test_over_query_budget(self):
+        with self.assertLogs("games.requests", "WARNING") as logs:
+            self.client.get(reverse("game_list"))
+        self.assertIn("over its budget of 0", logs.output[0])
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings = override_settings(GAMES_PROFILE_DIR=self.directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff = baker.make("User", is_staff=True)
+        self.client.force_login(self.staff)
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory.name))
+
+    @override_settings(GAMES_PROFILE_DIR=None)
+    def test_not_used_when_off(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_profile_query_parameter(self):
+        response = self.client.get(reverse("game_list"), {"profile": ""})
+        self.assertEqual(self.profiles(), [response["X-Profile"]])
+        self.assertTrue(response["X-Profile"].endswith("-game_list.prof"))
+
+    def test_profile_header(self):
+        response = self.client.get(reverse("game_list"), HTTP_X_PROFILE="1")
+        self.assertEqual(self.profiles(), [response["X-Profile"]])
+
+    def test_not_asked(self):
+        response = self.client.get(reverse("game_list"))
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(self.profiles(), [])
+
+    def test_not_asked_user_not_read(self):
+        request = RequestFactory().get("/")
+        # the user is read lazily from the session, as the auth middleware sets it
+        get_user = mock.Mock(return_value=self.staff)
+        request.user = SimpleLazyObject(get_user)
+        middleware = ProfilingMiddleware(lambda request: HttpResponse())
+        middleware.process_view(request, None, (), {})
+        get_user.assert_not_called()
+
+    def test_not_staff(self):
+        self.client.force_login(baker.make("User"))
+        response = self.client.get(reverse("game_list"), {"profile": ""})
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(GAMES_PROFILE_KEEP=2)
+    def test_rotation(self):
+        names = [
+            self.client.get(reverse("game_list"), {"profile": ""})["X-Profile"]
+            for _ in range(3)
+        ]
+        self.assertEqual(self.profiles(), names[1:])
+
+
+@override_settings(MIDDLEWARE=PRODUCTION_MIDDLEWARE, WHITENOISE_USE_FINDERS=True)
+class StaticFilesMiddlewareTest(TransactionTestCase):
+    def setUp(self):
+        self.user = baker.make("User")
+        self.game = baker.make("games.Game", player_1=self.user)
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+
+    def serve(self, requests):
+        """Run the requests in an event loop of their own, as uvicorn does, so the
+        sync code of the requests is run in asgiref's one thread for sync code"""
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(asyncio.run(requests()))
+        )
+        thread.start()
+        thread.join()
+        return results[0]
+
+    def test_static_file(self):
+        response = self.client.get("/static/games/lobby.js")
+        self.assertEqual(response.status_code, 200)
+        response = self.serve(lambda: self.async_client.get("/static/games/lobby.js"))
+        self.assertEqual(response.status_code, 200)
+
+    def poll(self, url):
+        """Return the response of a long poll of the url, and the seconds a request
+        made while the poll was waiting took"""
+
+        async def requests():
+            poll = asyncio.ensure_future(self.async_client.get(url))
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            response = await self.async_client.get(reverse("game_list"))
+            self.assertEqual(response.status_code, 200)
+            seconds = time.perf_counter() - start
+            return await poll, seconds
+
+        return self.serve(requests)
+
+    @mock.patch("games.views.GAME_EVENTS_TIMEOUT", 1)
+    def test_long_poll_doesnt_block(self):
+        poll, seconds = self.poll(f"/{self.game.pk}/events/?move_count=0")
+        self.assertLess(seconds, 0.5, msg="the request isn't held by the poll")
+        self.assertJSONEqual(
+            str(poll.content, encoding="utf8"),
+            {"is_users_turn": True, "is_game_over": False, "move_count": 0},
+        )
+
+    @mock.patch("games.views.GAME_EVENTS_TIMEOUT", 1)
+    def test_lobby_poll_doesnt_block(self):
+        get_matchmaker().join(self.user.id, 1200)
+        poll, seconds = self.poll(reverse("lobby_events"))
+        self.assertLess(seconds, 0.5, msg="the request isn't held by the poll")
+        self.assertJSONEqual(str(poll.content, encoding="utf8"), {"is_waiting": True})
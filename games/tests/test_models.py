@@ -1,10 +1,41 @@
-from itertools import cycle
+from unittest import mock
 
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 from model_bakery import baker
 
-from games.models import Game
+from games.models import Coin, Computer, Game, PlayerStats
+from games.utils import Bitboard, decode_moves
+
+# a full board without a connect four
+DRAW_MOVES = "330254564223355224331121550404466660106011"
+
+
+def make_game(moves="", **kwargs):
+    """Make a game with its board state and coins for the moves"""
+    game = baker.make(
+        "games.Game",
+        moves=moves,
+        heights=Bitboard.from_moves(moves).heights(),
+        move_count=len(moves),
+        **kwargs,
+    )
+    board = Bitboard()
+    Coin.objects.bulk_create(
+        Coin(
+            game=game,
+            player=(game.player_1, game.player_2)[move % 2],
+            column=column,
+            row=board.play(column, move % 2),
+        )
+        for move, column in enumerate(decode_moves(moves))
+    )
+    return game
 
 
 class CoinTest(TestCase):
@@ -14,6 +45,19 @@ class CoinTest(TestCase):
         coin = baker.make("games.Coin", player=player, row=1, column=3)
         self.assertEqual(coin.__str__(), "test.player to (1, 3)")
 
+    def test_unique_location(self):
+        coin = baker.make("games.Coin", row=0, column=3)
+        with self.assertRaises(IntegrityError):
+            baker.make("games.Coin", game=coin.game, row=0, column=3)
+
+    def test_clean_location_on_board(self):
+        game = baker.make("games.Game", rows=8, columns=10)
+        baker.prepare("games.Coin", game=game, row=7, column=9).clean()
+        with self.assertRaisesMessage(ValidationError, "The board has 10 columns."):
+            baker.prepare("games.Coin", game=game, row=0, column=10).clean()
+        with self.assertRaisesMessage(ValidationError, "The board has 8 rows."):
+            baker.prepare("games.Coin", game=game, row=8, column=0).clean()
+
 
 @freeze_time("2012-01-14")
 @override_settings(CONNECT_FOUR_ROWS=6, CONNECT_FOUR_COLUMNS=7)
@@ -178,34 +222,16 @@ class GameTest(TestCase):
             )
 
         with self.subTest():
-            del self.game.__dict__["available_columns"]
-            for column in [0, 3, 4]:
-                baker.make(
-                    "games.Coin",
-                    game=self.game,
-                    player=self.player_1,
-                    row=5,
-                    column=column,
-                )
+            game = baker.make("games.Game", heights=[6, 0, 0, 6, 6, 0, 0])
             self.assertListEqual(
-                self.game.available_columns,
+                game.available_columns,
                 [1, 2, 5, 6],
                 msg="only some columns available",
             )
 
         with self.subTest():
-            del self.game.__dict__["available_columns"]
-            for column in [1, 2, 5, 6]:
-                baker.make(
-                    "games.Coin",
-                    game=self.game,
-                    player=self.player_1,
-                    row=5,
-                    column=column,
-                )
-            self.assertListEqual(
-                self.game.available_columns, [], msg="no columns available"
-            )
+            game = baker.make("games.Game", heights=[6] * 7)
+            self.assertListEqual(game.available_columns, [], msg="no columns available")
 
     def test_last_move(self):
         with self.subTest(msg="no coins therefore last move is none"):
@@ -305,18 +331,14 @@ class GameTest(TestCase):
             self.assertEqual(no_ones_game.current_player_colour, "white")
 
     def test_template_dict(self):
-        # set up test coins
-        baker.make("games.Coin", game=self.game, row=0, column=0, player=self.player_1)
-        baker.make("games.Coin", game=self.game, row=0, column=1, player=self.player_2)
-        baker.make("games.Coin", game=self.game, row=1, column=1, player=self.player_1)
-        baker.make("games.Coin", game=self.game, row=2, column=2, player=self.player_2)
+        game = make_game("0112", player_1=self.player_1, player_2=self.player_2)
         self.assertDictEqual(
-            self.game.board_dict,
+            game.board_dict,
             {
                 0: {
                     0: "red",
                     1: "yellow",
-                    2: "white",
+                    2: "yellow",
                     3: "white",
                     4: "white",
                     5: "white",
@@ -334,7 +356,7 @@ class GameTest(TestCase):
                 2: {
                     0: "white",
                     1: "white",
-                    2: "yellow",
+                    2: "white",
                     3: "white",
                     4: "white",
                     5: "white",
@@ -392,98 +414,57 @@ class GameTest(TestCase):
     def test_calculate_status_full_board(self):
         """
         Filled board with coins but without a winner
-        +----+----+----+----+----+----+
-        | P2 | P1 | P2 | P1 | P2 | P1 |
-        | P2 | P1 | P2 | P1 | P2 | P1 |
-        | P1 | P2 | P1 | P2 | P1 | P2 |
-        | P1 | P2 | P1 | P2 | P1 | P2 |
-        | P2 | P1 | P2 | P1 | P2 | P1 |
-        | P2 | P1 | P2 | P1 | P2 | P1 |
-        | P1 | P2 | P1 | P2 | P1 | P2 |
-        +----+----+----+----+----+----+
+        +----+----+----+----+----+----+----+
+        | P2 | P2 | P1 | P2 | P1 | P2 | P1 |
+        | P2 | P1 | P1 | P1 | P2 | P1 | P1 |
+        | P2 | P1 | P2 | P1 | P2 | P1 | P2 |
+        | P1 | P2 | P1 | P2 | P2 | P2 | P1 |
+        | P1 | P2 | P2 | P2 | P1 | P1 | P2 |
+        | P1 | P1 | P2 | P1 | P2 | P1 | P2 |
+        +----+----+----+----+----+----+----+
         """
-        player_1_first = cycle([self.player_1, self.player_2])
-        player_2_first = cycle([self.player_2, self.player_1])
-        for row in range(2):
-            for col in range(7):
-                baker.make(
-                    "games.Coin",
-                    game=self.game,
-                    row=row,
-                    column=col,
-                    player=player_1_first,
-                )
-        for row in range(2, 4):
-            for col in range(7):
-                baker.make(
-                    "games.Coin",
-                    game=self.game,
-                    row=row,
-                    column=col,
-                    player=player_2_first,
-                )
-        for row in range(4, 6):
-            for col in range(7):
-                baker.make(
-                    "games.Coin",
-                    game=self.game,
-                    row=row,
-                    column=col,
-                    player=player_1_first,
-                )
+        game = make_game(DRAW_MOVES, player_1=self.player_1, player_2=self.player_2)
 
         self.assertDictEqual(
-            self.game.calculate_status(),
+            game.calculate_status(),
             {"status": Game.Status.DRAW},
-            msg="The board is , therefore awaiting player 1's turn",
+            msg="The board is full without a winner, therefore a draw",
         )
 
     def test_calculate_status_player_1_won(self):
         """
         Player 1 wins the game
-        +----+----+----+----+---+---+
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | P2 | P2 | P2 | -  | - |   |
-        | P1 | P1 | P1 | P1 | - | - |
-        +----+----+----+----+---+---+
+        +----+----+----+----+---+---+---+
+        | -  | -  | -  | -  | - | - | - |
+        | -  | -  | -  | -  | - | - | - |
+        | -  | -  | -  | -  | - | - | - |
+        | -  | -  | -  | -  | - | - | - |
+        | P2 | P2 | P2 | -  | - | - | - |
+        | P1 | P1 | P1 | P1 | - | - | - |
+        +----+----+----+----+---+---+---+
         """
-        baker.make("games.Coin", game=self.game, row=0, column=0, player=self.player_1)
-        baker.make("games.Coin", game=self.game, row=1, column=0, player=self.player_2)
-        baker.make("games.Coin", game=self.game, row=0, column=1, player=self.player_1)
-        baker.make("games.Coin", game=self.game, row=1, column=1, player=self.player_2)
-        baker.make("games.Coin", game=self.game, row=0, column=2, player=self.player_1)
-        baker.make("games.Coin", game=self.game, row=1, column=2, player=self.player_2)
-        baker.make("games.Coin", game=self.game, row=0, column=3, player=self.player_1)
+        game = make_game("0011223", player_1=self.player_1, player_2=self.player_2)
 
         self.assertDictEqual(
-            self.game.calculate_status(),
+            game.calculate_status(),
             {"status": Game.Status.COMPLETE, "winner_id": self.player_1.id},
         )
 
     def test_calculate_status_player_2_turn(self):
         """
         No winner - Player 2's turn
-        +----+----+----+----+---+---+
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | -  | -  | -  | - | - |
-        | -  | P1 | -  | -  | - |   |
-        | P1 | P2 | -  | -  | - | - |
-        +----+----+----+----+---+---+
+        +----+----+----+----+---+---+---+
+        | -  | -  | -  | -  | - | - | - |
+        | -  | -  | -  | -  | - | - | - |
+        | -  | -  | -  | -  | - | - | - |
+        | -  | -  | -  | -  | - | - | - |
+        | -  | P1 | -  | -  | - | - | - |
+        | P1 | P2 | -  | -  | - | - | - |
+        +----+----+----+----+---+---+---+
         """
-        baker.make("games.Coin", game=self.game, row=0, column=0, player=self.player_1)
-        baker.make("games.Coin", game=self.game, row=0, column=1, player=self.player_2)
-        baker.make("games.Coin", game=self.game, row=1, column=1, player=self.player_1)
+        game = make_game("011", player_1=self.player_1, player_2=self.player_2)
 
-        self.assertDictEqual(
-            self.game.calculate_status(), {"status": Game.Status.PLAYER_2}
-        )
+        self.assertDictEqual(game.calculate_status(), {"status": Game.Status.PLAYER_2})
 
     def test_create_coin_user_not_payer(self):
         user = baker.make("User", first_name="stranger", last_name="danger")
@@ -497,10 +478,11 @@ class GameTest(TestCase):
         self.assertEqual(self.game.coins.count(), 0, msg="coin is not created")
 
     def test_create_coin_col_invalid(self):
-        baker.make("games.Coin", game=self.game, row=5, column=0)
+        game = make_game("000000", player_1=self.player_1, player_2=self.player_2)
         with self.assertRaisesMessage(ValueError, "Column is filled!"):
-            self.game.create_coin(self.player_1, 0)
-        self.assertEqual(self.game.coins.count(), 1, msg="second coin is not created")
+            game.create_coin(self.player_1, 0)
+        self.assertEqual(game.coins.count(), 6, msg="seventh coin is not created")
+        self.assertEqual(game.move_count, 6, msg="board state is not updated")
 
     def test_create_coin_valid_first_row(self):
         self.assertFalse(
@@ -518,19 +500,339 @@ class GameTest(TestCase):
 
     def test_create_coin_valid_second_row(self):
         with freeze_time("2012-01-03"):
-            baker.make(
-                "games.Coin", game=self.game, row=0, column=0, player=self.player_2
+            game = make_game(
+                "0",
+                player_1=self.player_1,
+                player_2=self.player_2,
+                status=Game.Status.PLAYER_2,
             )
 
-        self.assertFalse(
-            self.game.create_coin(self.player_1, 0), msg="game is not complete"
-        )
+        self.assertFalse(game.create_coin(self.player_2, 0), msg="game is not complete")
 
-        self.game.refresh_from_db()
-        coin = self.game.last_move
+        game.refresh_from_db()
+        coin = game.last_move
         # validate the coin is created as expected and game status updated
         self.assertEqual(coin.row, 1)
         self.assertEqual(coin.column, 0)
-        self.assertEqual(coin.player, self.player_1)
-        self.assertEqual(coin.game, self.game)
+        self.assertEqual(coin.player, self.player_2)
+        self.assertEqual(coin.game, game)
+        self.assertEqual(game.status, Game.Status.PLAYER_1)
+        self.assertEqual(game.moves, "00")
+        self.assertEqual(game.heights, [2, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(game.move_count, 2)
+
+    def test_calculate_move_status(self):
+        with self.subTest(msg="no winner, the other player is next"):
+            game = make_game("0", player_1=self.player_1, player_2=self.player_2)
+            self.assertDictEqual(
+                game.calculate_move_status(0, 0),
+                {"status": Game.Status.PLAYER_2},
+            )
+
+        with self.subTest(msg="the coin completes a connect four"):
+            game = make_game("0101010", player_1=self.player_1, player_2=self.player_2)
+            self.assertDictEqual(
+                game.calculate_move_status(3, 0),
+                {"status": Game.Status.COMPLETE, "winner_id": self.player_1.id},
+            )
+
+    def test_calculate_move_status_full_board(self):
+        game = make_game(DRAW_MOVES, player_1=self.player_1, player_2=self.player_2)
+        self.assertDictEqual(
+            game.calculate_move_status(5, 1),
+            {"status": Game.Status.DRAW},
+            msg="the last coin filled the board without a winner",
+        )
+
+    def test_create_coin_winning_move(self):
+        game = make_game("001122", player_1=self.player_1, player_2=self.player_2)
+
+        self.assertTrue(game.create_coin(self.player_1, 3), msg="game is complete")
+
+        game.refresh_from_db()
+        self.assertEqual(game.status, Game.Status.COMPLETE)
+        self.assertEqual(game.winner, self.player_1)
+        self.assertEqual(game.moves, "0011223")
+
+    def test_create_coin_num_queries(self):
+        game = Game.objects.get(pk=self.game.pk)
+        user = User.objects.get(pk=self.player_1.pk)
+        with CaptureQueriesContext(connection) as context:
+            game.create_coin(user, 0)
+        # the test case transaction turns the atomic block into a savepoint
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(
+            len(queries),
+            3,
+            msg="lock and read the board, create the coin and update the game",
+        )
+
+    def test_create_coin_reloads_board(self):
+        stale_game = Game.objects.get(pk=self.game.pk)
+        self.game.create_coin(self.player_1, 0)
+        with self.assertRaisesMessage(ValueError, "It is not test.player1's turn!"):
+            stale_game.create_coin(self.player_1, 0)
+        self.assertEqual(stale_game.move_count, 1, msg="board reloaded from the game")
+        self.assertEqual(self.game.coins.count(), 1, msg="coin is not created")
+
+    def test_create_coin_retries_conflict(self):
+        create = Coin.objects.create
+        attempts = []
+
+        def conflict_once(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise IntegrityError
+            return create(**kwargs)
+
+        with mock.patch.object(Coin.objects, "create", side_effect=conflict_once):
+            self.assertFalse(self.game.create_coin(self.player_1, 0))
+
+        self.assertEqual(len(attempts), 2, msg="move is made again")
+        self.assertEqual(self.game.coins.count(), 1)
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.moves, "0", msg="board only has the second attempt")
         self.assertEqual(self.game.status, Game.Status.PLAYER_2)
+
+    def test_create_coin_conflict_attempts(self):
+        with mock.patch.object(
+            Coin.objects, "create", side_effect=IntegrityError
+        ) as create:
+            with self.assertRaises(IntegrityError):
+                self.game.create_coin(self.player_1, 0)
+        self.assertEqual(create.call_count, Game.MOVE_ATTEMPTS)
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.move_count, 0, msg="board is not updated")
+
+    def test_create_coin_publishes_move(self):
+        with mock.patch("games.models.get_broker") as get_broker:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.game.create_coin(self.player_1, 0)
+                get_broker.return_value.publish.assert_not_called()
+        get_broker.return_value.publish.assert_called_once_with(
+            f"game-{self.game.pk}", {"status": Game.Status.PLAYER_2, "move_count": 1}
+        )
+
+    def test_create_coin_caches_version(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.create_coin(self.player_1, 0)
+        self.assertEqual(
+            Game.get_cached_version(self.game.pk),
+            (self.player_1.id, self.player_2.id, 1, Game.Status.PLAYER_2),
+        )
+
+    def test_cache_version_does_not_replace(self):
+        cache.clear()
+        self.game.move_count = 1
+        self.game.cache_version()
+        self.game.move_count = 0
+        self.game.cache_version(replace=False)
+        self.assertEqual(
+            Game.get_cached_version(self.game.pk),
+            (self.player_1.id, self.player_2.id, 1, Game.Status.PLAYER_1),
+            msg="a game read before the move doesn't replace its version",
+        )
+
+    def test_save_forgets_version(self):
+        self.game.cache_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.save()
+        self.assertIsNone(Game.get_cached_version(self.game.pk))
+
+    def test_play_computer_move(self):
+        computer = Computer.objects.get(difficulty=Computer.Difficulty.EASY).user
+        game = make_game(
+            "01010",
+            player_1=self.player_1,
+            player_2=computer,
+            status=Game.Status.PLAYER_2,
+        )
+        self.assertTrue(game.play_computer_move())
+        self.assertEqual(game.moves, "010100", msg="the computer blocks column 0")
+        self.assertTrue(
+            Coin.objects.filter(game=game, player=computer, column=0, row=3).exists()
+        )
+        self.assertFalse(
+            game.play_computer_move(), msg="it is player 1's turn after the move"
+        )
+
+    def test_play_computer_move_not_computer(self):
+        self.assertFalse(self.game.play_computer_move())
+        self.assertEqual(self.game.move_count, 0)
+
+
+@override_settings(CONNECT_FOUR_ROWS=6, CONNECT_FOUR_COLUMNS=7, CONNECT_FOUR_CONNECT=4)
+class GameBoardSizeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_1 = baker.make("User")
+        cls.player_2 = baker.make("User")
+
+    def make_game(self, **kwargs):
+        return Game.objects.create(
+            player_1=self.player_1, player_2=self.player_2, **kwargs
+        )
+
+    def test_default_size(self):
+        game = self.make_game()
+        self.assertEqual((game.rows, game.columns, game.connect), (6, 7, 4))
+        self.assertListEqual(game.heights, [0] * 7)
+        self.assertTrue(game.is_connect_four)
+
+    def test_size(self):
+        game = self.make_game(rows=15, columns=15, connect=5)
+        self.assertListEqual(game.heights, [0] * 15)
+        self.assertListEqual(game.available_columns, list(range(15)))
+        self.assertEqual(list(game.column_numbers), list(range(15)))
+        self.assertEqual(len(game.board_dict), 15)
+        self.assertFalse(game.is_connect_four)
+
+    def test_clean(self):
+        game = Game(player_1=self.player_1, player_2=self.player_2, rows=5, columns=8)
+        game.connect = 8
+        game.full_clean()
+        game.connect = 9
+        with self.assertRaisesMessage(ValidationError, "doesn't fit on the board"):
+            game.full_clean()
+        game.rows = 16
+        with self.assertRaises(ValidationError):
+            game.full_clean()
+
+    def test_connect_five(self):
+        game = self.make_game(rows=15, columns=15, connect=5)
+        for column in (0, 14, 1, 14, 2, 14, 3, 14):
+            self.assertFalse(
+                game.create_coin(
+                    (self.player_1, self.player_2)[game.move_count % 2], column
+                )
+            )
+        self.assertEqual(game.status, Game.Status.PLAYER_1, msg="4 in a line")
+        self.assertTrue(game.create_coin(self.player_1, 4))
+        self.assertEqual(game.winner, self.player_1)
+        self.assertEqual(game.calculate_status()["winner_id"], self.player_1.id)
+
+    def test_tall_column(self):
+        game = self.make_game(rows=8, columns=3, connect=3)
+        for _ in range(8):
+            player = (self.player_1, self.player_2)[game.move_count % 2]
+            game.create_coin(player, 1)
+        self.assertListEqual(game.heights, [0, 8, 0])
+        self.assertListEqual(Game.objects.get(pk=game.pk).available_columns, [0, 2])
+        self.assertEqual(Coin.objects.filter(game=game, row=7).count(), 1)
+
+    def test_play_computer_move_connect_four_only(self):
+        computer = Computer.objects.get(difficulty=Computer.Difficulty.EASY).user
+        game = Game.objects.create(
+            player_1=self.player_1,
+            player_2=computer,
+            connect=5,
+            status=Game.Status.PLAYER_2,
+        )
+        self.assertFalse(game.play_computer_move())
+
+
+class PlayerStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_1 = baker.make("User")
+        cls.player_2 = baker.make("User")
+
+    def play_game(self, moves, player_1=None, player_2=None):
+        players = (player_1 or self.player_1, player_2 or self.player_2)
+        game = make_game(moves[:-1], player_1=players[0], player_2=players[1])
+        game.status = (Game.Status.PLAYER_1, Game.Status.PLAYER_2)[game.move_count % 2]
+        game.save()
+        game.create_coin(players[game.move_count % 2], int(moves[-1], 36))
+        return game
+
+    def get_stats(self, user):
+        stats = PlayerStats.objects.get(user=user)
+        return (stats.played, stats.wins, stats.losses, stats.draws, stats.streak)
+
+    def test_record_win(self):
+        self.play_game("0011223")
+        self.assertEqual(self.get_stats(self.player_1), (1, 1, 0, 0, 1))
+        self.assertEqual(self.get_stats(self.player_2), (1, 0, 1, 0, 0))
+
+    def test_record_draw(self):
+        self.play_game(DRAW_MOVES)
+        self.assertEqual(self.get_stats(self.player_1), (1, 0, 0, 1, 0))
+        self.assertEqual(self.get_stats(self.player_2), (1, 0, 0, 1, 0))
+
+    def test_streak(self):
+        self.play_game("0011223")
+        self.play_game("0011223")
+        self.play_game("0011223", player_1=self.player_2, player_2=self.player_1)
+        self.play_game("0011223")
+        stats = PlayerStats.objects.get(user=self.player_1)
+        self.assertEqual((stats.wins, stats.streak, stats.best_streak), (3, 1, 2))
+
+    def test_not_recorded_while_pending(self):
+        game = make_game("001122", player_1=self.player_1, player_2=self.player_2)
+        game.create_coin(self.player_1, 4)
+        self.assertFalse(PlayerStats.objects.exists())
+
+    def test_rating(self):
+        self.play_game("0011223")
+        winner = PlayerStats.objects.get(user=self.player_1)
+        loser = PlayerStats.objects.get(user=self.player_2)
+        self.assertEqual((winner.rating, loser.rating), (1216, 1184))
+        self.play_game(DRAW_MOVES)
+        loser.refresh_from_db()
+        self.assertGreater(loser.rating, 1184, msg="a draw with a stronger player")
+        self.assertEqual(
+            PlayerStats.rating_of(self.player_1), round(2400 - loser.rating)
+        )
+
+    def count_move_queries(self, game, column):
+        game = Game.objects.get(pk=game.pk)
+        with CaptureQueriesContext(connection) as context:
+            game.create_coin(self.player_1, column)
+        # the test case transaction turns the atomic block into a savepoint
+        return len(
+            [
+                query
+                for query in context.captured_queries
+                if "SAVEPOINT" not in query["sql"]
+            ]
+        )
+
+    def test_record_game_num_queries(self):
+        game = make_game("001122", player_1=self.player_1, player_2=self.player_2)
+        PlayerStats.objects.create(user=self.player_1)
+        self.assertEqual(
+            self.count_move_queries(game, 3),
+            6,
+            msg="the move, then read the stats, create player 2's and update player 1's",
+        )
+        game = make_game("001122", player_1=self.player_1, player_2=self.player_2)
+        self.assertEqual(
+            self.count_move_queries(game, 3),
+            5,
+            msg="the move, then read and update the stats",
+        )
+
+    def test_add_game(self):
+        stats_1, stats_2 = PlayerStats(user=self.player_1), PlayerStats(
+            user=self.player_2
+        )
+        for winner in (
+            self.player_1,
+            self.player_1,
+            None,
+            self.player_1,
+            self.player_2,
+        ):
+            PlayerStats.add_game(stats_1, stats_2, winner and winner.pk)
+        self.assertEqual(
+            (stats_1.played, stats_1.wins, stats_1.losses, stats_1.draws), (5, 3, 1, 1)
+        )
+        self.assertEqual((stats_1.streak, stats_1.best_streak), (0, 2))
+        self.assertEqual((stats_2.wins, stats_2.losses, stats_2.streak), (1, 3, 1))
+        self.assertAlmostEqual(stats_1.rating + stats_2.rating, 2400)
+        self.assertGreater(stats_1.rating, stats_2.rating)
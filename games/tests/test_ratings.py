@@ -0,0 +1,19 @@
+from django.test import SimpleTestCase
+
+from games.ratings import K_FACTOR, expected_score, new_rating
+
+
+class RatingsTest(SimpleTestCase):
+    def test_expected_score(self):
+        self.assertEqual(expected_score(1200, 1200), 0.5)
+        self.assertAlmostEqual(expected_score(1600, 1200), 10 / 11)
+        self.assertAlmostEqual(
+            expected_score(1200, 1600) + expected_score(1600, 1200), 1
+        )
+
+    def test_new_rating(self):
+        self.assertEqual(new_rating(1200, 1200, 1), 1200 + K_FACTOR / 2)
+        self.assertEqual(new_rating(1200, 1200, 0.5), 1200)
+        self.assertAlmostEqual(
+            new_rating(1600, 1200, 0), 1600 - K_FACTOR * 10 / 11, msg="upset loss"
+        )
@@ -1,8 +1,10 @@
+import random
+
 from django.test import TestCase, override_settings
 from model_bakery import baker
 
 from games.models import Game
-from games.utils import Direction
+from games.utils import Bitboard, Direction, decode_moves, encode_moves, winning_players
 
 
 class DirectionTest(TestCase):
@@ -115,3 +117,167 @@ class DirectionTest(TestCase):
             self.assertTrue(Game.DIRECTIONS[1].connect_four((0, 2), coins))
             self.assertFalse(Game.DIRECTIONS[2].connect_four((0, 2), coins))
             self.assertFalse(Game.DIRECTIONS[3].connect_four((0, 2), coins))
+
+
+@override_settings(CONNECT_FOUR_ROWS=6, CONNECT_FOUR_COLUMNS=7)
+class BitboardTest(TestCase):
+    def test_initialize(self):
+        """Test the board size is taken from the settings and is empty"""
+        board = Bitboard()
+        self.assertEqual(board.rows, 6)
+        self.assertEqual(board.columns, 7)
+        self.assertEqual(board.move_count, 0)
+        self.assertListEqual(board.available_columns(), [0, 1, 2, 3, 4, 5, 6])
+
+    def test_from_coins(self):
+        board = Bitboard.from_coins({(0, 0): 1, (0, 1): 2, (1, 1): 3}, player_1_id=1)
+        self.assertEqual(board.move_count, 3)
+        self.assertEqual(board.get(0, 0), 0, msg="player 1 coin")
+        self.assertEqual(board.get(0, 1), 1, msg="player 2 coin")
+        self.assertEqual(board.get(1, 1), 1, msg="other coins belong to player 2")
+        self.assertIsNone(board.get(1, 0), msg="no coin")
+
+    def test_play(self):
+        board = Bitboard()
+        self.assertEqual(board.play(3, 0), 0, msg="coin drops to the bottom row")
+        self.assertEqual(board.play(3, 1), 1, msg="coin drops on top of a coin")
+        for _ in range(4):
+            board.play(3, 0)
+        self.assertListEqual(board.available_columns(), [0, 1, 2, 4, 5, 6])
+        with self.assertRaisesMessage(ValueError, "Column is filled!"):
+            board.play(3, 1)
+
+    def test_is_full(self):
+        board = Bitboard()
+        for col in range(7):
+            for _ in range(6):
+                self.assertFalse(board.is_full())
+                board.play(col, col % 2)
+        self.assertTrue(board.is_full())
+        self.assertListEqual(board.available_columns(), [])
+
+    def test_winner(self):
+        lines = {
+            "row": [(0, 3), (0, 4), (0, 5), (0, 6)],
+            "column": [(2, 6), (3, 6), (4, 6), (5, 6)],
+            "right diagonal": [(0, 0), (1, 1), (2, 2), (3, 3)],
+            "left diagonal": [(2, 6), (3, 5), (4, 4), (5, 3)],
+        }
+        for name, line in lines.items():
+            with self.subTest(msg=f"connect four along a {name}"):
+                board = Bitboard.from_coins(dict.fromkeys(line, 2), player_1_id=1)
+                self.assertEqual(board.winner(), 1)
+                self.assertFalse(board.connect_four(0))
+
+        with self.subTest(msg="lines do not wrap between columns"):
+            coins = {(4, 0): 1, (5, 0): 1, (0, 1): 1, (1, 1): 1}
+            self.assertIsNone(Bitboard.from_coins(coins, player_1_id=1).winner())
+
+        with self.subTest(msg="three in a row is not a win"):
+            coins = {(0, 0): 1, (0, 1): 1, (0, 2): 1, (0, 3): 2}
+            self.assertIsNone(Bitboard.from_coins(coins, player_1_id=1).winner())
+
+    def test_connect_four_at(self):
+        coins = {(0, 0): 1, (1, 1): 1, (3, 3): 1, (0, 3): 2, (2, 2): 2}
+        board = Bitboard.from_coins(coins, player_1_id=1)
+        self.assertFalse(board.connect_four_at(1, 1, 0), msg="gap in the diagonal")
+        board.players[0] |= board.bit(2, 2)
+        board.players[1] &= ~board.bit(2, 2)
+        with self.subTest(msg="coin in the middle of the line"):
+            self.assertTrue(board.connect_four_at(2, 2, 0))
+        with self.subTest(msg="coin at the end of the line"):
+            self.assertTrue(board.connect_four_at(3, 3, 0))
+        with self.subTest(msg="lines do not wrap between columns"):
+            coins = {(4, 0): 1, (5, 0): 1, (0, 1): 1, (1, 1): 1}
+            board = Bitboard.from_coins(coins, player_1_id=1)
+            self.assertFalse(board.connect_four_at(0, 1, 0))
+
+    def test_connect_n(self):
+        """Test a line of connect coins wins on a larger board"""
+        lines = {
+            "row": [(0, col) for col in range(10, 15)],
+            "column": [(row, 14) for row in range(10, 15)],
+            "right diagonal": [(row, row) for row in range(5)],
+            "left diagonal": [(row, 14 - row) for row in range(10, 15)],
+        }
+        for name, line in lines.items():
+            with self.subTest(msg=f"connect five along a {name}"):
+                board = Bitboard.from_coins(
+                    dict.fromkeys(line, 1),
+                    player_1_id=1,
+                    rows=15,
+                    columns=15,
+                    connect=5,
+                )
+                self.assertEqual(board.winner(), 0)
+                self.assertTrue(board.connect_four_at(*line[2], 0))
+                board.players[0] &= ~board.bit(*line[0])
+                self.assertIsNone(board.winner(), msg="four in a line is not a win")
+                self.assertFalse(board.connect_four_at(*line[2], 0))
+
+    def test_to_array(self):
+        board = Bitboard.from_moves("3342", rows=6, columns=7)
+        array = board.to_array()
+        self.assertEqual(array.shape, (6, 7))
+        self.assertListEqual(array[0].tolist(), [0, 0, 2, 1, 1, 0, 0])
+        self.assertListEqual(array[1].tolist(), [0, 0, 0, 2, 0, 0, 0])
+        self.assertEqual(array.sum(), 6)
+
+    def test_from_moves(self):
+        board = Bitboard.from_moves("3342")
+        self.assertEqual(board.move_count, 4)
+        self.assertEqual(board.get(0, 3), 0, msg="player 1 plays first")
+        self.assertEqual(board.get(1, 3), 1)
+        self.assertEqual(board.get(0, 4), 0)
+        self.assertEqual(board.get(0, 2), 1)
+        self.assertListEqual(board.heights(), [0, 0, 1, 2, 1, 0, 0])
+
+
+class MovesTest(TestCase):
+    def test_encode_moves(self):
+        self.assertEqual(encode_moves([3, 3, 4, 5, 2, 1]), "334521")
+        self.assertEqual(encode_moves([10, 14]), "ae", msg="columns above 9")
+
+    def test_decode_moves(self):
+        self.assertListEqual(decode_moves("334521"), [3, 3, 4, 5, 2, 1])
+        self.assertListEqual(decode_moves("ae"), [10, 14])
+        self.assertListEqual(decode_moves(""), [])
+
+
+class WinningPlayersTest(TestCase):
+    def test_winning_players(self):
+        boards = {
+            "no winner": ("3342", 7, [False, False]),
+            "column": ("3434343", 7, [True, False]),
+            "right diagonal": ("01123223633", 7, [True, False]),
+            "left diagonal": ("eddcbccb8bb", 15, [True, False]),
+            "player 2": ("06565636", 7, [False, True]),
+        }
+        for name, (moves, columns, wins) in boards.items():
+            with self.subTest(msg=name):
+                board = Bitboard.from_moves(moves, rows=6, columns=columns, connect=4)
+                self.assertListEqual(
+                    winning_players(board.to_array(), 4).tolist(), wins
+                )
+                self.assertEqual(
+                    board.winner(), wins.index(True) if any(wins) else None
+                )
+
+    def test_stack_of_boards(self):
+        """Test every board in a stack is checked, with the same results as the
+        bitboard on random boards of different sizes"""
+        generator = random.Random(0)
+        for rows, columns, connect in [(6, 7, 4), (15, 15, 5), (3, 8, 4), (9, 3, 5)]:
+            boards = []
+            for _ in range(50):
+                board = Bitboard(rows=rows, columns=columns, connect=connect)
+                for move in range(generator.randrange(rows * columns)):
+                    board.play(generator.choice(board.available_columns()), move % 2)
+                boards.append(board)
+            wins = winning_players([board.to_array() for board in boards], connect)
+            self.assertEqual(wins.shape, (50, 2))
+            for board, board_wins in zip(boards, wins):
+                self.assertListEqual(
+                    board_wins.tolist(),
+                    [board.connect_four(0), board.connect_four(1)],
+                )
@@ -1,12 +1,43 @@
-from django.test import RequestFactory, TestCase, override_settings
+import asyncio
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import Http404
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from freezegun import freeze_time
 from model_bakery import baker
 
-from games.models import Coin, Game
+from games.book import get_book, position_key, write_book
+from games.broker import game_channel, get_broker, lobby_channel
+from games.hints import HintsBusy
+from games.matchmaking import get_matchmaker
+from games.models import Coin, Computer, Game, PlayerStats, WaitingPlayer
+from games.utils import Bitboard
 from games.views import (
     GameCheckRedirectView,
     GameCoinRedirectView,
     GameCreateView,
+    GameDetailView,
+    GameEvaluationView,
+    GameHintView,
     GameListView,
+    GameMovesView,
+    GameReplayView,
+    LeaderboardView,
+    LobbyView,
+    OpponentSearchView,
+    game_turn_events,
+    lobby_events,
 )
 
 
@@ -68,6 +99,68 @@ class GameListViewTest(ViewTestCase):
         qs = view.get_queryset()
         self.assertListEqual(list(qs.values_list("id", flat=True)), id_list)
 
+    def test_last_move_date(self):
+        game_id = self.create_mix_games()[0]
+        with freeze_time("2012-01-14"):
+            baker.make("games.Coin", game_id=game_id, row=0, column=0)
+        with freeze_time("2012-01-15"):
+            baker.make("games.Coin", game_id=game_id, row=1, column=0)
+        view = GameListView()
+        view.setup(self.request)
+        last_move_dates = {game.id: game.last_move_date for game in view.get_queryset()}
+        self.assertEqual(
+            last_move_dates[game_id],
+            datetime(2012, 1, 15, tzinfo=timezone.utc),
+            msg="date of the latest coin",
+        )
+        self.assertEqual(
+            list(last_move_dates.values())[1:], [None, None], msg="no coins played"
+        )
+
+    def test_game_list_num_queries(self):
+        self.create_mix_games()
+        baker.make("games.Game", 5, player_1=self.user, winner=self.player_1)
+        # the ids of the games on the page, then the games with their players
+        with self.assertNumQueries(2):
+            GameListView.as_view()(self.request).render()
+
+    def test_keyset_pagination(self):
+        self.create_mix_games()
+        with freeze_time("2012-01-14"):
+            # games created at the same time are ordered by id
+            baker.make("games.Game", 3, player_1=self.user, player_2=self.player_1)
+        expected_ids = list(
+            Game.objects.filter(Q(player_1=self.user) | Q(player_2=self.user))
+            .order_by("-status", "-created_date", "-id")
+            .values_list("id", flat=True)
+        )
+
+        page_ids = []
+        view = GameListView(page_size=2)
+        view.setup(self.request)
+        page_ids += view.get_queryset().values_list("id", flat=True)
+        while view.next_cursor:
+            request = self.factory.get("", {"after": view.next_cursor})
+            request.user = self.user
+            view = GameListView(page_size=2)
+            view.setup(request)
+            ids = list(view.get_queryset().values_list("id", flat=True))
+            self.assertEqual(len(ids), 2, msg="each page is full")
+            page_ids += ids
+        self.assertListEqual(page_ids, expected_ids, msg="all games in order")
+
+    def test_invalid_cursor(self):
+        request = self.factory.get("", {"after": "P1|not a date|1"})
+        request.user = self.user
+        with self.assertRaises(Http404):
+            GameListView.as_view()(request)
+
+    def test_next_page_template(self):
+        request = self.factory.get("", HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        request.user = self.user
+        response = GameListView.as_view()(request)
+        self.assertListEqual(response.template_name, ["games/_game_list.html"])
+
 
 class GameCreateViewTest(ViewTestCase):
     def test_get_form_kwargs(self):
@@ -82,6 +175,68 @@ class GameCreateViewTest(ViewTestCase):
 
 
 @override_settings(CONNECT_FOUR_ROWS=6, CONNECT_FOUR_COLUMNS=7)
+class GameDetailViewTest(ViewTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_2 = baker.make("User", first_name="test", last_name="player2")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.game = baker.make("games.Game", player_1=self.user, player_2=self.player_2)
+
+    def get_response(self, user=None):
+        request = self.factory.get(f"/{self.game.pk}/")
+        request.user = user or self.user
+        response = GameDetailView.as_view()(request, pk=self.game.pk)
+        return response.render()
+
+    def test_cached_board(self):
+        response = self.get_response()
+        with self.assertNumQueries(1):
+            cached_response = self.get_response()
+        self.assertEqual(
+            cached_response.content,
+            response.content,
+            msg="the board and header are rendered from the cache",
+        )
+
+    def test_header_cached_per_player(self):
+        self.get_response()
+        response = self.get_response(self.player_2)
+        self.assertContains(response, f"{self.user}&#x27;s turn!")
+        self.assertNotContains(response, "play-row")
+
+    def test_computer_move_retried(self):
+        computer = Computer.objects.get(difficulty=Computer.Difficulty.EASY).user
+        self.game = baker.make("games.Game", player_1=self.user, player_2=computer)
+        self.game.create_coin(self.user, 3)
+        response = self.get_response()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.move_count, 2, msg="the computer has replied")
+        self.assertContains(response, "play-row", msg_prefix="the user can move")
+
+    def test_outcome_fixed(self):
+        self.assertContains(self.get_response(), "play-row")
+        # as validate_games --fix updates the outcome, without a move
+        Game.objects.filter(pk=self.game.pk).update(
+            status=Game.Status.COMPLETE, winner=self.player_2
+        )
+        response = self.get_response()
+        self.assertNotContains(response, "play-row", msg_prefix="the header is new")
+        self.assertContains(response, "You lost!")
+
+    def test_create_coin_deletes_board(self):
+        self.get_response()
+        board_keys = self.game.fragment_cache_keys(0, Game.Status.PLAYER_1)
+        self.assertIsNotNone(cache.get(board_keys[0]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.create_coin(self.user, 3)
+        self.assertEqual(cache.get_many(board_keys), {})
+        response = self.get_response()
+        self.assertContains(response, '<td data-col="3" class="circle red"></td>')
+
+
 class GameCoinRedirectViewTest(ViewTestCase):
     @classmethod
     def setUpTestData(cls):
@@ -116,6 +271,49 @@ class GameCoinRedirectViewTest(ViewTestCase):
             msg="redirect to the game detail view",
         )
 
+    def test_get_redirect_url_computer_move(self):
+        computer = Computer.objects.get(difficulty=Computer.Difficulty.EASY).user
+        game = baker.make("games.Game", player_1=self.user, player_2=computer)
+        view = GameCoinRedirectView()
+        view.setup(self.request)
+        view.get_redirect_url(pk=game.pk, column=self.column)
+        game.refresh_from_db()
+        self.assertEqual(game.move_count, 2, msg="the computer has replied")
+        self.assertEqual(game.status, Game.Status.PLAYER_1)
+
+    @mock.patch.object(Game, "play_computer_move", side_effect=RuntimeError)
+    def test_get_redirect_url_computer_move_fails(self, play_computer_move):
+        self.request._messages = CookieStorage(self.request)
+        view = GameCoinRedirectView()
+        view.setup(self.request)
+        with self.assertLogs("games.views", "ERROR"):
+            redirect_url = view.get_redirect_url(pk=self.game.pk, column=self.column)
+        self.assertEqual(redirect_url, self.game.get_absolute_url())
+        self.assertEqual(
+            [str(message) for message in get_messages(self.request)],
+            ["The computer couldn't move, reload to retry."],
+        )
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.move_count, 1, msg="the user's move is kept")
+        play_computer_move.assert_called_once_with()
+
+    def test_get_redirect_url_invalid_move(self):
+        self.request.user = self.player_2
+        self.request._messages = CookieStorage(self.request)
+        view = GameCoinRedirectView()
+        view.setup(self.request)
+        redirect_url = view.get_redirect_url(pk=self.game.pk, column=self.column)
+        self.assertEqual(
+            redirect_url,
+            self.game.get_absolute_url(),
+            msg="redirect to the game detail view to see the current board",
+        )
+        self.assertEqual(
+            [str(message) for message in get_messages(self.request)],
+            [f"It is not {self.player_2}'s turn!"],
+        )
+        self.assertFalse(self.game.coins.exists(), msg="Coin is not created")
+
 
 class GameCheckRedirectViewTest(ViewTestCase):
     @classmethod
@@ -124,6 +322,7 @@ class GameCheckRedirectViewTest(ViewTestCase):
 
     def setUp(self):
         super().setUp()
+        cache.clear()
         self.game = baker.make("games.Game", player_1=self.user, player_2=self.player_2)
         self.request = self.factory.get(f"/{self.game.pk}/check/")
         self.request.user = self.user
@@ -136,3 +335,505 @@ class GameCheckRedirectViewTest(ViewTestCase):
             str(response.content, encoding="utf8"),
             {"is_users_turn": True, "is_game_over": False},
         )
+        self.assertEqual(response["ETag"], f'"{self.game.pk}-{self.user.id}-0-P1"')
+        self.assertEqual(
+            Game.get_cached_version(self.game.pk),
+            (self.user.id, self.player_2.id, 0, Game.Status.PLAYER_1),
+            msg="version is cached for the next poll",
+        )
+
+
+class GameCheckRedirectViewNotModifiedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_1 = baker.make("User")
+        cls.player_2 = baker.make("User")
+
+    def setUp(self):
+        cache.clear()
+        self.game = baker.make(
+            "games.Game", player_1=self.player_1, player_2=self.player_2
+        )
+        self.url = reverse("game_check_turn", args=[self.game.pk])
+        self.client.force_login(self.player_1)
+
+    def test_not_modified_without_query(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_by_move(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.create_coin(self.player_1, 0)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"{self.game.pk}-{self.player_1.id}-1-P2"')
+
+    def test_modified_outside_move(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.game.status = Game.Status.DRAW
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"is_users_turn": False, "is_game_over": True},
+        )
+
+    def test_other_players_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_login(self.player_2)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200, msg="the answer is the user's")
+
+    def test_not_player(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_login(baker.make("User"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+
+class GameEvaluationViewTest(ViewTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_2 = baker.make("User", first_name="test", last_name="player2")
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "book.bin")
+        write_book(path, {position_key(Bitboard.from_moves("3")): -1})
+        settings = override_settings(CONNECT_FOUR_BOOK_PATH=path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        get_book.cache_clear()
+
+    def get_result(self, game, user=None):
+        request = self.factory.get(f"/{game.pk}/evaluation/")
+        request.user = user or self.user
+        response = GameEvaluationView.as_view()(request, pk=game.pk)
+        return json.loads(response.content)["result"]
+
+    def test_position_in_book(self):
+        game = baker.make(
+            "games.Game",
+            player_1=self.user,
+            player_2=self.player_2,
+            status=Game.Status.PLAYER_2,
+            moves="3",
+            move_count=1,
+        )
+        self.assertEqual(
+            self.get_result(game), "player_1", msg="player 2 loses from the position"
+        )
+
+    def test_position_not_in_book(self):
+        game = baker.make("games.Game", player_1=self.user, player_2=self.player_2)
+        self.assertEqual(self.get_result(game), "unknown")
+
+    def test_game_over(self):
+        game = baker.make(
+            "games.Game",
+            player_1=self.user,
+            player_2=self.player_2,
+            status=Game.Status.COMPLETE,
+            winner=self.player_2,
+        )
+        self.assertEqual(self.get_result(game), "player_2")
+
+    def test_staff(self):
+        game = baker.make("games.Game", player_1=self.user, player_2=self.player_2)
+        staff = baker.make("User", is_staff=True)
+        self.assertEqual(self.get_result(game, staff), "unknown")
+        with self.assertRaises(PermissionDenied):
+            self.get_result(game, baker.make("User"))
+
+
+@mock.patch("games.views.get_hint_pool")
+class GameHintViewTest(ViewTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_2 = baker.make("User", first_name="test", last_name="player2")
+
+    def setUp(self):
+        super().setUp()
+        self.game = baker.make("games.Game", player_1=self.user, player_2=self.player_2)
+
+    def get_response(self, user=None):
+        request = self.factory.get(f"/{self.game.pk}/hint/")
+        request.user = user or self.user
+        return GameHintView.as_view()(request, pk=self.game.pk)
+
+    def test_hint(self, get_hint_pool):
+        get_hint_pool.return_value.get_hint.return_value = 3
+        response = self.get_response()
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(str(response.content, encoding="utf8"), {"column": 3})
+
+    def test_hint_searching(self, get_hint_pool):
+        get_hint_pool.return_value.get_hint.return_value = None
+        self.assertEqual(self.get_response().status_code, 202)
+
+    def test_busy(self, get_hint_pool):
+        get_hint_pool.return_value.get_hint.side_effect = HintsBusy
+        response = self.get_response()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_not_users_turn(self, get_hint_pool):
+        self.assertEqual(self.get_response(self.player_2).status_code, 400)
+        get_hint_pool.assert_not_called()
+
+    def test_not_connect_four(self, get_hint_pool):
+        self.game.connect = 5
+        self.game.save()
+        self.assertEqual(self.get_response().status_code, 400)
+        get_hint_pool.assert_not_called()
+
+
+class GameReplayTest(ViewTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_2 = baker.make("User", first_name="test", last_name="player2")
+
+    def setUp(self):
+        super().setUp()
+        self.game = baker.make(
+            "games.Game",
+            player_1=self.user,
+            player_2=self.player_2,
+            status=Game.Status.COMPLETE,
+            winner=self.user,
+            moves="0101010",
+            move_count=7,
+        )
+
+    def get_moves(self, user=None, **params):
+        request = self.factory.get(f"/{self.game.pk}/moves/", params)
+        request.user = user or self.user
+        return GameMovesView.as_view()(request, pk=self.game.pk)
+
+    def test_moves(self):
+        with self.assertNumQueries(1):
+            response = self.get_moves()
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {
+                "player_1": f"{self.user}",
+                "player_2": f"{self.player_2}",
+                "status": "C",
+                "winner": "player_1",
+                "rows": 6,
+                "columns": 7,
+                "connect": 4,
+                "moves": [0, 1, 0, 1, 0, 1, 0],
+            },
+        )
+
+    def test_position_at_ply(self):
+        for ply in range(8):
+            with self.subTest(ply=ply), self.assertNumQueries(1):
+                replay = json.loads(self.get_moves(ply=ply).content)
+            board = replay["board"]
+            self.assertEqual(replay["ply"], ply)
+            self.assertEqual(len(board), 6)
+            self.assertListEqual(
+                [row[0] for row in reversed(board)][: (ply + 1) // 2],
+                [1] * ((ply + 1) // 2),
+                msg="player 1's coins from the bottom of column 0",
+            )
+            self.assertEqual(sum(cell == 2 for row in board for cell in row), ply // 2)
+
+    def test_invalid_ply(self):
+        for ply in ("-1", "8", "last"):
+            with self.subTest(ply=ply):
+                self.assertEqual(self.get_moves(ply=ply).status_code, 400)
+
+    def test_permission(self):
+        with self.assertRaises(PermissionDenied):
+            self.get_moves(user=baker.make("User"))
+        self.assertEqual(
+            self.get_moves(user=baker.make("User", is_staff=True)).status_code, 200
+        )
+
+    def test_replay_view(self):
+        request = self.factory.get(f"/{self.game.pk}/replay/")
+        request.user = self.user
+        with self.assertNumQueries(1):
+            response = GameReplayView.as_view()(request, pk=self.game.pk).render()
+        self.assertContains(response, 'id="replayData"')
+        self.assertEqual(
+            response.context_data["replay"]["moves"], [0, 1, 0, 1, 0, 1, 0]
+        )
+
+
+class LeaderboardViewTest(ViewTestCase):
+    def test_leaderboard(self):
+        players = baker.make("User", _quantity=3)
+        for player, wins, losses in zip(players, (2, 5, 2), (3, 0, 1)):
+            PlayerStats.objects.create(user=player, wins=wins, losses=losses)
+        request = self.factory.get("/leaderboard/")
+        request.user = self.user
+        with self.assertNumQueries(1):
+            response = LeaderboardView.as_view()(request).render()
+        self.assertListEqual(
+            [stats.user for stats in response.context_data["object_list"]],
+            [players[1], players[2], players[0]],
+            msg="most wins then fewest losses first",
+        )
+        self.assertContains(response, str(players[1]))
+
+
+class OpponentSearchViewTest(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.users = [
+            baker.make("User", username=username)
+            for username in ("alice", "alfred", "albert", "bob", "alan")
+        ]
+
+    def search(self, **params):
+        request = self.factory.get("/opponents/", params)
+        request.user = self.user
+        response = OpponentSearchView.as_view()(request)
+        return json.loads(response.content)
+
+    def usernames(self, results):
+        return [
+            result["text"].split()[0]
+            for result in results["results"]
+            if "children" not in result
+        ]
+
+    def test_prefix(self):
+        results = self.search(term="AL")
+        self.assertListEqual(
+            self.usernames(results), ["alan", "albert", "alfred", "alice"]
+        )
+        self.assertEqual(results["results"][0]["text"], "alan (1200)")
+        self.assertFalse(results["pagination"]["more"])
+
+    def test_recent_opponents_first(self):
+        baker.make("games.Game", player_1=self.user, player_2=self.users[0])
+        baker.make("games.Game", player_1=self.users[2], player_2=self.user)
+        baker.make("games.Game", player_1=self.users[3], player_2=self.users[1])
+        self.assertListEqual(
+            self.usernames(self.search(term="al")),
+            ["albert", "alice", "alan", "alfred"],
+        )
+
+    @mock.patch.object(OpponentSearchView, "page_size", 2)
+    def test_pages(self):
+        baker.make("games.Game", player_1=self.user, player_2=self.users[2])
+        pages = [self.search(term="al", page=page) for page in (1, 2, 3)]
+        self.assertListEqual(
+            [self.usernames(page) for page in pages],
+            [["albert", "alan"], ["alfred", "alice"], []],
+        )
+        self.assertListEqual(
+            [page["pagination"]["more"] for page in pages], [True, False, False]
+        )
+
+    def test_cached(self):
+        baker.make("games.Game", player_1=self.user, player_2=self.users[0])
+        with freeze_time() as frozen:
+            with self.assertNumQueries(4):
+                self.search(term="al")
+            baker.make("User", username="alex")
+            with self.assertNumQueries(0):
+                self.assertNotIn("alex", self.usernames(self.search(term="AL")))
+            frozen.tick(OpponentSearchView.cache_timeout)
+            self.assertIn("alex", self.usernames(self.search(term="al")))
+
+    def test_hidden_users(self):
+        baker.make("User", username="albus", is_active=False)
+        baker.make("User", username="simulation-player-1")
+        baker.make("User", username="benchmark-player-1")
+        self.assertListEqual(
+            self.usernames(self.search(term="al")),
+            ["alan", "albert", "alfred", "alice"],
+        )
+        usernames = self.usernames(self.search())
+        for username in ("simulation-player-1", "benchmark-player-1", "Computer-Easy"):
+            self.assertNotIn(username, usernames)
+
+    def test_computers(self):
+        results = self.search(term="comp")["results"]
+        self.assertEqual(
+            results,
+            [
+                {
+                    "text": "Computers",
+                    "children": [
+                        {"id": computer.user_id, "text": f"{computer.user} (1200)"}
+                        for computer in Computer.objects.order_by("user__username")
+                    ],
+                }
+            ],
+        )
+        self.assertEqual(
+            self.search(term="comp", page=2)["results"], [], msg="first page only"
+        )
+
+    def test_not_self(self):
+        self.assertNotIn(
+            self.user.username, self.usernames(self.search(term=self.user.username))
+        )
+
+
+class LobbyViewTest(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        # each test has its own queue
+        get_matchmaker.cache_clear()
+        self.addCleanup(get_matchmaker.cache_clear)
+
+    def post(self, user, **data):
+        request = self.factory.post("/lobby/", data)
+        request.user = user
+        return LobbyView.as_view()(request)
+
+    def test_wait_then_pair(self):
+        response = self.post(self.user, join="")
+        self.assertEqual(response.url, "/lobby/")
+        self.assertTrue(get_matchmaker().is_waiting(self.user.id))
+
+        opponent = baker.make("User")
+        response = self.post(opponent, join="")
+        game = Game.objects.get(player_1=self.user, player_2=opponent)
+        self.assertEqual(response.url, game.get_absolute_url())
+        self.assertFalse(get_matchmaker().is_waiting(self.user.id))
+
+    def test_leave(self):
+        self.post(self.user, join="")
+        response = self.post(self.user, leave="")
+        self.assertEqual(response.url, "/")
+        self.assertFalse(get_matchmaker().is_waiting(self.user.id))
+
+    def test_lobby_page(self):
+        request = self.factory.get("/lobby/")
+        request.user = self.user
+        response = LobbyView.as_view()(request).render()
+        self.assertNotContains(response, "lobbyScript")
+        get_matchmaker().join(self.user.id, 1200)
+        response = LobbyView.as_view()(request).render()
+        self.assertContains(response, "lobbyScript")
+
+
+class LobbyEventsTest(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        get_matchmaker.cache_clear()
+        self.addCleanup(get_matchmaker.cache_clear)
+
+    def get_request(self):
+        request = self.factory.get("/lobby/events/")
+        request.user = self.user
+        return request
+
+    async def join(self):
+        await sync_to_async(get_matchmaker().join)(self.user.id, 1200)
+
+    async def test_paired(self):
+        await self.join()
+        asyncio.get_running_loop().call_later(
+            0.01, get_broker().publish, lobby_channel(self.user.id), {"url": "/1/"}
+        )
+        response = await lobby_events(self.get_request())
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"), {"is_waiting": False, "url": "/1/"}
+        )
+
+    @mock.patch("games.views.GAME_EVENTS_TIMEOUT", 0.01)
+    async def test_timeout(self):
+        await self.join()
+        response = await lobby_events(self.get_request())
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"), {"is_waiting": True}
+        )
+
+    @override_settings(GAMES_MATCHMAKING_TIMEOUT=60)
+    @mock.patch("games.views.GAME_EVENTS_TIMEOUT", 0.01)
+    async def test_keeps_waiting(self):
+        await self.join()
+        waiting = WaitingPlayer.objects.filter(pk=self.user.id)
+        now = datetime.now(timezone.utc)
+        await sync_to_async(waiting.update)(joined_date=now - timedelta(seconds=50))
+        await lobby_events(self.get_request())
+        joined_date = await sync_to_async(waiting.values_list("joined_date").get)()
+        self.assertGreaterEqual(
+            joined_date[0], now, msg="the request refreshed the user's wait"
+        )
+
+        await sync_to_async(waiting.update)(joined_date=now - timedelta(seconds=61))
+        response = await lobby_events(self.get_request())
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"), {"is_waiting": False}
+        )
+
+    async def test_not_waiting(self):
+        response = await lobby_events(self.get_request())
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"), {"is_waiting": False}
+        )
+
+
+class GameTurnEventsTest(ViewTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.player_2 = baker.make("User", first_name="test", last_name="player2")
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.game = baker.make(
+            "games.Game",
+            player_1=self.user,
+            player_2=self.player_2,
+            status=Game.Status.PLAYER_2,
+            move_count=1,
+        )
+
+    def get_request(self, move_count, user=None):
+        request = self.factory.get(f"/{self.game.pk}/events/?move_count={move_count}")
+        request.user = user or self.user
+        return request
+
+    async def test_game_moved_on(self):
+        response = await game_turn_events(self.get_request(0), pk=self.game.pk)
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"is_users_turn": False, "is_game_over": False, "move_count": 1},
+        )
+
+    async def test_wait_for_move(self):
+        asyncio.get_running_loop().call_later(
+            0.01,
+            get_broker().publish,
+            game_channel(self.game.pk),
+            {"status": Game.Status.PLAYER_1, "move_count": 2},
+        )
+        response = await game_turn_events(self.get_request(1), pk=self.game.pk)
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"is_users_turn": True, "is_game_over": False, "move_count": 2},
+        )
+
+    @mock.patch("games.views.GAME_EVENTS_TIMEOUT", 0.01)
+    async def test_timeout(self):
+        response = await game_turn_events(self.get_request(1), pk=self.game.pk)
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"is_users_turn": False, "is_game_over": False, "move_count": 1},
+        )
+
+    async def test_not_player(self):
+        stranger = await sync_to_async(baker.make)("User")
+        with self.assertRaises(PermissionDenied):
+            await game_turn_events(self.get_request(1, stranger), pk=self.game.pk)
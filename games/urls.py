@@ -5,6 +5,10 @@ from . import views
 urlpatterns = [
     path("", views.GameListView.as_view(), name="game_list"),
     path("create/", views.GameCreateView.as_view(), name="game_create"),
+    path("opponents/", views.OpponentSearchView.as_view(), name="opponent_search"),
+    path("leaderboard/", views.LeaderboardView.as_view(), name="leaderboard"),
+    path("lobby/", views.LobbyView.as_view(), name="lobby"),
+    path("lobby/events/", views.lobby_events, name="lobby_events"),
     path("<int:pk>/", views.GameDetailView.as_view(), name="game_detail"),
     path(
         "<int:pk>/<int:column>/", views.GameCoinRedirectView.as_view(), name="game_coin"
@@ -14,4 +18,13 @@ urlpatterns = [
         views.GameCheckRedirectView.as_view(),
         name="game_check_turn",
     ),
+    path("<int:pk>/events/", views.game_turn_events, name="game_turn_events"),
+    path(
+        "<int:pk>/evaluation/",
+        views.GameEvaluationView.as_view(),
+        name="game_evaluation",
+    ),
+    path("<int:pk>/hint/", views.GameHintView.as_view(), name="game_hint"),
+    path("<int:pk>/replay/", views.GameReplayView.as_view(), name="game_replay"),
+    path("<int:pk>/moves/", views.GameMovesView.as_view(), name="game_moves"),
 ]
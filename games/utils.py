@@ -1,7 +1,21 @@
-from dataclasses import dataclass
-from typing import Literal
+import string
+from dataclasses import dataclass, field
+from typing import Dict, Literal, Optional, Tuple
 
+import numpy as np
 from django.conf import settings
+from numpy.lib.stride_tricks import sliding_window_view
+
+# a game's moves are stored as a string with one character per coin, the column played
+MOVE_CHARACTERS = string.digits + string.ascii_lowercase
+
+
+def encode_moves(columns):
+    return "".join(MOVE_CHARACTERS[column] for column in columns)
+
+
+def decode_moves(moves: str):
+    return [MOVE_CHARACTERS.index(move) for move in moves]
 
 
 @dataclass
@@ -9,11 +23,15 @@ class Direction:
     row: Literal["+", ""] = ""
     col: Literal["+", "-", ""] = ""
 
-    def is_valid(self, row: int, col: int):
+    def is_valid(self, row: int, col: int, rows=None, columns=None, connect=4):
+        """Check whether a line of connect coins from (row, col) fits on the board,
+        which is the size in the settings unless given"""
+        rows = rows or settings.CONNECT_FOUR_ROWS
+        columns = columns or settings.CONNECT_FOUR_COLUMNS
         return (
-            not (self.col == "+" and col + 4 > settings.CONNECT_FOUR_COLUMNS)
-            and not (self.row == "+" and row + 4 > settings.CONNECT_FOUR_ROWS)
-            and not (self.col == "-" and col < 3)
+            not (self.col == "+" and col + connect > columns)
+            and not (self.row == "+" and row + connect > rows)
+            and not (self.col == "-" and col < connect - 1)
         )
 
     def next_coordinate(self, row: int, col: int, i: int):
@@ -25,12 +43,171 @@ class Direction:
             col = col - i
         return row, col
 
-    def connect_four(self, coordinate: (int, int), coins):
-        if not self.is_valid(*coordinate):
+    def connect_four(self, coordinate: (int, int), coins, **board):
+        if not self.is_valid(*coordinate, **board):
             return False
         player = coins.get(coordinate)
-        for i in range(1, 4):
+        for i in range(1, board.get("connect", 4)):
             next_player = coins.get(self.next_coordinate(*coordinate, i))
             if next_player != player:
                 return False
         return True
+
+
+@dataclass
+class Bitboard:
+    """A board stored as one integer per player (index 0 is player 1).
+
+    Each column uses rows + 1 bits, starting from the bottom row. The extra bit
+    at the top of each column is always empty so a line can't wrap into the next column.
+    A player wins with a line of connect coins.
+    """
+
+    rows: int = field(default_factory=lambda: settings.CONNECT_FOUR_ROWS)
+    columns: int = field(default_factory=lambda: settings.CONNECT_FOUR_COLUMNS)
+    connect: int = field(default_factory=lambda: settings.CONNECT_FOUR_CONNECT)
+    players: list = field(default_factory=lambda: [0, 0])
+    move_count: int = 0
+
+    @classmethod
+    def from_coins(cls, coins: Dict[Tuple[int, int], int], player_1_id: int, **kwargs):
+        """Build a board from a coin dict, coins not played by player 1 belong to player 2"""
+        board = cls(**kwargs)
+        for (row, col), player_id in coins.items():
+            board.players[0 if player_id == player_1_id else 1] |= board.bit(row, col)
+        board.move_count = len(coins)
+        return board
+
+    @classmethod
+    def from_moves(cls, moves: str, **kwargs):
+        """Build a board by replaying the moves, with player 1 playing first"""
+        board = cls(**kwargs)
+        for move, column in enumerate(decode_moves(moves)):
+            board.play(column, move % 2)
+        return board
+
+    @property
+    def height(self):
+        return self.rows + 1
+
+    @property
+    def mask(self):
+        return self.players[0] | self.players[1]
+
+    @property
+    def shifts(self):
+        """The bit distance between neighbouring coins in a
+        vertical, horizontal, right diagonal and left diagonal line"""
+        return 1, self.height, self.height + 1, self.height - 1
+
+    def bit(self, row: int, col: int):
+        return 1 << (col * self.height + row)
+
+    def get(self, row: int, col: int) -> Optional[int]:
+        """Return the index of the player with a coin in this location"""
+        bit = self.bit(row, col)
+        for player, board in enumerate(self.players):
+            if board & bit:
+                return player
+        return None
+
+    def next_row(self, col: int):
+        column_bits = (self.mask >> (col * self.height)) & ((1 << self.rows) - 1)
+        return column_bits.bit_length()
+
+    def heights(self):
+        """Return the number of coins in each column"""
+        return [self.next_row(col) for col in range(self.columns)]
+
+    def available_columns(self):
+        top_row = self.rows - 1
+        mask = self.mask
+        return [col for col in range(self.columns) if not mask & self.bit(top_row, col)]
+
+    def is_full(self):
+        return self.move_count == self.rows * self.columns
+
+    def play(self, col: int, player: int):
+        """Drop a coin for the player into the column and return the row it lands on"""
+        row = self.next_row(col)
+        if row >= self.rows:
+            raise ValueError("Column is filled!")
+        self.players[player] |= self.bit(row, col)
+        self.move_count += 1
+        return row
+
+    def connect_four(self, player: int):
+        """Check for a line of connect coins, each step doubles the length of the
+        lines found until the next step would be longer than connect"""
+        board = self.players[player]
+        for shift in self.shifts:
+            lines, length = board, 1
+            while lines and length < self.connect:
+                step = min(length, self.connect - length)
+                lines &= lines >> step * shift
+                length += step
+            if lines:
+                return True
+        return False
+
+    def winner(self) -> Optional[int]:
+        for player in range(len(self.players)):
+            if self.connect_four(player):
+                return player
+        return None
+
+    def connect_four_at(self, row: int, col: int, player: int):
+        """Check only the lines through a coin, rather than the whole board"""
+        board = self.players[player]
+        coin = self.bit(row, col)
+        steps = range(1, self.connect)
+        for shift in self.shifts:
+            length = 1
+            for step in steps:
+                if not board & (coin << step * shift):
+                    break
+                length += 1
+            for step in steps:
+                if not board & (coin >> step * shift):
+                    break
+                length += 1
+            if length >= self.connect:
+                return True
+        return False
+
+    def to_array(self):
+        """Return the board as an array of rows from the bottom, where a coin is
+        1 for player 1 and 2 for player 2 and an empty location is 0"""
+        size = self.columns * self.height
+        array = np.zeros(size, dtype=np.int8)
+        for player, board in enumerate(self.players):
+            bits = np.unpackbits(
+                np.frombuffer(board.to_bytes((size + 7) // 8, "little"), np.uint8),
+                count=size,
+                bitorder="little",
+            )
+            array[bits.astype(bool)] = player + 1
+        return array.reshape(self.columns, self.height)[:, : self.rows].T
+
+
+def winning_players(boards, connect: int):
+    """Return whether each player has a line of connect coins, for one board or a
+    stack of boards in the to_array format. All the lines of every board are checked
+    at once with sliding windows, and the result has a last axis of the 2 players"""
+    boards = np.asarray(boards)
+    rows, columns = boards.shape[-2:]
+    # one board of booleans for each player, in the last two axes
+    players = boards[..., np.newaxis, :, :] == np.array([1, 2]).reshape(2, 1, 1)
+    wins = np.zeros(players.shape[:-2], dtype=bool)
+    if columns >= connect:
+        lines = sliding_window_view(players, connect, axis=-1).all(axis=-1)
+        wins |= lines.any(axis=(-2, -1))
+    if rows >= connect:
+        lines = sliding_window_view(players, connect, axis=-2).all(axis=-1)
+        wins |= lines.any(axis=(-2, -1))
+    if rows >= connect and columns >= connect:
+        squares = sliding_window_view(players, (connect, connect), axis=(-2, -1))
+        for square in (squares, squares[..., ::-1]):
+            lines = np.diagonal(square, axis1=-2, axis2=-1).all(axis=-1)
+            wins |= lines.any(axis=(-2, -1))
+    return wins
@@ -1,20 +1,131 @@
+import hashlib
+import logging
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth import SESSION_KEY
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.db.models import OuterRef, Q, Subquery
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
+from django.utils.translation import gettext as _
 from django.views import generic
 
-from .forms import GameForm
-from .models import Game
+from .book import get_book
+from .broker import game_channel, get_broker, lobby_channel
+from .forms import GameForm, opponent_label
+from .hints import HintsBusy, get_hint_pool
+from .matchmaking import find_game, get_matchmaker
+from .models import Coin, Game, PlayerStats
+from .utils import decode_moves
+
+# seconds a request for the next move waits before the page asks again
+GAME_EVENTS_TIMEOUT = 25
+
+logger = logging.getLogger(__name__)
+
+
+def play_computer_move(request, game):
+    """Play a computer opponent's move, which is tried again when the game is next
+    shown if the search fails, so the game can still be played"""
+    try:
+        game.play_computer_move()
+    except Exception:
+        logger.exception("The computer's move in game %s failed", game.pk)
+        messages.warning(request, _("The computer couldn't move, reload to retry."))
 
 
 class GameListView(LoginRequiredMixin, generic.ListView):
     model = Game
+    ordering = ("-status", "-created_date", "-id")
+    page_size = 30
+    next_cursor = None
+
+    def get_cursor(self):
+        """Return the (status, created_date, id) of the last game on the previous page"""
+        after = self.request.GET.get("after")
+        if not after:
+            return None
+        try:
+            status, created_date, game_id = after.split("|")
+            created_date = parse_datetime(created_date)
+            game_id = int(game_id)
+        except ValueError:
+            created_date = None
+        if created_date is None:
+            raise Http404(_("Invalid cursor"))
+        return status, created_date, game_id
+
+    def get_page_ids(self):
+        """Return the ids of the games on the page and set the cursor for the next page.
+        The user's games as player 1 and as player 2 are combined with a UNION,
+        so each can be read in order from the index on that player"""
+        cursor = self.get_cursor()
+        # read one game past the page to know whether there is a next page
+        limit = self.page_size + 1
+        player_games = []
+        for player_field in ("player_1", "player_2"):
+            games = Game.objects.filter(**{player_field: self.request.user})
+            if cursor:
+                status, created_date, game_id = cursor
+                games = games.filter(
+                    Q(status__lt=status)
+                    | Q(status=status, created_date__lt=created_date)
+                    | Q(status=status, created_date=created_date, id__lt=game_id)
+                )
+            games = games.values_list("id", "status", "created_date")
+            if connection.features.supports_slicing_ordering_in_compound:
+                games = games.order_by(*self.ordering)[:limit]
+            player_games.append(games)
+
+        games = player_games[0].union(player_games[1]).order_by(*self.ordering)
+        page = list(games[:limit])
+        if len(page) == limit:
+            page.pop()
+            game_id, status, created_date = page[-1]
+            self.next_cursor = f"{status}|{created_date.isoformat()}|{game_id}"
+        return [game_id for game_id, status, created_date in page]
 
     def get_queryset(self):
-        return Game.objects.filter(
-            Q(player_1=self.request.user) | Q(player_2=self.request.user)
-        ).order_by("-status", "-created_date")
+        last_move_date = (
+            Coin.objects.filter(game=OuterRef("pk"))
+            .order_by("-created_date")
+            .values("created_date")[:1]
+        )
+        return (
+            Game.objects.filter(id__in=self.get_page_ids())
+            .select_related("player_1__stats", "player_2__stats", "winner")
+            .annotate(last_move_date=Subquery(last_move_date))
+            .order_by(*self.ordering)
+        )
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(next_cursor=self.next_cursor, **kwargs)
+
+    def get_template_names(self):
+        # the next page is loaded into the list as the user scrolls
+        if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
+            return ["games/_game_list.html"]
+        return super().get_template_names()
+
+
+class LeaderboardView(LoginRequiredMixin, generic.ListView):
+    """Lists the players with the most wins, read in one query from the stats index"""
+
+    model = PlayerStats
+    template_name = "games/leaderboard.html"
+    size = 50
+
+    def get_queryset(self):
+        stats = PlayerStats.objects.select_related("user")
+        return stats.order_by(*PlayerStats.LEADERBOARD_ORDERING)[: self.size]
 
 
 class GameCreateView(LoginRequiredMixin, generic.CreateView):
@@ -27,15 +138,134 @@ class GameCreateView(LoginRequiredMixin, generic.CreateView):
         return kwargs
 
 
+class LobbyView(LoginRequiredMixin, generic.TemplateView):
+    """Pairs the user with an opponent of a similar rating, creating their game.
+    Without a waiting opponent the user waits in the lobby until they are paired"""
+
+    template_name = "games/lobby.html"
+
+    def get_context_data(self, **kwargs):
+        is_waiting = get_matchmaker().is_waiting(self.request.user.id)
+        return super().get_context_data(is_waiting=is_waiting, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        if "leave" in request.POST:
+            get_matchmaker().leave(request.user.id)
+            return redirect("game_list")
+        game = find_game(request.user)
+        if game is not None:
+            return redirect(game)
+        return redirect("lobby")
+
+
+class OpponentSearchView(LoginRequiredMixin, generic.View):
+    """Returns a page of the users whose username starts with the search term,
+    for the opponent picker. The user's recent opponents are ranked first, then
+    the other users by username. The computers are listed in their own group on
+    the first page, and the simulation, benchmark and inactive users aren't listed.
+    As the picker searches on each key press, the pages are cached for a few seconds"""
+
+    page_size = 20
+    # the number of the user's latest games their recent opponents are read from
+    recent_games = 50
+    # seconds a page is cached for, so a new user or game is soon listed
+    cache_timeout = 10
+    # the users created by the simulate_games and benchmark commands
+    hidden_prefixes = ("simulation-player-", "benchmark-player-")
+
+    def get(self, request, *args, **kwargs):
+        term = request.GET.get("term", "").strip()
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        key = self.cache_key(request.user.id, term, page)
+        results = cache.get(key)
+        if results is None:
+            results = self.search(request.user.id, term, page)
+            cache.set(key, results, self.cache_timeout)
+        return JsonResponse(results)
+
+    @staticmethod
+    def cache_key(user_id, term, page):
+        """The search ignores the case of the term, so the key does too"""
+        term_hash = hashlib.md5(term.lower().encode()).hexdigest()
+        return f"opponent-search-{user_id}-{page}-{term_hash}"
+
+    def recent_opponent_ids(self, user_id):
+        """Return the ids of the user's opponents, most recently played first"""
+        games = (
+            Game.objects.filter(Q(player_1=user_id) | Q(player_2=user_id))
+            .order_by("-created_date")
+            .values_list("player_1_id", "player_2_id")
+        )
+        opponent_ids = {}
+        for player_1_id, player_2_id in games[: self.recent_games]:
+            opponent_ids.setdefault(
+                player_2_id if player_1_id == user_id else player_1_id
+            )
+        return list(opponent_ids)
+
+    def search(self, user_id, term, page):
+        # the prefix is read from the index on the upper case username
+        users = (
+            User.objects.filter(is_active=True, username__istartswith=term)
+            .exclude(pk=user_id)
+            .select_related("stats")
+        )
+        computers = users.filter(computer__isnull=False).order_by("username")
+        users = users.filter(computer__isnull=True)
+        for prefix in self.hidden_prefixes:
+            users = users.exclude(username__startswith=prefix)
+        recent_ids = self.recent_opponent_ids(user_id)
+        recent = {user.pk: user for user in users.filter(pk__in=recent_ids)}
+        ranked = [recent[pk] for pk in recent_ids if pk in recent]
+
+        # read one user past the page to know whether there is a next page
+        start = (page - 1) * self.page_size
+        end = start + self.page_size + 1
+        found = ranked[start:end]
+        if len(found) < end - start:
+            others = users.exclude(pk__in=list(recent)).order_by("username")
+            offset, limit = max(start - len(ranked), 0), end - len(ranked)
+            found += others[offset:limit]
+        results = [
+            {"id": user.pk, "text": opponent_label(user)}
+            for user in found[: self.page_size]
+        ]
+        if page == 1:
+            group = [
+                {"id": user.pk, "text": opponent_label(user)} for user in computers
+            ]
+            if group:
+                results.insert(0, {"text": _("Computers"), "children": group})
+        return {"results": results, "pagination": {"more": len(found) > self.page_size}}
+
+
 class GamePlayerMixin(UserPassesTestMixin):
+    game = None
+
+    def get_game(self, pk):
+        """Return the game, which is only read once per request"""
+        if self.game is None:
+            self.game = get_object_or_404(Game, pk=pk)
+        return self.game
+
     def test_func(self):
-        game = get_object_or_404(Game, pk=self.kwargs["pk"])
-        return self.request.user in (game.player_1, game.player_2)
+        game = self.get_game(self.kwargs["pk"])
+        return self.request.user.id in (game.player_1_id, game.player_2_id)
 
 
 class GameDetailView(LoginRequiredMixin, GamePlayerMixin, generic.DetailView):
     model = Game
 
+    def get_object(self, queryset=None):
+        game = self.get_game(self.kwargs["pk"])
+        if game.is_pending and not game.is_users_turn(self.request.user.id):
+            # the computer's move failed when the user moved
+            play_computer_move(self.request, game)
+        return game
+
 
 class GameCoinRedirectView(LoginRequiredMixin, GamePlayerMixin, generic.RedirectView):
 
@@ -45,16 +275,225 @@ class GameCoinRedirectView(LoginRequiredMixin, GamePlayerMixin, generic.Redirect
     def get_redirect_url(self, *args, **kwargs):
         game = get_object_or_404(Game, pk=kwargs["pk"])
         column = kwargs.pop("column")
-        game.create_coin(user=self.request.user, column=column)
+        try:
+            game.create_coin(user=self.request.user, column=column)
+        except ValueError as error:
+            # the move is no longer valid, e.g. another move was made first
+            messages.warning(self.request, error)
+        else:
+            # a computer opponent replies straight away
+            play_computer_move(self.request, game)
         return super().get_redirect_url(*args, **kwargs)
 
 
 class GameCheckRedirectView(LoginRequiredMixin, GamePlayerMixin, generic.View):
+    def dispatch(self, request, *args, **kwargs):
+        # most polls are for a game that hasn't changed, which is answered from the cache
+        if self.is_not_modified(request, kwargs["pk"]):
+            return HttpResponseNotModified()
+        return super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def get_etag(game_id, user_id, move_count, status):
+        """The answer depends on the user as well as the game, so a browser used by
+        both players doesn't reuse the other player's answer"""
+        return quote_etag(f"{game_id}-{user_id}-{move_count}-{status}")
+
+    def is_not_modified(self, request, pk):
+        """Check whether the poll's ETag is the cached version of the game.
+        The user id is read from the session rather than loading the user,
+        so no query is made when the session is cached"""
+        if_none_match = request.headers.get("If-None-Match")
+        version = Game.get_cached_version(pk)
+        if not if_none_match or version is None:
+            return False
+        player_1_id, player_2_id, move_count, status = version
+        user_id = request.session.get(SESSION_KEY)
+        if user_id not in (str(player_1_id), str(player_2_id)):
+            return False
+        etag = self.get_etag(pk, user_id, move_count, status)
+        return etag in parse_etags(if_none_match)
+
     def get(self, request, *args, **kwargs):
-        game = get_object_or_404(Game, pk=kwargs["pk"])
-        return JsonResponse(
+        game = self.get_game(kwargs["pk"])
+        game.cache_version(replace=False)
+        response = JsonResponse(
             {
                 "is_users_turn": game.is_users_turn(request.user.id),
                 "is_game_over": not game.is_pending,
             }
         )
+        response["ETag"] = self.get_etag(
+            game.pk, request.user.id, game.move_count, game.status
+        )
+        # the browser must check the game hasn't changed before using the response
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class GameEvaluationView(LoginRequiredMixin, GamePlayerMixin, generic.View):
+    """Returns the result of the game with perfect play from the current board,
+    which is known when the board's position is in the book"""
+
+    def test_func(self):
+        return self.request.user.is_staff or super().test_func()
+
+    def get(self, request, *args, **kwargs):
+        game = self.get_game(kwargs["pk"])
+        if game.winner_id:
+            result = "player_1" if game.winner_id == game.player_1_id else "player_2"
+        elif game.status == Game.Status.DRAW:
+            result = "draw"
+        else:
+            book = get_book()
+            book_result = book.result(game.bitboard) if book else None
+            player = game.move_count % 2
+            result = {
+                None: "unknown",
+                0: "draw",
+                1: ("player_1", "player_2")[player],
+                -1: ("player_2", "player_1")[player],
+            }[book_result]
+        return JsonResponse({"result": result})
+
+
+class GameHintView(LoginRequiredMixin, GamePlayerMixin, generic.View):
+    """Returns the column the engine suggests for the user's move.
+    The hint is searched for outside of the request, so while it is being searched
+    a 202 response is returned and the page asks again"""
+
+    def get(self, request, *args, **kwargs):
+        game = self.get_game(kwargs["pk"])
+        if not game.is_users_turn(request.user.id):
+            return JsonResponse({"error": _("It is not your turn!")}, status=400)
+        if not game.is_connect_four:
+            return JsonResponse(
+                {"error": _("Hints are only for games of connect four.")}, status=400
+            )
+        try:
+            column = get_hint_pool().get_hint(game)
+        except HintsBusy:
+            response = JsonResponse(
+                {"error": _("Too many hints are being searched for, try again.")},
+                status=503,
+            )
+            response["Retry-After"] = 1
+            return response
+        if column is None:
+            return JsonResponse({"column": None}, status=202)
+        return JsonResponse({"column": column})
+
+
+class GameReplayMixin(LoginRequiredMixin, GamePlayerMixin):
+    """Players and staff can step through the moves of a game, which are read with
+    the game and its players in one query. Each position is rebuilt from the moves"""
+
+    def test_func(self):
+        return self.request.user.is_staff or super().test_func()
+
+    def get_game(self, pk):
+        if self.game is None:
+            games = Game.objects.select_related("player_1", "player_2")
+            self.game = get_object_or_404(games, pk=pk)
+        return self.game
+
+    def get_replay(self, game):
+        winner = None
+        if game.winner_id:
+            winner = "player_1" if game.winner_id == game.player_1_id else "player_2"
+        return {
+            "player_1": str(game.player_1),
+            "player_2": str(game.player_2),
+            "status": game.status,
+            "winner": winner,
+            "rows": game.rows,
+            "columns": game.columns,
+            "connect": game.connect,
+            "moves": decode_moves(game.moves),
+        }
+
+
+class GameReplayView(GameReplayMixin, generic.DetailView):
+    model = Game
+    template_name = "games/game_replay.html"
+
+    def get_object(self, queryset=None):
+        return self.get_game(self.kwargs["pk"])
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(replay=self.get_replay(self.object), **kwargs)
+
+
+class GameMovesView(GameReplayMixin, generic.View):
+    """Returns the moves of the game, and with a ply the board after that many
+    moves as rows from the top, where a coin is 1 for player 1 and 2 for player 2"""
+
+    def get(self, request, *args, **kwargs):
+        game = self.get_game(kwargs["pk"])
+        replay = self.get_replay(game)
+        if "ply" in request.GET:
+            try:
+                ply = int(request.GET["ply"])
+            except ValueError:
+                ply = -1
+            if not 0 <= ply <= game.move_count:
+                return JsonResponse(
+                    {"error": _("The ply must be from 0 to the number of moves.")},
+                    status=400,
+                )
+            replay["ply"] = ply
+            replay["board"] = game.board_at(ply).to_array()[::-1].tolist()
+        return JsonResponse(replay)
+
+
+def get_player_game(request, pk):
+    """Return the game, providing the request user is one of its players"""
+    if not request.user.is_authenticated:
+        raise PermissionDenied
+    game = get_object_or_404(Game, pk=pk)
+    if request.user.id not in (game.player_1_id, game.player_2_id):
+        raise PermissionDenied
+    return game
+
+
+async def game_turn_events(request, pk):
+    """Long-polls for the next move in the game, so an open game page is told when
+    it is the user's turn without polling. The page sends the move count it shows
+    and the response is sent when the game has moved on, or after the timeout.
+    While waiting the request holds a connection but doesn't use the database"""
+    # subscribe before reading the game so a move in between isn't missed
+    with get_broker().subscribe(game_channel(pk)) as subscription:
+        game = await sync_to_async(get_player_game)(request, pk)
+        if request.GET.get("move_count") == str(game.move_count):
+            message = await subscription.get(timeout=GAME_EVENTS_TIMEOUT)
+            if message:
+                game.status = message["status"]
+                game.move_count = message["move_count"]
+    return JsonResponse(
+        {
+            "is_users_turn": game.is_users_turn(request.user.id),
+            "is_game_over": not game.is_pending,
+            "move_count": game.move_count,
+        }
+    )
+
+
+def get_lobby_user_id(request):
+    if not request.user.is_authenticated:
+        raise PermissionDenied
+    return request.user.id
+
+
+async def lobby_events(request):
+    """Long-polls for the game the waiting user is paired into, which is sent
+    by the opponent's request that made the pair"""
+    user_id = await sync_to_async(get_lobby_user_id)(request)
+    # subscribe before checking the user is waiting so a pair in between isn't missed
+    with get_broker().subscribe(lobby_channel(user_id)) as subscription:
+        if await sync_to_async(get_matchmaker().keep_waiting)(user_id):
+            message = await subscription.get(timeout=GAME_EVENTS_TIMEOUT)
+            if message is None:
+                return JsonResponse({"is_waiting": True})
+            return JsonResponse({"is_waiting": False, **message})
+    # the user was paired before the request, their game is at the top of their list
+    return JsonResponse({"is_waiting": False})